@@ -3,9 +3,15 @@
 from crewai import Agent, Task
 from crewai.project import CrewBase
 from typing import Dict, Any, List, Optional, Union
+import asyncio
+import functools
+import keyword
 import os
 import logging
+import re
 from ..llm.providers import LLMProviderManager, LLMProviderConfig
+from ..tools.file_operations import FileOperations
+from ..tools.async_file_operations import AsyncFileOperations
 from ..config.config_manager import (
     get_config_manager,
     ConfigurationError,
@@ -13,6 +19,35 @@ from ..config.config_manager import (
     init_config_manager
 )
 
+# A name or dotted name, optionally called: parse_config, Config.load()
+_CODE_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*(?:\(\))?')
+
+def _code_shaped(name: str) -> bool:
+    """Whether a name looks like code rather than an English word"""
+    if '.' in name:
+        return any(len(part) > 1 for part in name.split('.'))
+    return '_' in name.strip('_') or re.search(r'[a-z0-9][A-Z]', name) is not None
+
+def _symbol_candidates(text: str) -> List[str]:
+    """Names in a text that could be definitions, in order, without repeats
+
+    Backticked names always count; other words only when they are shaped
+    like code (snake_case, CamelCase or dotted), so plain words such as
+    'run' or 'config' never become a task's target.
+    """
+    candidates = []
+    for word in re.findall(r'`[^`]+`|\S+', text):
+        quoted = word.startswith('`')
+        name = word.strip('`').strip('.,:;!?()[]{}"\'')
+        if not _CODE_NAME.fullmatch(name):
+            continue
+        name = name[:-2] if name.endswith('()') else name
+        if keyword.iskeyword(name) or not (quoted or _code_shaped(name)):
+            continue
+        if name not in candidates:
+            candidates.append(name)
+    return candidates
+
 class AgentError(Exception):
     """Base class for agent-related errors"""
     pass
@@ -204,6 +239,73 @@ class VSCodeAgent(Agent):
         self.agent.tools = self.tools
         self.logger.info(f"Added tool: {tool.__class__.__name__}")
 
+    def _tool_with(self, name: str) -> Optional[Any]:
+        """The first tool with a method, e.g. a FileOperations for 'find_symbol'"""
+        return next((tool for tool in self.tools if hasattr(tool, name)), None)
+
+    async def _run_tool(self, tool: Any, name: str, **params) -> Dict[str, Any]:
+        """Run a tool method off the event loop
+
+        FileOperations calls go through its shared async facade, so they
+        never run alongside other calls on the same instance.
+        """
+        if isinstance(tool, FileOperations):
+            return await AsyncFileOperations.shared(tool).run(name, **params)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(getattr(tool, name), **params))
+
+    async def _find_affected(self, target: str) -> Dict[str, List[str]]:
+        """Find the modules and tests a change to a workspace path can affect.
+        
+        Uses the import graph of a FileOperations tool, if the agent has one,
+        queried off the event loop.
+        
+        Args:
+            target: File or directory, relative to the workspace
+            
+        Returns:
+            Dict with the transitive importers ('dependents') and the test
+            files exercising the target ('tests'); empty lists when unknown
+        """
+        affected: Dict[str, List[str]] = {'dependents': [], 'tests': []}
+        dependents_tool = self._tool_with('find_dependents')
+        tests_tool = self._tool_with('find_affected_tests')
+        if dependents_tool is None or tests_tool is None:
+            return affected
+        if not os.path.exists(os.path.join(self.project_path, target)):
+            return affected
+        dependents = await self._run_tool(dependents_tool, 'find_dependents', file_path=target)
+        if dependents.get('status') == 'success':
+            affected['dependents'] = dependents['dependents']
+        tests = await self._run_tool(tests_tool, 'find_affected_tests', file_paths=[target])
+        if tests.get('status') == 'success':
+            affected['tests'] = tests['tests']
+        return affected
+
+    async def _find_task_symbol(self, task_description: str) -> Optional[Dict[str, Any]]:
+        """Find the first word of a task that names a Python definition in the workspace.
+        
+        Uses the symbol index of a FileOperations tool, if the agent has one,
+        with one lookup off the event loop for every code-shaped word.
+        
+        Args:
+            task_description: Task text to scan
+            
+        Returns:
+            The matching definition (with its 'path' and 'line'), or None
+        """
+        tool = self._tool_with('find_symbols')
+        candidates = _symbol_candidates(task_description)
+        if tool is None or not candidates:
+            return None
+        result = await self._run_tool(tool, 'find_symbols', names=candidates)
+        if result.get('status') != 'success':
+            return None
+        for name in candidates:
+            if result['definitions'].get(name):
+                return result['definitions'][name][0]
+        return None
+
     def create_task(self, description: str, expected_output: str) -> Task:
         """Create a task for this agent.
         
@@ -36,7 +36,7 @@ class DocumentationAgent(VSCodeAgent):
         try:
             # Analyze the type of documentation task
             task_type = self._analyze_doc_task(task.description)
-            target, doc_type = self._extract_doc_info(task.description)
+            target, doc_type = await self._extract_doc_info(task.description)
             
             # Create specific task based on type
             execution_task = self.create_task(
@@ -151,9 +151,11 @@ class DocumentationAgent(VSCodeAgent):
             4. List of any gaps found
             """
 
-    def _extract_doc_info(self, task_description: str) -> tuple[str, str]:
-        """Extract documentation target and type from task"""
-        target = self._extract_doc_target(task_description)
+    async def _extract_doc_info(self, task_description: str) -> tuple[str, str]:
+        """Extract documentation target and type from task
+
+        A type the task states explicitly wins over the kind of a symbol it names.
+        """
         task = task_description.lower()
         
         if 'class' in task:
@@ -161,9 +163,14 @@ class DocumentationAgent(VSCodeAgent):
         elif 'function' in task or 'method' in task:
             doc_type = 'function'
         else:
-            doc_type = 'module'
-            
-        return target, doc_type
+            doc_type = None
+
+        symbol = await self._find_task_symbol(task_description)
+        if symbol:
+            if doc_type is None:
+                doc_type = 'class' if symbol['kind'] == 'class' else 'function'
+            return symbol['path'], doc_type
+        return self._extract_doc_target(task_description), doc_type or 'module'
 
     def _extract_doc_target(self, task_description: str) -> str:
         """Extract documentation target from task"""
@@ -57,9 +57,16 @@ class ReviewAgent(VSCodeAgent):
             if review_type == 'specific':
                 target, focus = self._extract_review_focus(task.description)
             
+            # Modules importing the target are in scope for regressions
+            dependents = (await self._find_affected(target))['dependents']
+            description = self._create_task_description(task.description, review_type, target, focus)
+            if dependents:
+                description += "\nAffected Modules:\n" + ''.join(
+                    f"- {path}\n" for path in dependents)
+            
             # Create specific task based on type
             execution_task = self.create_task(
-                description=self._create_task_description(task.description, review_type, target, focus),
+                description=description,
                 expected_output=self._create_expected_output(review_type, focus)
             )
             
@@ -85,6 +92,7 @@ class ReviewAgent(VSCodeAgent):
                 'type': review_type,
                 'target': target,
                 'focus': focus if review_type == 'specific' else None,
+                'affected_modules': dependents,
                 'result': result
             }
             
@@ -21,11 +21,22 @@ class TestAgent(VSCodeAgent):
         try:
             # Analyze the type of test task
             task_type = self._analyze_test_task(task.description)
-            target = self._extract_test_target(task.description)
+            # Prefer the file defining a symbol named in the task over a guessed word
+            symbol = await self._find_task_symbol(task.description)
+            target = symbol['path'] if symbol else self._extract_test_target(task.description)
             
             # Create specific task based on type
+            description = self._create_task_description(task.description, task_type, target)
+            if symbol:
+                description += (f"\nSymbol: {symbol['qualname']} "
+                                f"(lines {symbol['line']}-{symbol['end_line']})\n")
+            # Scope the task to the tests that exercise the target, not the whole suite
+            affected_tests = (await self._find_affected(target))['tests']
+            if affected_tests:
+                description += "\nAffected Tests:\n" + ''.join(
+                    f"- {path}\n" for path in affected_tests)
             execution_task = self.create_task(
-                description=self._create_task_description(task.description, task_type, target),
+                description=description,
                 expected_output=self._create_expected_output(task_type)
             )
             
@@ -36,6 +47,7 @@ class TestAgent(VSCodeAgent):
                 'status': 'success',
                 'type': task_type,
                 'target': target,
+                'affected_tests': affected_tests,
                 'result': result
             }
             
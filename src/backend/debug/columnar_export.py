@@ -0,0 +1,264 @@
+"""
+Columnar export of debug event logs for offline analysis.
+
+Writes Parquet or Arrow IPC files when pyarrow is installed and a compact
+built-in binary format otherwise. Categorical columns are dictionary-encoded
+and timestamps are stored as microseconds (delta-encoded in the built-in
+format). Filters are applied while scanning, so excluded lines are mostly
+skipped without being parsed.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from array import array
+from datetime import datetime, timedelta
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from .event_filter import EventFilter
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional
+    pyarrow = None
+
+BINARY_MAGIC = b'CDLOG\x00\x01\x00'
+FORMAT_EXTENSIONS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+    'binary': '.cdlog'
+}
+CATEGORICAL_COLUMNS = ('event_type', 'agent', 'action', 'status', 'correlation_id')
+COLUMNS = ('timestamp',) + CATEGORICAL_COLUMNS + ('details',)
+
+# Column kinds in the built-in format
+KIND_TIMESTAMP = b'T'
+KIND_DICTIONARY = b'D'
+KIND_STRING = b'S'
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NULL_LENGTH = -1
+
+class ExportError(Exception):
+    """Error exporting debug events"""
+    pass
+
+def default_format() -> str:
+    """Preferred export format for this installation"""
+    return 'parquet' if pyarrow is not None else 'binary'
+
+def timestamp_to_micros(timestamp: str) -> int:
+    """Convert an ISO timestamp to microseconds since the epoch, keeping wall-clock time"""
+    return (datetime.fromisoformat(timestamp) - _EPOCH) // _MICROSECOND
+
+def micros_to_timestamp(micros: int) -> str:
+    """Convert microseconds since the epoch back to an ISO timestamp"""
+    return (_EPOCH + micros * _MICROSECOND).isoformat()
+
+def read_columns(log_paths: List[str], event_filter: Optional[EventFilter] = None) -> Dict[str, list]:
+    """Scan JSONL log segments into column lists, applying filters during the scan"""
+    event_filter = event_filter or EventFilter()
+    columns: Dict[str, list] = {name: [] for name in COLUMNS}
+    for log_path in log_paths:
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or not event_filter.may_match_line(line):
+                    continue
+                event = json.loads(line)
+                if not event_filter.matches(event):
+                    continue
+                columns['timestamp'].append(timestamp_to_micros(event['timestamp']))
+                for name in CATEGORICAL_COLUMNS:
+                    columns[name].append(event.get(name))
+                columns['details'].append(json.dumps(event.get('details')))
+    return columns
+
+def export_events(log_paths: List[str],
+                  output_path: str,
+                  format: Optional[str] = None,
+                  event_filter: Optional[EventFilter] = None) -> Dict[str, Any]:
+    """Export filtered events from log segments to a columnar file
+
+    Args:
+        log_paths: JSONL log segments, oldest first
+        output_path: Destination file
+        format: 'parquet', 'arrow' or 'binary' (defaults to default_format())
+        event_filter: Filters pushed down into the scan
+
+    Returns:
+        Dict with the output path, format, row count and file size
+
+    Raises:
+        ExportError: If the format is unknown or requires pyarrow
+    """
+    format = format or default_format()
+    if format not in FORMAT_EXTENSIONS:
+        raise ExportError(f"Unknown export format: {format}")
+    if format != 'binary' and pyarrow is None:
+        raise ExportError(f"pyarrow is required for {format} export")
+
+    columns = read_columns(log_paths, event_filter)
+    # Written aside and renamed, so output_path never holds a partial export
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)),
+                                     prefix='.', suffix='.tmp')
+    os.close(fd)
+    try:
+        if format == 'binary':
+            _write_binary(columns, temp_path)
+        else:
+            _write_arrow(columns, temp_path, format)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return {
+        'path': output_path,
+        'format': format,
+        'rows': len(columns['timestamp']),
+        'bytes': os.path.getsize(output_path)
+    }
+
+def _write_arrow(columns: Dict[str, list], output_path: str, format: str) -> None:
+    """Write columns as Parquet or Arrow IPC"""
+    arrays = {'timestamp': pyarrow.array(columns['timestamp'], type=pyarrow.timestamp('us'))}
+    for name in CATEGORICAL_COLUMNS:
+        arrays[name] = pyarrow.array(columns[name], type=pyarrow.string()).dictionary_encode()
+    arrays['details'] = pyarrow.array(columns['details'], type=pyarrow.string())
+    table = pyarrow.table(arrays)
+
+    if format == 'parquet':
+        pyarrow.parquet.write_table(table, output_path)
+    else:
+        with pyarrow.ipc.new_file(output_path, table.schema) as writer:
+            writer.write_table(table)
+
+def _little_endian(values: array) -> bytes:
+    """Raw array bytes in little-endian order"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    """Array decoded from little-endian bytes"""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def _encode_strings(values: List[Optional[str]]) -> List[bytes]:
+    """Length-prefixed UTF-8 entries, with a negative length for None"""
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append(struct.pack('<i', _NULL_LENGTH))
+        else:
+            encoded = value.encode('utf-8')
+            parts.append(struct.pack('<i', len(encoded)))
+            parts.append(encoded)
+    return parts
+
+def _write_binary(columns: Dict[str, list], output_path: str) -> None:
+    """Write columns in the built-in binary format
+
+    Layout: magic, row count, column count, then per column its name, kind
+    and a zlib-compressed body. Timestamp bodies hold int64 deltas;
+    dictionary bodies hold the distinct values followed by uint32 codes;
+    string bodies hold length-prefixed values.
+    """
+    rows = len(columns['timestamp'])
+    with open(output_path, 'wb') as f:
+        f.write(BINARY_MAGIC)
+        f.write(struct.pack('<II', rows, len(COLUMNS)))
+        for name in COLUMNS:
+            values = columns[name]
+            if name == 'timestamp':
+                kind = KIND_TIMESTAMP
+                previous = 0
+                deltas = array('q')
+                for value in values:
+                    deltas.append(value - previous)
+                    previous = value
+                body = _little_endian(deltas)
+            elif name in CATEGORICAL_COLUMNS:
+                kind = KIND_DICTIONARY
+                dictionary: Dict[Optional[str], int] = {}
+                codes = array('I', (dictionary.setdefault(v, len(dictionary)) for v in values))
+                body = b''.join([struct.pack('<I', len(dictionary))]
+                                + _encode_strings(list(dictionary))
+                                + [_little_endian(codes)])
+            else:
+                kind = KIND_STRING
+                body = b''.join(_encode_strings(values))
+
+            encoded_name = name.encode('utf-8')
+            compressed = zlib.compress(body, 1)
+            f.write(struct.pack('<H', len(encoded_name)))
+            f.write(encoded_name)
+            f.write(kind)
+            f.write(struct.pack('<I', len(compressed)))
+            f.write(compressed)
+
+def _decode_strings(body: bytes, offset: int, count: int) -> Tuple[List[Optional[str]], int]:
+    """Decode count length-prefixed strings starting at offset"""
+    values: List[Optional[str]] = []
+    for _ in range(count):
+        (length,) = struct.unpack_from('<i', body, offset)
+        offset += 4
+        if length == _NULL_LENGTH:
+            values.append(None)
+        else:
+            values.append(body[offset:offset + length].decode('utf-8'))
+            offset += length
+    return values, offset
+
+def read_binary_export(path: str) -> Dict[str, list]:
+    """Read a built-in binary export back into column lists
+
+    Timestamps are returned as microseconds since the epoch.
+
+    Raises:
+        ExportError: If the file is not a binary export
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ExportError(f"Not a debug log export: {path}")
+
+    offset = len(BINARY_MAGIC)
+    rows, column_count = struct.unpack_from('<II', data, offset)
+    offset += 8
+    columns: Dict[str, list] = {}
+    for _ in range(column_count):
+        (name_length,) = struct.unpack_from('<H', data, offset)
+        offset += 2
+        name = data[offset:offset + name_length].decode('utf-8')
+        offset += name_length
+        kind = data[offset:offset + 1]
+        (compressed_length,) = struct.unpack_from('<I', data, offset + 1)
+        offset += 5
+        body = zlib.decompress(data[offset:offset + compressed_length])
+        offset += compressed_length
+
+        if kind == KIND_TIMESTAMP:
+            values = []
+            current = 0
+            for delta in _from_little_endian('q', body):
+                current += delta
+                values.append(current)
+        elif kind == KIND_DICTIONARY:
+            (size,) = struct.unpack_from('<I', body, 0)
+            dictionary, codes_offset = _decode_strings(body, 4, size)
+            values = [dictionary[code] for code in _from_little_endian('I', body[codes_offset:])]
+        elif kind == KIND_STRING:
+            values, _ = _decode_strings(body, 0, rows)
+        else:
+            raise ExportError(f"Unknown column kind {kind!r} in {path}")
+        columns[name] = values
+    return columns
@@ -1,31 +1,128 @@
 import asyncio
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, List, Literal, Optional, Tuple
+from collections import deque
 from datetime import datetime
+import hashlib
 import json
 import os
+import random
+import re
+import shutil
+import tempfile
+import zlib
+import aiofiles
+from pydantic import BaseModel, Field
+from .trace_builder import TraceBuilder
+from .event_stats import EventStats
+from .event_filter import EventFilter
+from .columnar_export import FORMAT_EXTENSIONS, default_format, export_events
+
+# Numeric severity for event statuses; unknown statuses rank as 'info'
+STATUS_LEVELS = {
+    'debug': 10,
+    'info': 20,
+    'success': 20,
+    'warning': 30,
+    'error': 40
+}
+
+BLOB_DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Upper bound on events read when assembling a single trace
+TRACE_EVENT_LIMIT = 10000
+
+# Number of most recent events kept in memory
+TAIL_CACHE_SIZE = 1000
+
+_encode = json.JSONEncoder().encode
+_encode_details = json.JSONEncoder(default=str).encode
 
-@dataclass
 class DebugEvent:
-    timestamp: str
-    event_type: str
-    agent: str
-    action: str
-    details: Dict[str, Any]
-    status: str
-    correlation_id: Optional[str] = None
+    """Debug event with its dict and JSON forms built once and shared
+
+    Subscribers, the log writer and the tail cache all receive the same
+    objects, so consumers must treat them as read-only.
+    """
+    __slots__ = ('timestamp', 'event_type', 'agent', 'action', 'details', 'status',
+                 'correlation_id', '_details_json', '_dict', '_json')
+
+    def __init__(self,
+                 timestamp: str,
+                 event_type: str,
+                 agent: str,
+                 action: str,
+                 details: Dict[str, Any],
+                 status: str,
+                 correlation_id: Optional[str] = None,
+                 details_json: Optional[str] = None):
+        self.timestamp = timestamp
+        self.event_type = event_type
+        self.agent = agent
+        self.action = action
+        self.details = details
+        self.status = status
+        self.correlation_id = correlation_id
+        self._details_json = details_json
+        self._dict: Optional[Dict[str, Any]] = None
+        self._json: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict form of the event, built on first use"""
+        if self._dict is None:
+            self._dict = {
+                'timestamp': self.timestamp,
+                'event_type': self.event_type,
+                'agent': self.agent,
+                'action': self.action,
+                'details': self.details,
+                'status': self.status,
+                'correlation_id': self.correlation_id
+            }
+        return self._dict
+
+    def to_json(self) -> str:
+        """JSON form of the event, encoded field by field without building a dict"""
+        if self._json is None:
+            details_json = self._details_json
+            if details_json is None:
+                details_json = _encode_details(self.details)
+            self._json = (
+                '{"timestamp": ' + _encode(self.timestamp)
+                + ', "event_type": ' + _encode(self.event_type)
+                + ', "agent": ' + _encode(self.agent)
+                + ', "action": ' + _encode(self.action)
+                + ', "details": ' + details_json
+                + ', "status": ' + _encode(self.status)
+                + ', "correlation_id": ' + _encode(self.correlation_id)
+                + '}'
+            )
+        return self._json
+
+class DebugConfig(BaseModel):
+    """Verbosity, sampling and payload size settings for debug events"""
+    # Least severe status recorded
+    level: Literal['debug', 'info', 'warning', 'error'] = 'debug'
+    sampling_rates: Dict[str, float] = Field(default_factory=dict)
+    max_details_bytes: int = Field(ge=0, default=8192)
+    preview_chars: int = Field(ge=0, default=512)
+    full_fidelity: bool = False
 
 class DebugConsole:
-    def __init__(self, workspace_path: str):
+    def __init__(self, workspace_path: str, config: Optional[DebugConfig] = None):
         self.workspace_path = workspace_path
         self.debug_dir = os.path.join(workspace_path, '.crewai_debug')
         self.event_log_path = os.path.join(self.debug_dir, 'event_log.jsonl')
+        self.blob_dir = os.path.join(self.debug_dir, 'blobs')
         self.subscribers = []
+        self.config = config or DebugConfig()
+        self.stats = EventStats()
+        self.recent_events: deque = deque(maxlen=TAIL_CACHE_SIZE)
         self._setup_debug_directory()
 
     def _setup_debug_directory(self) -> None:
         """Create debug directory if it doesn't exist"""
         os.makedirs(self.debug_dir, exist_ok=True)
+        os.makedirs(self.blob_dir, exist_ok=True)
         if not os.path.exists(self.event_log_path):
             with open(self.event_log_path, 'w', encoding='utf-8') as f:
                 pass  # Create empty file
@@ -39,6 +136,84 @@ class DebugConsole:
         if callback in self.subscribers:
             self.subscribers.remove(callback)
 
+    def configure(self, **updates: Any) -> DebugConfig:
+        """Update verbosity, sampling and truncation settings"""
+        self.config = DebugConfig(**{**self.config.model_dump(), **updates})
+        return self.config
+
+    def _should_record(self, event_type: str, status: str, correlation_id: Optional[str]) -> bool:
+        """Apply level filtering and per-event-type sampling"""
+        level = STATUS_LEVELS.get(status, STATUS_LEVELS['info'])
+        if level < STATUS_LEVELS[self.config.level]:
+            return False
+        # Warnings and errors are never sampled away
+        if level >= STATUS_LEVELS['warning']:
+            return True
+
+        rate = self.config.sampling_rates.get(event_type, 1.0)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        # Sample by correlation id so a trace is kept or dropped as a whole
+        if correlation_id:
+            return zlib.crc32(correlation_id.encode('utf-8')) / 0xFFFFFFFF < rate
+        return random.random() < rate
+
+    async def _truncate_details(self,
+                                details: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Replace oversized details with a preview and a content-addressed blob reference
+
+        Returns:
+            Tuple of the details to log and their JSON encoding when already computed
+        """
+        if self.config.full_fidelity:
+            return details, None
+
+        serialized = _encode_details(details)
+        payload = serialized.encode('utf-8')
+        if len(payload) <= self.config.max_details_bytes:
+            return details, serialized
+
+        digest = hashlib.sha256(payload).hexdigest()
+        blob_path = os.path.join(self.blob_dir, f'{digest}.json')
+        try:
+            if not os.path.exists(blob_path):
+                # Written aside and renamed, so a blob at its digest is always complete
+                fd, temp_path = tempfile.mkstemp(dir=self.blob_dir, prefix='.', suffix='.tmp')
+                os.close(fd)
+                try:
+                    async with aiofiles.open(temp_path, 'wb') as f:
+                        await f.write(payload)
+                    os.replace(temp_path, blob_path)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+        except Exception as e:
+            print(f"Error writing debug blob: {e}")
+            digest = None
+
+        return {
+            'truncated': True,
+            'blob': digest,
+            'size': len(payload),
+            'preview': serialized[:self.config.preview_chars]
+        }, None
+
+    async def get_blob(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Load the full details stored for a truncated event"""
+        if not digest or not BLOB_DIGEST_PATTERN.match(digest):
+            return None
+        blob_path = os.path.join(self.blob_dir, f'{digest}.json')
+        try:
+            async with aiofiles.open(blob_path, 'r', encoding='utf-8') as f:
+                return json.loads(await f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading debug blob: {e}")
+            return None
+
     async def log_event(self, 
                        event_type: str,
                        agent: str,
@@ -47,15 +222,25 @@ class DebugConsole:
                        status: str = 'info',
                        correlation_id: Optional[str] = None) -> None:
         """Log a debug event and notify subscribers"""
+        timestamp = datetime.now().isoformat()
+        # Aggregates see every event, including those sampled out of the log
+        self.stats.record(event_type, agent, action, status, timestamp, correlation_id)
+
+        if not self._should_record(event_type, status, correlation_id):
+            return
+
+        details, details_json = await self._truncate_details(details)
         event = DebugEvent(
-            timestamp=datetime.now().isoformat(),
+            timestamp=timestamp,
             event_type=event_type,
             agent=agent,
             action=action,
             details=details,
             status=status,
-            correlation_id=correlation_id
+            correlation_id=correlation_id,
+            details_json=details_json
         )
+        self.recent_events.append(event)
         
         # Log to file
         await self._write_event(event)
@@ -66,64 +251,49 @@ class DebugConsole:
     async def _write_event(self, event: DebugEvent) -> None:
         """Write event to log file"""
         try:
-            event_dict = {
-                'timestamp': event.timestamp,
-                'event_type': event.event_type,
-                'agent': event.agent,
-                'action': event.action,
-                'details': event.details,
-                'status': event.status,
-                'correlation_id': event.correlation_id
-            }
-            
             async with aiofiles.open(self.event_log_path, 'a', encoding='utf-8') as f:
-                await f.write(json.dumps(event_dict) + '\n')
+                await f.write(event.to_json() + '\n')
         except Exception as e:
             print(f"Error writing debug event: {e}")
 
     async def _notify_subscribers(self, event: DebugEvent) -> None:
         """Notify all subscribers of new event"""
-        event_dict = {
-            'timestamp': event.timestamp,
-            'event_type': event.event_type,
-            'agent': event.agent,
-            'action': event.action,
-            'details': event.details,
-            'status': event.status,
-            'correlation_id': event.correlation_id
-        }
-        
+        if not self.subscribers:
+            return
+
+        event_dict = event.to_dict()
         for callback in self.subscribers:
             try:
                 await callback(event_dict)
             except Exception as e:
                 print(f"Error notifying subscriber: {e}")
 
+    def get_recent_events(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the most recent events from memory, oldest first"""
+        if limit <= 0:
+            return []
+        events = list(self.recent_events)[-limit:]
+        return [event.to_dict() for event in events]
+
     async def get_events(self,
                         start_time: Optional[str] = None,
                         end_time: Optional[str] = None,
                         event_types: Optional[List[str]] = None,
                         agents: Optional[List[str]] = None,
                         correlation_id: Optional[str] = None,
-                        limit: int = 100) -> List[Dict[str, Any]]:
+                        limit: int = 100,
+                        expand_details: bool = False) -> List[Dict[str, Any]]:
         """Query debug events with filters"""
         events = []
+        event_filter = EventFilter(start_time, end_time, event_types, agents, correlation_id)
         try:
             async with aiofiles.open(self.event_log_path, 'r', encoding='utf-8') as f:
                 async for line in f:
-                    if line.strip():
+                    if line.strip() and event_filter.may_match_line(line):
                         event = json.loads(line)
                         
                         # Apply filters
-                        if start_time and event['timestamp'] < start_time:
-                            continue
-                        if end_time and event['timestamp'] > end_time:
-                            continue
-                        if event_types and event['event_type'] not in event_types:
-                            continue
-                        if agents and event['agent'] not in agents:
-                            continue
-                        if correlation_id and event['correlation_id'] != correlation_id:
+                        if not event_filter.matches(event):
                             continue
                         
                         events.append(event)
@@ -133,14 +303,88 @@ class DebugConsole:
                             
         except Exception as e:
             print(f"Error reading debug events: {e}")
+
+        if expand_details:
+            for event in events:
+                details = event.get('details')
+                if isinstance(details, dict) and details.get('truncated'):
+                    full_details = await self.get_blob(details.get('blob'))
+                    if full_details is not None:
+                        event['details'] = full_details
             
         return events
 
+    async def get_trace(self, correlation_id: str, format: str = 'tree') -> Dict[str, Any]:
+        """Assemble the events of one correlation id into timed spans
+
+        Args:
+            correlation_id: Correlation id shared by the events of a request
+            format: 'tree' for nested spans or 'chrome' for Chrome trace JSON
+
+        Returns:
+            Dict containing the span tree or Chrome trace events
+        """
+        events = await self.get_events(correlation_id=correlation_id, limit=TRACE_EVENT_LIMIT)
+        builder = TraceBuilder(events)
+        if format == 'chrome':
+            return builder.to_chrome_trace()
+        return builder.to_dict()
+
+    def get_stats(self, windows: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get rolling counts, error rates and duration percentiles per window"""
+        return self.stats.snapshot(windows)
+
+    def get_log_segments(self) -> List[str]:
+        """Event log segments in the debug directory, oldest first"""
+        segments = [
+            os.path.join(self.debug_dir, name) for name in os.listdir(self.debug_dir)
+            if name.startswith('event_log') and name.endswith('.jsonl')
+            and name != os.path.basename(self.event_log_path)
+        ]
+        segments.sort(key=os.path.getmtime)
+        return segments + [self.event_log_path]
+
+    async def export_events(self,
+                            format: Optional[str] = None,
+                            start_time: Optional[str] = None,
+                            end_time: Optional[str] = None,
+                            event_types: Optional[List[str]] = None,
+                            agents: Optional[List[str]] = None,
+                            correlation_id: Optional[str] = None) -> Dict[str, Any]:
+        """Export filtered events to a columnar file under .crewai_debug/exports
+
+        Args:
+            format: 'parquet', 'arrow' or 'binary' (Parquet when pyarrow is available)
+            start_time, end_time, event_types, agents, correlation_id: get_events filters
+
+        Returns:
+            Dict with the output path, format, row count and file size
+        """
+        format = format or default_format()
+        if format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unknown export format: {format}")
+
+        export_dir = os.path.join(self.debug_dir, 'exports')
+        os.makedirs(export_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        output_path = os.path.join(export_dir, f'event_log-{stamp}{FORMAT_EXTENSIONS[format]}')
+        event_filter = EventFilter(start_time, end_time, event_types, agents, correlation_id)
+
+        # The export scans whole log files, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, export_events, self.get_log_segments(), output_path, format, event_filter
+        )
+
     def clear_logs(self) -> None:
         """Clear all debug logs"""
         try:
             with open(self.event_log_path, 'w', encoding='utf-8') as f:
                 pass  # Truncate file
+            self.stats.reset()
+            self.recent_events.clear()
+            shutil.rmtree(self.blob_dir, ignore_errors=True)
+            os.makedirs(self.blob_dir, exist_ok=True)
         except Exception as e:
             print(f"Error clearing debug logs: {e}")
 
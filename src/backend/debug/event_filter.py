@@ -0,0 +1,48 @@
+"""
+Filters shared by debug event queries and exports.
+"""
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass
+
+TIMESTAMP_PREFIX = '{"timestamp": "'
+
+@dataclass
+class EventFilter:
+    """get_events-style filter over serialized debug events"""
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    event_types: Optional[List[str]] = None
+    agents: Optional[List[str]] = None
+    correlation_id: Optional[str] = None
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        """Check a parsed event against all filters"""
+        if self.start_time and event['timestamp'] < self.start_time:
+            return False
+        if self.end_time and event['timestamp'] > self.end_time:
+            return False
+        if self.event_types and event['event_type'] not in self.event_types:
+            return False
+        if self.agents and event['agent'] not in self.agents:
+            return False
+        if self.correlation_id and event['correlation_id'] != self.correlation_id:
+            return False
+        return True
+
+    def may_match_line(self, line: str) -> bool:
+        """Cheap pre-check on a raw log line, before it is parsed
+
+        Lines written by DebugConsole start with the timestamp, so time ranges
+        are checked without decoding JSON. False means the line cannot match;
+        True means it has to be parsed and checked with matches().
+        """
+        if self.correlation_id and self.correlation_id not in line:
+            return False
+        if (self.start_time or self.end_time) and line.startswith(TIMESTAMP_PREFIX):
+            end = line.find('"', len(TIMESTAMP_PREFIX))
+            timestamp = line[len(TIMESTAMP_PREFIX):end]
+            if self.start_time and timestamp < self.start_time:
+                return False
+            if self.end_time and timestamp > self.end_time:
+                return False
+        return True
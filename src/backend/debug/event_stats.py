@@ -0,0 +1,166 @@
+"""
+Rolling aggregate statistics over debug events.
+
+Counts, error rates and duration percentiles are kept in fixed-size time
+buckets per agent, event type and agent action, so window queries merge a
+bounded number of buckets instead of rescanning the event log.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict, deque
+from datetime import datetime
+import random
+import time
+from .trace_builder import START_EVENTS, END_EVENTS, RESPONSE_SUFFIX
+
+# Reported windows, in seconds
+WINDOWS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600
+}
+
+BUCKET_SECONDS = 5
+MAX_DURATIONS_PER_BUCKET = 256
+MAX_PENDING_SPANS = 10000
+PERCENTILES = (50, 95, 99)
+
+class _Bucket:
+    """Aggregates for one time bucket"""
+    __slots__ = ('start', 'count', 'completed', 'errors', 'durations', 'seen_durations')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.count = 0
+        self.completed = 0
+        self.errors = 0
+        self.durations: List[float] = []
+        self.seen_durations = 0
+
+    def add_duration(self, duration_ms: float) -> None:
+        """Add a duration sample, reservoir-sampling once the bucket is full"""
+        self.seen_durations += 1
+        if len(self.durations) < MAX_DURATIONS_PER_BUCKET:
+            self.durations.append(duration_ms)
+            return
+        index = random.randrange(self.seen_durations)
+        if index < MAX_DURATIONS_PER_BUCKET:
+            self.durations[index] = duration_ms
+
+class EventStats:
+    """Incrementally maintained event counts, error rates and durations"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], deque] = {}
+        self._pending: 'OrderedDict[Tuple, datetime]' = OrderedDict()
+
+    def record(self,
+               event_type: str,
+               agent: str,
+               action: str,
+               status: str,
+               timestamp: str,
+               correlation_id: Optional[str] = None,
+               now: Optional[float] = None) -> None:
+        """Update aggregates with one event"""
+        now = time.time() if now is None else now
+        bucket_start = int(now) - int(now) % BUCKET_SECONDS
+        is_error = status == 'error' or event_type.endswith('_error')
+        # Error rates are over outcomes, so span starts do not dilute them
+        is_outcome = is_error or event_type in END_EVENTS
+        duration_ms = self._track_duration(event_type, agent, action, timestamp, correlation_id)
+
+        for key in (('agent', agent), ('event_type', event_type), ('action', f'{agent}.{action}')):
+            bucket = self._bucket(key, bucket_start, now)
+            bucket.count += 1
+            if is_outcome:
+                bucket.completed += 1
+            if is_error:
+                bucket.errors += 1
+            if duration_ms is not None and key[0] != 'event_type':
+                bucket.add_duration(duration_ms)
+
+    def _track_duration(self,
+                        event_type: str,
+                        agent: str,
+                        action: str,
+                        timestamp: str,
+                        correlation_id: Optional[str]) -> Optional[float]:
+        """Remember span starts and return the duration when a span completes"""
+        if event_type in START_EVENTS:
+            key = (correlation_id, START_EVENTS[event_type], agent, action)
+            self._pending[key] = datetime.fromisoformat(timestamp)
+            if len(self._pending) > MAX_PENDING_SPANS:
+                self._pending.popitem(last=False)
+            return None
+
+        if event_type in END_EVENTS:
+            kind = END_EVENTS[event_type]
+            if kind == 'message' and action.endswith(RESPONSE_SUFFIX):
+                action = action[:-len(RESPONSE_SUFFIX)]
+            started = self._pending.pop((correlation_id, kind, agent, action), None)
+            if started is not None:
+                return (datetime.fromisoformat(timestamp) - started).total_seconds() * 1000
+        return None
+
+    def _bucket(self, key: Tuple[str, str], bucket_start: int, now: float) -> _Bucket:
+        """Return the current bucket for a series, dropping expired buckets"""
+        series = self._series.setdefault(key, deque())
+        horizon = now - max(WINDOWS.values())
+        while series and series[0].start + BUCKET_SECONDS <= horizon:
+            series.popleft()
+        if not series or series[-1].start != bucket_start:
+            series.append(_Bucket(bucket_start))
+        return series[-1]
+
+    def snapshot(self,
+                 windows: Optional[List[str]] = None,
+                 now: Optional[float] = None) -> Dict[str, Any]:
+        """Aggregate buckets into per-window statistics
+
+        Args:
+            windows: Window names to report (defaults to all of WINDOWS)
+            now: Reference time in seconds since the epoch
+
+        Returns:
+            Dict mapping window -> dimension -> key -> statistics
+        """
+        now = time.time() if now is None else now
+        result: Dict[str, Any] = {}
+        for window in windows or list(WINDOWS):
+            if window not in WINDOWS:
+                raise ValueError(f"Unknown stats window: {window}")
+            since = now - WINDOWS[window]
+            dimensions: Dict[str, Dict[str, Any]] = {}
+            for (dimension, key), series in self._series.items():
+                buckets = [b for b in series if b.start + BUCKET_SECONDS > since]
+                count = sum(b.count for b in buckets)
+                if not count:
+                    continue
+                completed = sum(b.completed for b in buckets)
+                errors = sum(b.errors for b in buckets)
+                durations = sorted(d for b in buckets for d in b.durations)
+                dimensions.setdefault(dimension, {})[key] = {
+                    'count': count,
+                    'errors': errors,
+                    'error_rate': errors / completed if completed else None,
+                    **self._percentiles(durations)
+                }
+            result[window] = dimensions
+        return result
+
+    @staticmethod
+    def _percentiles(durations: List[float]) -> Dict[str, Optional[float]]:
+        """Nearest-rank percentiles of sorted durations"""
+        values: Dict[str, Optional[float]] = {}
+        for p in PERCENTILES:
+            if durations:
+                index = min(len(durations) - 1, max(0, -(-p * len(durations) // 100) - 1))
+                values[f'p{p}_ms'] = durations[index]
+            else:
+                values[f'p{p}_ms'] = None
+        return values
+
+    def reset(self) -> None:
+        """Drop all aggregates"""
+        self._series.clear()
+        self._pending.clear()
@@ -0,0 +1,200 @@
+"""
+Trace assembly for debug events sharing a correlation id.
+
+Start and completion events are paired into spans, and spans are nested by
+time containment so a request reads as message -> prompt analysis ->
+supervisor -> crew tasks -> tool calls.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+
+# Event types opening a span, mapped to the span kind
+START_EVENTS = {
+    'message_received': 'message',
+    'task_start': 'task',
+    'tool_start': 'tool'
+}
+
+# Event types closing a span, mapped to the span kind
+END_EVENTS = {
+    'message_sent': 'message',
+    'task_complete': 'task',
+    'task_error': 'task',
+    'tool_complete': 'tool',
+    'tool_error': 'tool'
+}
+
+RESPONSE_SUFFIX = '_response'
+
+@dataclass
+class TraceSpan:
+    """A timed unit of work assembled from a start and a completion event"""
+    span_id: int
+    kind: str
+    agent: str
+    action: str
+    start: datetime
+    end: Optional[datetime] = None
+    status: str = 'open'
+    parent_id: Optional[int] = None
+    children: List['TraceSpan'] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        """Span duration in milliseconds, None while the span is open"""
+        if self.end is None:
+            return None
+        return (self.end - self.start).total_seconds() * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert span and its children to a JSON-serializable dict"""
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'kind': self.kind,
+            'agent': self.agent,
+            'action': self.action,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat() if self.end else None,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'children': [child.to_dict() for child in self.children]
+        }
+
+class TraceBuilder:
+    """Builds span trees from debug events of one correlation id"""
+
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.events = sorted(events, key=lambda e: e['timestamp'])
+        self.spans: List[TraceSpan] = []
+        self.unmatched: List[Dict[str, Any]] = []
+        self._pair_events()
+        self.roots = self._nest_spans()
+
+    def _span_key(self, kind: str, event: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Key used to match a completion event to its start event"""
+        action = event['action']
+        if kind == 'message' and action.endswith(RESPONSE_SUFFIX):
+            action = action[:-len(RESPONSE_SUFFIX)]
+        return kind, event['agent'], action
+
+    def _pair_events(self) -> None:
+        """Pair start and completion events into spans"""
+        open_spans: Dict[Tuple[str, str, str], List[TraceSpan]] = {}
+        open_order: List[TraceSpan] = []
+
+        for event in self.events:
+            event_type = event['event_type']
+            if event_type in START_EVENTS:
+                kind = START_EVENTS[event_type]
+                key = self._span_key(kind, event)
+                span = TraceSpan(
+                    span_id=len(self.spans),
+                    kind=kind,
+                    agent=key[1],
+                    action=key[2],
+                    start=datetime.fromisoformat(event['timestamp'])
+                )
+                self.spans.append(span)
+                open_spans.setdefault(key, []).append(span)
+                open_order.append(span)
+            elif event_type in END_EVENTS:
+                kind = END_EVENTS[event_type]
+                stack = open_spans.get(self._span_key(kind, event))
+                if stack:
+                    span = stack.pop()
+                elif event.get('status') == 'error':
+                    # Errors are often reported by the caller rather than the span owner,
+                    # so they close the innermost open span of the same kind
+                    span = next((s for s in reversed(open_order) if s.kind == kind), None)
+                    if span is not None:
+                        open_spans[(span.kind, span.agent, span.action)].remove(span)
+                else:
+                    span = None
+
+                if span is None:
+                    self.unmatched.append(event)
+                    continue
+                open_order.remove(span)
+                span.end = datetime.fromisoformat(event['timestamp'])
+                span.status = 'error' if event_type.endswith('_error') else event.get('status', 'info')
+            else:
+                self.unmatched.append(event)
+
+    def _nest_spans(self) -> List[TraceSpan]:
+        """Nest spans by time containment and return the root spans"""
+        roots: List[TraceSpan] = []
+        stack: List[TraceSpan] = []
+        far_future = datetime.max
+
+        # Parents sort before their children: earlier start first, then longer (open) spans first
+        def order(span: TraceSpan) -> Tuple[datetime, float]:
+            return span.start, -(span.duration_ms if span.end else float('inf'))
+
+        for span in sorted(self.spans, key=order):
+            span_end = span.end or far_future
+            while stack and (stack[-1].end or far_future) < span_end:
+                stack.pop()
+            if stack:
+                span.parent_id = stack[-1].span_id
+                stack[-1].children.append(span)
+            else:
+                roots.append(span)
+            stack.append(span)
+        return roots
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span tree with total duration and unmatched events"""
+        closed = [s for s in self.spans if s.end is not None]
+        total_ms = None
+        if closed:
+            total_ms = (max(s.end for s in closed) - min(s.start for s in self.spans)
+                        ).total_seconds() * 1000
+        return {
+            'spans': [root.to_dict() for root in self.roots],
+            'span_count': len(self.spans),
+            'total_duration_ms': total_ms,
+            'unmatched_events': self.unmatched
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export spans in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        if not self.events:
+            return {'traceEvents': [], 'displayTimeUnit': 'ms'}
+
+        origin = datetime.fromisoformat(self.events[0]['timestamp'])
+
+        def micros(moment: datetime) -> float:
+            return (moment - origin).total_seconds() * 1_000_000
+
+        trace_events = []
+        for span in self.spans:
+            trace_event = {
+                'name': f'{span.agent}.{span.action}',
+                'cat': span.kind,
+                'ts': micros(span.start),
+                'pid': 1,
+                'tid': 1,
+                'args': {'status': span.status, 'span_id': span.span_id}
+            }
+            if span.end is None:
+                trace_event['ph'] = 'B'
+            else:
+                trace_event['ph'] = 'X'
+                trace_event['dur'] = micros(span.end) - micros(span.start)
+            trace_events.append(trace_event)
+
+        for event in self.unmatched:
+            trace_events.append({
+                'name': f"{event['agent']}.{event['action']}",
+                'cat': event['event_type'],
+                'ph': 'i',
+                's': 't',
+                'ts': micros(datetime.fromisoformat(event['timestamp'])),
+                'pid': 1,
+                'tid': 1,
+                'args': {'status': event.get('status')}
+            })
+
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
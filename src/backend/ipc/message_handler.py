@@ -1,13 +1,49 @@
 import json
 from typing import Dict, Any, Callable, Set, Optional
 import asyncio
+import inspect
+import logging
 import websockets
 
 from ..agents.prompt_agent import PromptAgent
 from ..agents.supervisor_agent import SupervisorAgent
 from ..llm.providers import LLMProviderConfig
 from ..debug.debug_console import DebugConsole, WebSocketSubscriber
-from ..modes.mode_manager import ModeManager
+from ..debug.columnar_export import ExportError
+from ..modes.mode_manager import AgentMode, ModeManager
+from ..tools.file_operations import FileOperations
+from ..tools.async_file_operations import AsyncFileOperations
+
+logger = logging.getLogger(__name__)
+
+# FileOperations methods exposed through tool_request
+FILE_TOOLS = (
+    'read_file',
+    'read_files',
+    'create_file',
+    'edit_file',
+    'list_files',
+    'delete_file',
+    'rename_file',
+    'copy_file',
+    'get_file_info',
+    'stat_files',
+    'search',
+    'find_symbol',
+    'find_symbols',
+    'get_file_symbols',
+    'find_dependents',
+    'find_affected_tests',
+    'workspace_fingerprint',
+    'changed_since',
+    'create_directory',
+    'flush_writes',
+    'begin_overlay',
+    'get_overlay_status',
+    'commit_overlay',
+    'discard_overlay',
+    'get_read_cache_stats'
+)
 
 class MessageHandler:
     def __init__(self, prompt_agent: PromptAgent, supervisor_agent: SupervisorAgent):
@@ -15,6 +51,7 @@ class MessageHandler:
         self.supervisor_agent = supervisor_agent
         self.debug_console = DebugConsole(prompt_agent.project_path)
         self.websocket_subscriber = None
+        self.async_file_ops: Optional[AsyncFileOperations] = None
         self.active_connections: Set[websockets.WebSocketServerProtocol] = set()
         
         self.mode_manager = ModeManager()  # Instantiate ModeManager
@@ -22,6 +59,7 @@ class MessageHandler:
         self.message_handlers: Dict[str, Callable] = {
             'task': self._handle_task,
             'tool_request': self._handle_tool_request,
+            'stream_request': self._handle_stream_request,
             'debug_request': self._handle_debug_request,
             'mode_request': self._handle_mode_request,
             'llm_request': self._handle_llm_request
@@ -47,7 +85,10 @@ class MessageHandler:
             )
             
             handler = self.message_handlers[message_type]
-            response = await handler(data)
+            if message_type == 'stream_request':
+                response = await handler(data, websocket)
+            else:
+                response = await handler(data)
             
             # Log response
             await self.debug_console.log_event(
@@ -124,6 +165,8 @@ class MessageHandler:
                 correlation_id=correlation_id
             )
             
+            await self._begin_task_overlay()
+
             # Forward enhanced task to supervisor
             supervisor_task = self.supervisor_agent.create_task(
                 description=str(enhanced_prompt),
@@ -182,6 +225,17 @@ class MessageHandler:
                 'error': error_msg,
                 'correlation_id': correlation_id
             }
+        finally:
+            # Buffered writes made during the task reach the disk before the next one
+            file_ops = self._get_async_file_ops()
+            if file_ops is not None:
+                try:
+                    flushed = await file_ops.run('flush_writes')
+                    if flushed.get('status') != 'success':
+                        logger.warning(f"Failed to flush buffered writes: {flushed.get('error')}")
+                except Exception as e:
+                    # The task's own result is returned regardless
+                    logger.warning(f"Failed to flush buffered writes: {e}")
 
     async def _handle_tool_request(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle tool execution requests"""
@@ -192,31 +246,20 @@ class MessageHandler:
         if not tool:
             return self._create_error_response('No tool specified')
         
-        file_ops = self.prompt_agent.tools[0]  # Assuming FileOperations is the first tool
-        
-        # Dynamically find the FileOperations tool
-        file_ops = None
-        for tool in self.prompt_agent.tools:
-            if isinstance(tool, FileOperations):
-                file_ops = tool
-                break
+        if tool not in FILE_TOOLS:
+            return self._create_error_response(f'Unknown tool: {tool}')
+
+        # Checked here so client params never clash with run()'s own arguments
+        if not isinstance(params, dict):
+            return self._create_error_response(f'Params for {tool} must be an object')
+        try:
+            inspect.signature(getattr(FileOperations, tool)).bind(None, **params)
+        except TypeError as e:
+            return self._create_error_response(f'Invalid params for {tool}: {e}')
 
+        file_ops = self._get_async_file_ops()
         if file_ops is None:
             return self._create_error_response("FileOperations tool not found")
-
-        tool_mapping = {
-            'read_file': file_ops.read_file,
-            'create_file': file_ops.create_file,
-            'list_files': file_ops.list_files,
-            'delete_file': file_ops.delete_file,
-            'rename_file': file_ops.rename_file,
-            'copy_file': file_ops.copy_file,
-            'get_file_info': file_ops.get_file_info,
-            'create_directory': file_ops.create_directory
-        }
-        
-        if tool not in tool_mapping:
-            return self._create_error_response(f'Unknown tool: {tool}')
             
         try:
             # Log tool request
@@ -228,7 +271,8 @@ class MessageHandler:
                 correlation_id=correlation_id
             )
             
-            result = tool_mapping[tool](**params)
+            # Runs on the file executor so slow disk work never stalls other connections
+            result = await file_ops.run(tool, timeout=data.get('timeout'), **params)
             
             # Log tool completion
             await self.debug_console.log_event(
@@ -257,8 +301,100 @@ class MessageHandler:
                 correlation_id=correlation_id
             )
             
+            if isinstance(e, asyncio.TimeoutError):
+                return self._create_error_response(f'Tool timed out: {tool}')
             return self._create_error_response(f'Tool execution failed: {str(e)}')
 
+    async def _begin_task_overlay(self) -> None:
+        """In ACT mode with use_overlay set, hold the task's file changes for review
+
+        The overlay stays active after the task; the client commits or
+        discards it through tool requests.
+        """
+        if (self.mode_manager.get_current_mode() != AgentMode.ACT
+                or not self.mode_manager.get_mode_config().use_overlay):
+            return
+        file_ops = self._get_file_ops()
+        if file_ops is not None and file_ops.overlay is None:
+            await self._get_async_file_ops().run('begin_overlay')
+
+    async def start_file_services(self) -> None:
+        """Build (or restore) the workspace index and watch the workspace for changes"""
+        file_ops = self._get_async_file_ops()
+        if file_ops is None:
+            return
+        result = await file_ops.run('start_index')
+        if result['status'] != 'success':
+            logger.warning(f"Workspace index unavailable: {result['error']}")
+
+    async def stop_file_services(self) -> None:
+        """Flush buffered writes, stop the workspace index and save the index snapshots"""
+        file_ops = self._get_async_file_ops()
+        if file_ops is None:
+            return
+        result = await file_ops.run('stop_index')
+        if result['status'] != 'success':
+            logger.warning(f"Failed to stop file services cleanly: {result['error']}")
+        file_ops.shutdown()
+        self.async_file_ops = None
+
+    def _get_file_ops(self) -> Optional[FileOperations]:
+        """Find the FileOperations tool among the prompt agent's tools"""
+        for tool in self.prompt_agent.tools:
+            if isinstance(tool, FileOperations):
+                return tool
+        return None
+
+    def _get_async_file_ops(self) -> Optional[AsyncFileOperations]:
+        """Async facade over the FileOperations tool, created on first use"""
+        if self.async_file_ops is None:
+            file_ops = self._get_file_ops()
+            if file_ops is None:
+                return None
+            self.async_file_ops = AsyncFileOperations.shared(file_ops)
+        return self.async_file_ops
+
+    async def _handle_stream_request(self, data: Dict[str, Any], websocket) -> Dict[str, Any]:
+        """Stream a file to the client as 'stream_chunk' messages
+
+        The final 'stream_response' is returned once every chunk has been sent.
+        """
+        file_path = data.get('file_path')
+        params = data.get('params', {})
+        correlation_id = data.get('correlation_id')
+
+        if not file_path:
+            return self._create_error_response('No file_path specified for stream_request')
+
+        file_ops = self._get_async_file_ops()
+        if file_ops is None:
+            return self._create_error_response("FileOperations tool not found")
+
+        chunks = 0
+        total = 0
+        try:
+            async for chunk in file_ops.iterate('iter_file_chunks', file_path=file_path, **params):
+                await websocket.send(json.dumps({
+                    'type': 'stream_chunk',
+                    'index': chunks,
+                    'offset': chunk['offset'],
+                    'content': chunk['content'],
+                    'correlation_id': correlation_id
+                }))
+                chunks += 1
+                total += len(chunk['content'])
+        except (OSError, ValueError) as e:
+            return self._create_error_response(f'Stream failed: {str(e)}')
+
+        return {
+            'type': 'stream_response',
+            'status': 'success',
+            'file_path': file_path,
+            'chunks': chunks,
+            'characters': total,
+            'correlation_id': correlation_id
+        }
+
     async def _handle_debug_request(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle debug-related requests"""
         action = data.get('action')
@@ -272,6 +408,70 @@ class MessageHandler:
                 'events': events,
                 'correlation_id': correlation_id
             }
+        elif action == 'get_recent_events':
+            return {
+                'type': 'debug_response',
+                'events': self.debug_console.get_recent_events(params.get('limit', 100)),
+                'correlation_id': correlation_id
+            }
+        elif action == 'get_stats':
+            try:
+                stats = self.debug_console.get_stats(params.get('windows'))
+            except ValueError as e:
+                return self._create_error_response(str(e))
+            return {
+                'type': 'debug_response',
+                'stats': stats,
+                'correlation_id': correlation_id
+            }
+        elif action == 'get_trace':
+            trace_id = params.get('correlation_id')
+            if not trace_id:
+                return self._create_error_response('correlation_id is required for get_trace')
+            trace = await self.debug_console.get_trace(trace_id, params.get('format', 'tree'))
+            return {
+                'type': 'debug_response',
+                'trace': trace,
+                'correlation_id': correlation_id
+            }
+        elif action == 'export':
+            try:
+                export = await self.debug_console.export_events(**params)
+            except (ValueError, ExportError) as e:
+                return self._create_error_response(f'Debug export failed: {str(e)}')
+            return {
+                'type': 'debug_response',
+                'status': 'success',
+                'export': export,
+                'correlation_id': correlation_id
+            }
+        elif action == 'get_blob':
+            details = await self.debug_console.get_blob(params.get('digest'))
+            if details is None:
+                return self._create_error_response(f"Debug blob not found: {params.get('digest')}")
+            return {
+                'type': 'debug_response',
+                'details': details,
+                'correlation_id': correlation_id
+            }
+        elif action == 'configure':
+            try:
+                config = self.debug_console.configure(**params)
+            except ValueError as e:
+                return self._create_error_response(f'Invalid debug configuration: {str(e)}')
+            return {
+                'type': 'debug_response',
+                'status': 'success',
+                'config': config.model_dump(),
+                'correlation_id': correlation_id
+            }
+        elif action == 'get_tool_timings':
+            file_ops = self._get_async_file_ops()
+            return {
+                'type': 'debug_response',
+                'timings': file_ops.get_timings() if file_ops else {},
+                'correlation_id': correlation_id
+            }
         elif action == 'clear_logs':
             self.debug_console.clear_logs()
             return {
@@ -410,10 +610,14 @@ class WebSocketServer:
 
     async def start(self):
         """Start WebSocket server"""
-        server = await websockets.serve(
-            self.handle_connection,
-            self.host,
-            self.port
-        )
-        print(f"WebSocket server running on ws://{self.host}:{self.port}")
-        await server.wait_closed()
+        await self.message_handler.start_file_services()
+        try:
+            server = await websockets.serve(
+                self.handle_connection,
+                self.host,
+                self.port
+            )
+            print(f"WebSocket server running on ws://{self.host}:{self.port}")
+            await server.wait_closed()
+        finally:
+            await self.message_handler.stop_file_services()
@@ -0,0 +1,121 @@
+"""
+Size limits on an agent's memory and the choice of entries to evict.
+
+An agent's memory ends up in its prompts, so a budget bounds it in
+estimated tokens and in bytes. Once memory exceeds either limit, entries
+are evicted until it is back under target_ratio of the limits, leaving
+headroom so the next few writes do not trigger another pass. Expired
+entries always go first; the policy orders the rest:
+
+    lru         least recently written or recalled first
+    ttl         soonest to expire first, then entries without a time to live
+    importance  lowest importance score first, then least recently used
+
+With summarize set, evicted entries are not dropped but folded into one
+summary entry, written by a summarizer (e.g. one calling an LLM) or by
+default by shortening each entry to its share of summary_tokens.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Literal
+import math
+from pydantic import BaseModel, Field
+
+# Rough characters per token of English text and code
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PREFIX = 'summary:'
+
+# Folds entries into text of at most the given number of tokens
+Summarizer = Callable[[Dict[str, Any], int], str]
+
+class MemoryBudget(BaseModel):
+    """Limits on one agent's memory"""
+    max_tokens: Optional[int] = Field(ge=1, default=None)
+    max_bytes: Optional[int] = Field(ge=1, default=None)
+    policy: Literal['lru', 'ttl', 'importance'] = 'lru'
+    # Fraction of the limits memory is brought down to once it exceeds them
+    target_ratio: float = Field(gt=0.0, le=1.0, default=0.8)
+    # Fold evicted entries into a summary instead of dropping them
+    summarize: bool = False
+    summary_tokens: int = Field(ge=1, default=256)
+
+class EntryInfo(NamedTuple):
+    """Size and usage of one memory entry"""
+    key: str
+    tokens: int
+    bytes: int
+    accessed_at: float
+    expires_at: Optional[float] = None
+    importance: float = 0.0
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens a text takes in a prompt"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """A text cut to at most about max_tokens tokens"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:max(0, limit - 1)] + '…'
+
+def eviction_order(entries: List[EntryInfo], policy: str, now: float) -> List[EntryInfo]:
+    """Entries in the order a policy evicts them, expired ones first"""
+    def rank(entry: EntryInfo):
+        expired = entry.expires_at is not None and entry.expires_at <= now
+        if policy == 'ttl':
+            primary = entry.expires_at if entry.expires_at is not None else math.inf
+        elif policy == 'importance':
+            primary = entry.importance
+        else:
+            primary = 0.0
+        return (not expired, primary, entry.accessed_at, entry.key)
+    return sorted(entries, key=rank)
+
+def summary_limit(budget: MemoryBudget) -> int:
+    """Tokens a summary may take: summary_tokens, but at most half the target"""
+    limit = budget.summary_tokens
+    if budget.max_tokens is not None:
+        limit = min(limit, int(budget.max_tokens * budget.target_ratio) // 2)
+    if budget.max_bytes is not None:
+        limit = min(limit, int(budget.max_bytes * budget.target_ratio) // (2 * CHARS_PER_TOKEN))
+    return limit
+
+def exceeds(budget: MemoryBudget, tokens: int, size: int) -> bool:
+    """Whether memory of a size is over either limit"""
+    return ((budget.max_tokens is not None and tokens > budget.max_tokens)
+            or (budget.max_bytes is not None and size > budget.max_bytes))
+
+def select_evictions(budget: MemoryBudget,
+                     entries: List[EntryInfo],
+                     now: float,
+                     reserve_tokens: int = 0) -> List[EntryInfo]:
+    """Entries to evict so memory fits the budget, in eviction order
+
+    Nothing is evicted while memory is within the limits. Otherwise entries
+    go until it is within target_ratio of them, with room left for
+    reserve_tokens more (e.g. a summary of the evicted entries).
+    """
+    tokens = sum(entry.tokens for entry in entries)
+    size = sum(entry.bytes for entry in entries)
+    if not exceeds(budget, tokens, size):
+        return []
+
+    target_tokens = (budget.max_tokens * budget.target_ratio - reserve_tokens
+                     if budget.max_tokens is not None else math.inf)
+    target_bytes = (budget.max_bytes * budget.target_ratio - reserve_tokens * CHARS_PER_TOKEN
+                    if budget.max_bytes is not None else math.inf)
+    victims = []
+    for entry in eviction_order(entries, budget.policy, now):
+        if tokens <= target_tokens and size <= target_bytes:
+            break
+        victims.append(entry)
+        tokens -= entry.tokens
+        size -= entry.bytes
+    return victims
+
+def fold_entries(entries: Dict[str, Any], max_tokens: int) -> str:
+    """Default summarizer: one line per entry, each shortened to an equal share"""
+    lines = []
+    share = max(1, max_tokens // max(1, len(entries)))
+    for key, value in entries.items():
+        text = value if isinstance(value, str) else repr(value)
+        lines.append(truncate_to_tokens(f'{key}: {" ".join(text.split())}', share))
+    return truncate_to_tokens('\n'.join(lines), max_tokens)
@@ -0,0 +1,39 @@
+"""
+Reader for the append-only memory logs written by earlier versions.
+
+Each line is one record, with tab-separated JSON fields:
+
+    set<TAB>"key"<TAB>value
+    del<TAB>"key"
+
+JSON never contains raw tabs or newlines, so a line splits without parsing
+its value. Agent memory now lives in the SQLite store (memory_store), which
+imports these logs once and removes them; nothing writes them any more.
+"""
+from typing import Any, Dict
+import json
+
+LOG_SUFFIX = '.log'
+
+def encode(value: Any) -> str:
+    """Compact JSON of a memory value"""
+    return json.dumps(value, separators=(',', ':'))
+
+def read_log(path: str) -> Dict[str, str]:
+    """Live entries of a memory log, as key -> encoded value
+
+    A crash can leave a partial last record; it is ignored.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    entries: Dict[str, str] = {}
+    complete = data.rfind(b'\n') + 1
+    for line in data[:complete].decode('utf-8').splitlines():
+        if not line:
+            continue
+        fields = line.split('\t', 2)
+        if fields[0] == 'set':
+            entries[json.loads(fields[1])] = fields[2]
+        elif fields[0] == 'del':
+            entries.pop(json.loads(fields[1]), None)
+    return entries
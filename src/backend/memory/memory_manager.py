@@ -1,29 +1,511 @@
+import atexit
+import copy
 import json
+import logging
 import os
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from .memory_budget import (SUMMARY_PREFIX, EntryInfo, MemoryBudget, Summarizer,
+                            estimate_tokens, fold_entries, select_evictions, summary_limit,
+                            truncate_to_tokens)
+from .memory_log import encode
+from .memory_store import DATABASE_NAME, MemoryStore
+from .semantic_index import DEFAULT_DIMENSIONS, Encoder, SemanticIndex
+
+logger = logging.getLogger(__name__)
+
+# Seconds without new writes before dirty memory is flushed
+FLUSH_DELAY = 1.0
+
+# Longest time memory stays dirty while writes keep coming
+MAX_FLUSH_DELAY = 5.0
+
+def _entry_text(key: str, value: Any) -> str:
+    """Text a memory entry is indexed by: its key and its value"""
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return f'{key} {text}'
+
+def _entry_size(key: str, value: Any) -> Tuple[int, int]:
+    """Estimated tokens and stored bytes of a memory entry"""
+    return (estimate_tokens(_entry_text(key, value)),
+            len(key.encode('utf-8')) + len(encode(value).encode('utf-8')))
+
+def _summary_key(memory: Dict[str, Any]) -> str:
+    """A key for a new summary entry, named after the current time"""
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+    key = f'{SUMMARY_PREFIX}{stamp}'
+    suffix = 1
+    while key in memory:
+        suffix += 1
+        key = f'{SUMMARY_PREFIX}{stamp}-{suffix}'
+    return key
 
 class MemoryManager:
-    def __init__(self, project_path: str):
+    """Per-agent memory stored in one SQLite database in .crewai_memories
+
+    Each agent's memory is a namespace of keys in the shared store, written
+    key by key in transactions, so concurrent tasks and processes saving the
+    same agent's memory do not lose each other's changes. Keys can be given
+    a time to live, after which they are no longer loaded. Memories saved as
+    JSON files or logs by earlier versions are imported on startup.
+
+    Memory is cached decoded in memory. Writes update the cache and are
+    flushed to the store in the background once no write came for flush_delay
+    seconds (at the latest after max_flush_delay), on flush() and at exit.
+    With flush_delay None every write goes to disk immediately. A load costs
+    one indexed lookup of the agent's version, to pick up writes made by
+    other processes.
+
+    recall() finds the entries most relevant to a query, so agents can put
+    only those into a prompt. Entries are embedded locally with hashed
+    TF-IDF, or with a local model passed as encoder (whose vectors must have
+    dimensions entries).
+
+    A budget (one for all agents, or per agent with set_budget) bounds an
+    agent's memory in estimated tokens and bytes. Once writes settle, the
+    background flusher evicts entries of agents over budget, optionally
+    folding them into a summary written by summarizer; enforce_budget does
+    the same on demand (and is the only way without a flush delay).
+    """
+
+    def __init__(self,
+                 project_path: str,
+                 flush_delay: Optional[float] = FLUSH_DELAY,
+                 max_flush_delay: float = MAX_FLUSH_DELAY,
+                 encoder: Optional[Encoder] = None,
+                 dimensions: int = DEFAULT_DIMENSIONS,
+                 budget: Optional[MemoryBudget] = None,
+                 summarizer: Optional[Summarizer] = None):
         self.memory_dir = os.path.join(project_path, ".crewai_memories")
         os.makedirs(self.memory_dir, exist_ok=True)
+        self.store = MemoryStore(os.path.join(self.memory_dir, DATABASE_NAME))
+        for agent_name in self.store.migrate(self.memory_dir):
+            logger.info(f"Imported memory of agent {agent_name} into {DATABASE_NAME}")
+        self.flush_delay = flush_delay
+        self.max_flush_delay = max_flush_delay
+        self.encoder = encoder
+        self.dimensions = dimensions
+        self.budget = budget
+        self.summarizer = summarizer
+        self._budgets: Dict[str, Optional[MemoryBudget]] = {}
+        self._agent_locks: Dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        # agent -> decoded memory, including unflushed writes
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        # agent -> store version the cache was loaded from
+        self._versions: Dict[str, int] = {}
+        # agent -> key -> expiry time, for cached keys that expire
+        self._expiries: Dict[str, Dict[str, float]] = {}
+        # agent -> search index over the cached memory, built on first recall
+        self._indexes: Dict[str, SemanticIndex] = {}
+        # agent -> key -> time it was last recalled, not yet recorded in the store
+        self._accessed: Dict[str, Dict[str, float]] = {}
+        # agent -> (values, expiry times and importance to set, keys to delete) not yet flushed
+        self._pending: Dict[str, Tuple[Dict[str, Tuple[Any, Optional[float], Optional[float]]],
+                                       Set[str]]] = {}
+        # agents written since their memory was last checked against its budget
+        self._unchecked: Set[str] = set()
+        self._flush_cond = threading.Condition()
+        self._first_dirty = 0.0
+        self._last_write = 0.0
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'flushes': 0,
+            'flushed_records': 0,
+            'flush_errors': 0,
+            'flush_ms_total': 0.0,
+            'flush_ms_max': 0.0,
+            'flush_ms_last': 0.0,
+            'evicted': 0,
+            'summaries': 0
+        }
+        atexit.register(self.close)
+
+    def agent_lock(self, agent_name: str) -> threading.RLock:
+        """Lock serialising access to one agent's memory
+
+        Hold it around a load_memory / save_memory pair so concurrent tasks
+        of the same agent do not overwrite each other's changes.
+        """
+        with self._lock:
+            return self._agent_locks.setdefault(agent_name, threading.RLock())
+
+    def _cached(self, agent_name: str, count: bool = True) -> Dict[str, Any]:
+        """The agent's memory from the cache, reloaded if the store changed (agent lock held)"""
+        memory = self._cache.get(agent_name)
+        version = self.store.version(agent_name)
+        if memory is None or version != self._versions.get(agent_name):
+            memory, expiries, version = self.store.load(agent_name)
+            with self._flush_cond:
+                values, deleted = self._pending.get(agent_name, ({}, set()))
+            for key in deleted:
+                memory.pop(key, None)
+                expiries.pop(key, None)
+            for key, (value, expires_at, _) in values.items():
+                memory[key] = copy.deepcopy(value)
+                expiries.pop(key, None)
+                if expires_at is not None:
+                    expiries[key] = expires_at
+            self._cache[agent_name] = memory
+            self._versions[agent_name] = version
+            self._expiries[agent_name] = expiries
+            self._indexes.pop(agent_name, None)
+            if count:
+                self._stats['misses'] += 1
+        elif count:
+            self._stats['hits'] += 1
+        self._expire(agent_name, memory)
+        return memory
+
+    def _expire(self, agent_name: str, memory: Dict[str, Any]) -> None:
+        """Drop cached keys whose time to live ran out (agent lock held)
+
+        The store no longer loads them; deleting them there is left to
+        compact_memory.
+        """
+        expiries = self._expiries.get(agent_name)
+        if not expiries:
+            return
+        now = time.time()
+        expired = [key for key, expires_at in expiries.items() if expires_at <= now]
+        for key in expired:
+            del expiries[key]
+            memory.pop(key, None)
+        index = self._indexes.get(agent_name)
+        if index is not None and expired:
+            index.remove(expired)
+
+    def _stage(self,
+               agent_name: str,
+               values: Dict[str, Any],
+               deleted: Iterable[str],
+               ttl: Optional[float] = None,
+               importance: Optional[float] = None) -> None:
+        """Apply a write to the cache and queue it for flushing (agent lock held)"""
+        memory = self._cache[agent_name]
+        expiries = self._expiries.setdefault(agent_name, {})
+        deleted = [key for key in deleted if key in memory and key not in values]
+        if not values and not deleted:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        for key in deleted:
+            del memory[key]
+            expiries.pop(key, None)
+        memory.update(values)
+        for key in values:
+            expiries.pop(key, None)
+            if expires_at is not None:
+                expiries[key] = expires_at
+        index = self._indexes.get(agent_name)
+        if index is not None:
+            index.remove(deleted)
+            index.upsert({key: _entry_text(key, value) for key, value in values.items()})
+
+        with self._flush_cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_dirty = now
+            self._last_write = now
+            pending_values, pending_deleted = self._pending.setdefault(agent_name, ({}, set()))
+            for key in deleted:
+                pending_values.pop(key, None)
+                pending_deleted.add(key)
+            pending_deleted.difference_update(values)
+            pending_values.update((key, (copy.deepcopy(value), expires_at, importance))
+                                  for key, value in values.items())
+            self._unchecked.add(agent_name)
+            if self.flush_delay is not None:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop,
+                                                     name='memory-flush', daemon=True)
+                    self._flusher.start()
+                self._flush_cond.notify()
+        if self.flush_delay is None:
+            self._flush_agent(agent_name)
+
+    def save_memory(self, agent_name: str, memory: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Save agent memory; only keys that changed are written
+
+        Args:
+            agent_name: Agent whose memory to save
+            memory: The agent's complete memory
+            ttl: Seconds until the saved keys expire (all of them, not only
+                the changed ones); None keeps them until deleted
+        """
+        with self.agent_lock(agent_name):
+            cached = self._cached(agent_name, count=False)
+            values = {key: copy.deepcopy(value) for key, value in memory.items()
+                      if ttl is not None or key not in cached or cached[key] != value}
+            self._stage(agent_name, values, [key for key in cached if key not in memory], ttl)
+
+    def update_memory(self,
+                      agent_name: str,
+                      updates: Dict[str, Any],
+                      deleted: Optional[Iterable[str]] = None,
+                      ttl: Optional[float] = None,
+                      importance: Optional[float] = None) -> None:
+        """Set and delete individual keys of agent memory
 
-    def save_memory(self, agent_name: str, memory: Dict[str, Any]) -> None:
-        """Save agent memory to file"""
-        memory_file = os.path.join(self.memory_dir, f"{agent_name}.json")
-        with open(memory_file, 'w', encoding='utf-8') as f:
-            json.dump(memory, f, indent=2)
+        Args:
+            agent_name: Agent whose memory to change
+            updates: Keys to set
+            deleted: Keys to delete
+            ttl: Seconds until the set keys expire; None keeps them until deleted
+            importance: Score of the set keys for the 'importance' eviction
+                policy (higher is kept longer); None keeps their current score
+        """
+        with self.agent_lock(agent_name):
+            self._cached(agent_name, count=False)
+            self._stage(agent_name, copy.deepcopy(updates), deleted or (), ttl, importance)
 
     def load_memory(self, agent_name: str) -> Dict[str, Any]:
-        """Load agent memory from file"""
-        memory_file = os.path.join(self.memory_dir, f"{agent_name}.json")
-        if not os.path.exists(memory_file):
-            return {}
-        
-        with open(memory_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load agent memory"""
+        with self.agent_lock(agent_name):
+            # A copy, so callers changing it cannot bypass save_memory
+            return copy.deepcopy(self._cached(agent_name))
+
+    def recall(self, agent_name: str, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """The k memory entries most relevant to a query, best first
+
+        Returns:
+            Dicts with the entry's 'key', 'value' and similarity 'score'
+        """
+        with self.agent_lock(agent_name):
+            memory = self._cached(agent_name)
+            index = self._indexes.get(agent_name)
+            if index is None:
+                index = SemanticIndex(self.dimensions, self.encoder)
+                index.upsert({key: _entry_text(key, value) for key, value in memory.items()})
+                self._indexes[agent_name] = index
+            results = [{'key': key, 'value': copy.deepcopy(memory[key]), 'score': score}
+                       for key, score in index.search(query, k)]
+            # Recalled entries count as used for LRU eviction
+            now = time.time()
+            self._accessed.setdefault(agent_name, {}).update(
+                (result['key'], now) for result in results)
+            return results
+
+    def list_agents(self) -> List[str]:
+        """Agents with memory, stored or not yet flushed"""
+        with self._flush_cond:
+            pending = set(self._pending)
+        return sorted(set(self.store.agents()) | pending)
+
+    # Budgets
+
+    def get_budget(self, agent_name: str) -> Optional[MemoryBudget]:
+        """The budget an agent's memory is held to, if any"""
+        return self._budgets.get(agent_name, self.budget)
+
+    def set_budget(self, agent_name: str, budget: Optional[MemoryBudget]) -> None:
+        """Give one agent its own budget (None for no limit)"""
+        self._budgets[agent_name] = budget
+        with self._flush_cond:
+            self._unchecked.add(agent_name)
+
+    def _entry_infos(self, agent_name: str, memory: Dict[str, Any]) -> List[EntryInfo]:
+        """Size and usage of each entry, with the store up to date (agent lock held)"""
+        self._flush_agent(agent_name)
+        self.store.touch(agent_name, self._accessed.pop(agent_name, {}))
+        metadata = self.store.metadata(agent_name)
+        now = time.time()
+        infos = []
+        for key, value in memory.items():
+            accessed_at, expires_at, importance = metadata.get(key, (now, None, 0.0))
+            tokens, size = _entry_size(key, value)
+            infos.append(EntryInfo(key=key,
+                                   tokens=tokens,
+                                   bytes=size,
+                                   accessed_at=accessed_at,
+                                   expires_at=expires_at,
+                                   importance=importance))
+        return infos
+
+    def _summarize(self, entries: Dict[str, Any], max_tokens: int) -> str:
+        """Summary of evicted entries, shortening them if the summarizer fails"""
+        if self.summarizer is not None:
+            try:
+                return truncate_to_tokens(self.summarizer(entries, max_tokens), max_tokens)
+            except Exception as e:
+                logger.warning(f"Memory summarizer failed, shortening entries instead: {e}")
+        return fold_entries(entries, max_tokens)
+
+    def enforce_budget(self, agent_name: str) -> Dict[str, Any]:
+        """Evict entries until the agent's memory fits its budget
+
+        Returns:
+            The 'evicted' keys, the 'summary' key they were folded into (or
+            None) and the memory's estimated 'tokens' and 'bytes' afterwards
+        """
+        with self.agent_lock(agent_name):
+            with self._flush_cond:
+                self._unchecked.discard(agent_name)
+            memory = self._cached(agent_name, count=False)
+            budget = self.get_budget(agent_name)
+            entries = self._entry_infos(agent_name, memory)
+            victims: List[EntryInfo] = []
+            summary_key = None
+            limit = 0
+            if budget is not None:
+                reserve = 0
+                limit = summary_limit(budget) if budget.summarize else 0
+                if limit > 0:
+                    summary_key = _summary_key(memory)
+                    # Room for the whole summary entry, key included
+                    reserve = limit + estimate_tokens(f'{summary_key} ')
+                victims = select_evictions(budget, entries, time.time(), reserve_tokens=reserve)
+            if not victims:
+                summary_key = None
+            else:
+                evicted = {entry.key: memory[entry.key] for entry in victims}
+                values = {}
+                if summary_key is not None:
+                    values[summary_key] = self._summarize(evicted, limit)
+                # A summary is as important as the most important entry it folds in
+                self._stage(agent_name, values, list(evicted),
+                            importance=max(entry.importance for entry in victims))
+                with self._flush_cond:
+                    self._stats['evicted'] += len(victims)
+                    self._stats['summaries'] += 1 if summary_key else 0
+                    # The eviction itself leaves the memory within budget
+                    self._unchecked.discard(agent_name)
+                logger.info(f"Evicted {len(victims)} memory entries of agent {agent_name}")
+            sizes = [_entry_size(key, value) for key, value in memory.items()]
+            return {
+                'evicted': [entry.key for entry in victims],
+                'summary': summary_key,
+                'tokens': sum(tokens for tokens, _ in sizes),
+                'bytes': sum(size for _, size in sizes)
+            }
+
+    def _enforce_budgets(self) -> None:
+        """Check agents written since their last check against their budgets"""
+        with self._flush_cond:
+            agents, self._unchecked = self._unchecked, set()
+        for agent in agents:
+            if self.get_budget(agent) is None:
+                continue
+            try:
+                self.enforce_budget(agent)
+            except Exception as e:
+                logger.warning(f"Memory budget check of agent {agent} failed: {e}")
+
+    # Flushing
+
+    def _flush_agent(self, agent_name: str) -> None:
+        """Write an agent's pending changes to the store (agent lock held)"""
+        with self._flush_cond:
+            pending = self._pending.pop(agent_name, None)
+        if pending is None:
+            return
+        values, deleted = pending
+        start = time.perf_counter()
+        try:
+            old, new, records = self.store.update(agent_name, values, deleted)
+        except Exception:
+            with self._flush_cond:
+                # Changes staged meanwhile are newer and win
+                newer_values, newer_deleted = self._pending.get(agent_name, ({}, set()))
+                values = {key: value for key, value in values.items() if key not in newer_deleted}
+                values.update(newer_values)
+                self._pending[agent_name] = (values, (deleted - newer_values.keys()) | newer_deleted)
+                self._stats['flush_errors'] += 1
+            raise
+        # The cache already holds this write; if nobody else wrote in between it stays current
+        if self._versions.get(agent_name) == old:
+            self._versions[agent_name] = new
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._flush_cond:
+            self._stats['flushes'] += 1
+            self._stats['flushed_records'] += records
+            self._stats['flush_ms_total'] += elapsed_ms
+            self._stats['flush_ms_max'] = max(self._stats['flush_ms_max'], elapsed_ms)
+            self._stats['flush_ms_last'] = elapsed_ms
+
+    def flush(self, agent_name: Optional[str] = None) -> None:
+        """Write pending changes to disk now (for one agent, or all of them)"""
+        with self._flush_cond:
+            agents = [agent_name] if agent_name is not None else list(self._pending)
+        for agent in agents:
+            with self.agent_lock(agent):
+                self._flush_agent(agent)
+
+    def _flush_loop(self) -> None:
+        """Background flusher: waits for writes to settle, then flushes"""
+        while True:
+            with self._flush_cond:
+                while not self._closed:
+                    if self._pending:
+                        due = min(self._last_write + self.flush_delay,
+                                  self._first_dirty + self.max_flush_delay)
+                        remaining = due - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._flush_cond.wait(remaining)
+                    else:
+                        self._flush_cond.wait()
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Background memory flush failed: {e}")
+                with self._flush_cond:
+                    # Retry after another delay instead of spinning
+                    self._first_dirty = self._last_write = time.monotonic()
+                continue
+            # Writes settled, so the agents are between tasks
+            self._enforce_budgets()
+
+    def close(self) -> None:
+        """Stop the background flusher and flush everything pending"""
+        # Closed managers need no exit hook, and the hook would keep them alive
+        atexit.unregister(self.close)
+        with self._flush_cond:
+            self._closed = True
+            self._flush_cond.notify_all()
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.join()
+        self.flush()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Cache hits and misses of loads, and counts and latency of flushes"""
+        with self._flush_cond:
+            stats = dict(self._stats)
+            stats['dirty_agents'] = len(self._pending)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['flush_ms_avg'] = (stats['flush_ms_total'] / stats['flushes']
+                                 if stats['flushes'] else 0.0)
+        return stats
+
+    # Maintenance
+
+    def compact_memory(self, agent_name: str) -> None:
+        """Delete the agent's expired keys from the store and checkpoint its log"""
+        with self.agent_lock(agent_name):
+            self._flush_agent(agent_name)
+            self.store.purge_expired(agent_name)
+            self.store.checkpoint()
+
+    def get_memory_stats(self, agent_name: str) -> Dict[str, int]:
+        """Live keys of an agent's memory, their size in bytes and how many expire"""
+        with self.agent_lock(agent_name):
+            self._flush_agent(agent_name)
+            return self.store.stats(agent_name)
 
     def clear_memory(self, agent_name: str) -> None:
         """Clear agent memory"""
-        memory_file = os.path.join(self.memory_dir, f"{agent_name}.json")
-        if os.path.exists(memory_file):
-            os.remove(memory_file)
+        with self.agent_lock(agent_name):
+            with self._flush_cond:
+                self._pending.pop(agent_name, None)
+            self._cache.pop(agent_name, None)
+            self._expiries.pop(agent_name, None)
+            self._indexes.pop(agent_name, None)
+            self._accessed.pop(agent_name, None)
+            self.store.clear(agent_name)
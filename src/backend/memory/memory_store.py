@@ -0,0 +1,301 @@
+"""
+SQLite store shared by all agents' memory.
+
+One database in WAL mode holds every agent's memory as rows keyed by
+(agent, key), so readers never block the writer and concurrent processes
+update single keys transactionally instead of rewriting whole files. Each
+row records when it was last written and when it expires, with indexes for
+lookups by time and for purging expired rows, and when it was last used and
+how important it is, for budget eviction. A per-agent version, bumped in
+the same transaction as every write, lets caches check for changes made by
+other processes with one indexed lookup.
+
+Each thread uses its own connection; writes take the write lock up front
+(BEGIN IMMEDIATE) and wait up to busy_timeout seconds for it.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .memory_log import LOG_SUFFIX, encode, read_log
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = 'memory.db'
+
+# Appended to memory files that could not be imported, so they are kept but not retried
+CORRUPT_SUFFIX = '.corrupt'
+
+# Seconds a write waits for another connection's transaction to finish
+BUSY_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    agent TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL,
+    accessed_at REAL,
+    importance REAL,
+    PRIMARY KEY (agent, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS memory_updated ON memory (agent, updated_at);
+CREATE INDEX IF NOT EXISTS memory_expires ON memory (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS namespaces (
+    agent TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first release, with their types
+_ADDED_COLUMNS = (('accessed_at', 'REAL'), ('importance', 'REAL'))
+
+# Values to write: key -> (value, expiry time or None, importance or None to keep it)
+Entries = Dict[str, Tuple[Any, Optional[float], Optional[float]]]
+
+class MemoryStore:
+    """Every agent's memory in one SQLite database"""
+
+    def __init__(self, path: str, busy_timeout: float = BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # executescript commits on its own, so it runs outside a transaction
+        self._connection().executescript(_SCHEMA)
+        with self.transaction() as conn:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(memory)')}
+            for column, column_type in _ADDED_COLUMNS:
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE memory ADD COLUMN {column} {column_type}')
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # WAL makes NORMAL safe against corruption; only the last commits can be lost on power failure
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        """A transaction on this thread's connection, committed unless it raises
+
+        Write transactions take the write lock when they begin, so they
+        cannot fail halfway when another connection wrote in the meantime.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, agent: str) -> Tuple[int, int]:
+        """Increment an agent's version, returning the old and new one"""
+        row = conn.execute('SELECT version FROM namespaces WHERE agent = ?', (agent,)).fetchone()
+        old = row[0] if row else 0
+        conn.execute('INSERT INTO namespaces (agent, version) VALUES (?, ?) '
+                     'ON CONFLICT (agent) DO UPDATE SET version = excluded.version',
+                     (agent, old + 1))
+        return old, old + 1
+
+    # Reading
+
+    def version(self, agent: str) -> int:
+        """Counter bumped by every change to an agent's memory"""
+        row = self._connection().execute(
+            'SELECT version FROM namespaces WHERE agent = ?', (agent,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, agent: str) -> Tuple[Dict[str, Any], Dict[str, float], int]:
+        """An agent's live memory, the expiry times of its expiring keys and its version"""
+        now = time.time()
+        with self.transaction(write=False) as conn:
+            row = conn.execute('SELECT version FROM namespaces WHERE agent = ?', (agent,)).fetchone()
+            rows = conn.execute('SELECT key, value, expires_at FROM memory '
+                                'WHERE agent = ? AND (expires_at IS NULL OR expires_at > ?)',
+                                (agent, now)).fetchall()
+        memory = {key: json.loads(value) for key, value, _ in rows}
+        expiries = {key: expires_at for key, _, expires_at in rows if expires_at is not None}
+        return memory, expiries, row[0] if row else 0
+
+    def get(self, agent: str, key: str, default: Any = None) -> Any:
+        """One live key of an agent's memory"""
+        row = self._connection().execute(
+            'SELECT value FROM memory WHERE agent = ? AND key = ? '
+            'AND (expires_at IS NULL OR expires_at > ?)', (agent, key, time.time())).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def changed_since(self, agent: str, timestamp: float) -> Dict[str, Any]:
+        """Live keys of an agent's memory written after a time"""
+        rows = self._connection().execute(
+            'SELECT key, value FROM memory WHERE agent = ? AND updated_at > ? '
+            'AND (expires_at IS NULL OR expires_at > ?) ORDER BY updated_at',
+            (agent, timestamp, time.time())).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def metadata(self, agent: str) -> Dict[str, Tuple[float, Optional[float], float]]:
+        """Last use, expiry time and importance of each live key of an agent"""
+        rows = self._connection().execute(
+            'SELECT key, COALESCE(accessed_at, updated_at), expires_at, COALESCE(importance, 0) '
+            'FROM memory WHERE agent = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (agent, time.time())).fetchall()
+        return {key: (accessed_at, expires_at, importance)
+                for key, accessed_at, expires_at, importance in rows}
+
+    def agents(self) -> List[str]:
+        """Agents that have stored memory"""
+        rows = self._connection().execute('SELECT DISTINCT agent FROM memory ORDER BY agent')
+        return [agent for agent, in rows]
+
+    # Writing
+
+    def update(self, agent: str, values: Entries, deleted: Iterable[str] = ()) -> Tuple[int, int, int]:
+        """Upsert some keys and delete others in one transaction
+
+        Rows whose value and expiry are unchanged are not rewritten.
+
+        Returns:
+            The agent's version before and after, and the number of rows changed
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT INTO memory (agent, key, value, updated_at, expires_at, accessed_at, importance) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (agent, key) DO UPDATE SET '
+                'value = excluded.value, updated_at = excluded.updated_at, '
+                'expires_at = excluded.expires_at, accessed_at = excluded.accessed_at, '
+                'importance = COALESCE(excluded.importance, importance) '
+                'WHERE value != excluded.value OR expires_at IS NOT excluded.expires_at '
+                'OR COALESCE(excluded.importance, importance) IS NOT importance',
+                [(agent, key, encode(value), now, expires_at, now, importance)
+                 for key, (value, expires_at, importance) in values.items()])
+            conn.executemany('DELETE FROM memory WHERE agent = ? AND key = ?',
+                             [(agent, key) for key in deleted])
+            changed = conn.total_changes - before
+            old, new = self._bump(conn, agent) if changed else (self.version(agent),) * 2
+        return old, new, changed
+
+    def touch(self, agent: str, accessed: Dict[str, float]) -> None:
+        """Record when keys were last used; not a change to the memory"""
+        if not accessed:
+            return
+        with self.transaction() as conn:
+            conn.executemany('UPDATE memory SET accessed_at = ? WHERE agent = ? AND key = ? '
+                             'AND (accessed_at IS NULL OR accessed_at < ?)',
+                             [(accessed_at, agent, key, accessed_at)
+                              for key, accessed_at in accessed.items()])
+
+    def purge_expired(self, agent: Optional[str] = None) -> int:
+        """Delete expired rows (of one agent, or all)
+
+        Returns:
+            Number of rows deleted
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            rows = conn.execute('SELECT DISTINCT agent FROM memory WHERE expires_at <= ?',
+                                (now,)).fetchall()
+            agents = [name for name, in rows if agent is None or name == agent]
+            deleted = 0
+            for name in agents:
+                deleted += conn.execute('DELETE FROM memory WHERE agent = ? AND expires_at <= ?',
+                                        (name, now)).rowcount
+                self._bump(conn, name)
+        return deleted
+
+    def clear(self, agent: str) -> None:
+        """Delete all of an agent's memory"""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM memory WHERE agent = ?', (agent,))
+            self._bump(conn, agent)
+
+    # Maintenance
+
+    def migrate(self, memory_dir: str) -> List[str]:
+        """Import memory saved as JSON files or append-only logs, then remove the files
+
+        An agent that already has memory in the store keeps it; its old
+        files were left behind by a migration that did not finish. A file
+        that cannot be read is logged and renamed with CORRUPT_SUFFIX, and
+        the other files are still imported.
+
+        Returns:
+            Agents whose memory was imported
+        """
+        imported = []
+        paths = sorted(glob.glob(os.path.join(memory_dir, '*.json'))
+                       + glob.glob(os.path.join(memory_dir, f'*{LOG_SUFFIX}')))
+        for path in paths:
+            agent = os.path.splitext(os.path.basename(path))[0]
+            with self.transaction() as conn:
+                # Checked under the write lock, so concurrent migrations import each file once
+                if not os.path.exists(path):
+                    continue
+                stored = conn.execute('SELECT 1 FROM namespaces WHERE agent = ?',
+                                      (agent,)).fetchone()
+                if stored is None:
+                    try:
+                        entries = self._read_legacy(path)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Skipping unreadable memory file {path}: {e}")
+                        os.replace(path, path + CORRUPT_SUFFIX)
+                        continue
+                    now = time.time()
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO memory (agent, key, value, updated_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        [(agent, key, value, now) for key, value in entries.items()])
+                    self._bump(conn, agent)
+                    imported.append(agent)
+                os.remove(path)
+        return imported
+
+    @staticmethod
+    def _read_legacy(path: str) -> Dict[str, str]:
+        """Encoded entries of a memory JSON file or append-only log"""
+        if path.endswith(LOG_SUFFIX):
+            return read_log(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            memory = json.load(f)
+        if not isinstance(memory, dict):
+            raise ValueError(f'expected a JSON object, got {type(memory).__name__}')
+        return {key: encode(value) for key, value in memory.items()}
+
+    def checkpoint(self) -> None:
+        """Copy the write-ahead log into the database and truncate it"""
+        self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def stats(self, agent: str) -> Dict[str, int]:
+        """Live keys of an agent, their encoded size in bytes and how many expire"""
+        keys, size, expiring = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(value AS BLOB))), 0), '
+            'COUNT(expires_at) FROM memory WHERE agent = ? '
+            'AND (expires_at IS NULL OR expires_at > ?)', (agent, time.time())).fetchone()
+        return {'keys': keys, 'bytes': size, 'expiring': expiring}
+
+    def close(self) -> None:
+        """Close every thread's connection"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,130 @@
+"""
+Local similarity search over memory entries.
+
+Entries are embedded without any network access: by default as hashed
+TF-IDF vectors (word unigrams and bigrams hashed into a fixed number of
+signed buckets, so no vocabulary is kept), or by a caller-supplied encoder
+such as a local sentence-embedding model. Vectors live in one NumPy matrix
+that grows by doubling; inserts, updates and deletes touch a single row.
+A query is scored against every row with one matrix-vector product and the
+top k are picked with argpartition.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import math
+import re
+import zlib
+import numpy as np
+
+DEFAULT_DIMENSIONS = 1024
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# Turns a batch of texts into a (len(texts), dimensions) array
+Encoder = Callable[[List[str]], np.ndarray]
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words, with identifiers split on '_' and camelCase"""
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text)
+    return _WORD.findall(text.lower())
+
+def hashed_counts(text: str, dimensions: int) -> np.ndarray:
+    """Sublinear term frequencies of unigrams and bigrams in signed hash buckets"""
+    words = tokenize(text)
+    features = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+    counts: Dict[int, float] = {}
+    for feature in features:
+        digest = zlib.crc32(feature.encode('utf-8'))
+        bucket = digest % dimensions
+        # A second hash bit picks the sign, so collisions tend to cancel out
+        counts[bucket] = counts.get(bucket, 0.0) + (1.0 if digest & 0x80000000 else -1.0)
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for bucket, count in counts.items():
+        vector[bucket] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+    return vector
+
+class SemanticIndex:
+    """Top-k cosine search over keyed texts"""
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS, encoder: Optional[Encoder] = None):
+        self.dimensions = dimensions
+        self.encoder = encoder
+        self._vectors = np.zeros((16, dimensions), dtype=np.float32)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # Rows with a non-zero value per bucket, for IDF weights (hashed TF-IDF only)
+        self._document_frequency = np.zeros(dimensions, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if self.encoder is not None:
+            return np.asarray(self.encoder(texts), dtype=np.float32).reshape(len(texts), -1)
+        return np.stack([hashed_counts(text, self.dimensions) for text in texts])
+
+    def upsert(self, items: Dict[str, str]) -> None:
+        """Add or replace entries, embedding their texts in one batch"""
+        if not items:
+            return
+        keys = list(items)
+        vectors = self._embed([items[key] for key in keys])
+        for key, vector in zip(keys, vectors):
+            row = self._rows.get(key)
+            if row is None:
+                row = len(self._keys)
+                if row == len(self._vectors):
+                    self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._keys.append(key)
+                self._rows[key] = row
+            elif self.encoder is None:
+                self._document_frequency -= self._vectors[row] != 0
+            self._vectors[row] = vector
+            if self.encoder is None:
+                self._document_frequency += vector != 0
+
+    def remove(self, keys: List[str]) -> None:
+        """Drop entries, moving the last row into each freed slot"""
+        for key in keys:
+            row = self._rows.pop(key, None)
+            if row is None:
+                continue
+            if self.encoder is None:
+                self._document_frequency -= self._vectors[row] != 0
+            last = len(self._keys) - 1
+            if row != last:
+                moved = self._keys[last]
+                self._vectors[row] = self._vectors[last]
+                self._keys[row] = moved
+                self._rows[moved] = row
+            self._vectors[last] = 0
+            self._keys.pop()
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """The k entries most similar to a query, best first, with cosine scores
+
+        Entries with no similarity at all are left out.
+        """
+        count = len(self._keys)
+        if count == 0 or k <= 0:
+            return []
+        vectors = self._vectors[:count]
+        query_vector = self._embed([query])[0]
+        if self.encoder is None:
+            idf = np.log((1.0 + count) / (1.0 + self._document_frequency)) + 1.0
+            vectors = vectors * idf
+            query_vector = query_vector * idf
+
+        query_norm = np.linalg.norm(query_vector)
+        if query_norm == 0:
+            return []
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        scores = (vectors @ query_vector) / (norms * query_norm)
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self._keys[row], float(scores[row])) for row in top if scores[row] > 0]
@@ -11,6 +11,9 @@ class ModeConfig(BaseModel):
     allow_file_operations: bool
     allow_execution: bool
     require_confirmation: bool
+    # Hold a task's file changes in an overlay until committed or discarded.
+    # Opt-in (see update_mode_config); only ACT mode makes file changes
+    use_overlay: bool = False
     max_tokens: Optional[int] = None
     temperature: Optional[float] = None
 
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark for debug event construction and serialization.
+
+Compares the previous dataclass events, which rebuilt the same dict for the
+log writer and for subscribers, against the slotted DebugEvent that builds
+its JSON and dict forms once. File I/O is excluded so only per-event CPU and
+allocation cost is measured.
+
+Run from the repository root:
+    python -m src.backend.tests.bench_debug_events
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from ..debug.debug_console import DebugEvent
+
+EVENT_COUNT = 20000
+ALLOCATION_SAMPLES = 2000
+
+@dataclass
+class LegacyDebugEvent:
+    """Event representation before the slotted DebugEvent"""
+    timestamp: str
+    event_type: str
+    agent: str
+    action: str
+    details: Dict[str, Any]
+    status: str
+    correlation_id: Optional[str] = None
+
+def _legacy_event_dict(event: LegacyDebugEvent) -> Dict[str, Any]:
+    return {
+        'timestamp': event.timestamp,
+        'event_type': event.event_type,
+        'agent': event.agent,
+        'action': event.action,
+        'details': event.details,
+        'status': event.status,
+        'correlation_id': event.correlation_id
+    }
+
+def legacy_path(details: Dict[str, Any], subscribers: int) -> None:
+    """Build, serialize and fan out one event the way DebugConsole used to"""
+    # Size check on details, as in DebugConsole._truncate_details
+    json.dumps(details, default=str)
+    event = LegacyDebugEvent(datetime.now().isoformat(), 'tool_complete', 'code_agent',
+                             'read_file', details, 'success', 'corr-1')
+    json.dumps(_legacy_event_dict(event))
+    if subscribers:
+        event_dict = _legacy_event_dict(event)
+        for _ in range(subscribers):
+            event_dict['status']
+
+def current_path(details: Dict[str, Any], subscribers: int) -> None:
+    """Build, serialize and fan out one event with the shared representation"""
+    # DebugConsole encodes details once while checking the size cap
+    details_json = json.dumps(details, default=str)
+    event = DebugEvent(datetime.now().isoformat(), 'tool_complete', 'code_agent',
+                       'read_file', details, 'success', 'corr-1', details_json)
+    event.to_json()
+    if subscribers:
+        event_dict = event.to_dict()
+        for _ in range(subscribers):
+            event_dict['status']
+
+def measure(path: Callable[[Dict[str, Any], int], None],
+            details: Dict[str, Any],
+            subscribers: int) -> Dict[str, float]:
+    """Return per-event CPU time, peak allocation and GC collections for one code path"""
+    collections_before = sum(stat['collections'] for stat in gc.get_stats())
+    start = time.process_time()
+    for _ in range(EVENT_COUNT):
+        path(details, subscribers)
+    cpu_us = (time.process_time() - start) / EVENT_COUNT * 1_000_000
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections_before
+
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(ALLOCATION_SAMPLES):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        path(details, subscribers)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - baseline
+    tracemalloc.stop()
+
+    return {
+        'cpu_us_per_event': cpu_us,
+        'peak_bytes_per_event': allocated / ALLOCATION_SAMPLES,
+        'gc_collections': collections
+    }
+
+def main() -> None:
+    details = {'path': 'src/backend/main.py', 'status': 'success', 'content': 'x' * 512}
+    for subscribers in (0, 1):
+        before = measure(legacy_path, details, subscribers)
+        after = measure(current_path, details, subscribers)
+        print(f"subscribers={subscribers}")
+        for key in before:
+            print(f"  {key:>22}: before={before[key]:>10.2f} after={after[key]:>10.2f}")
+
+if __name__ == '__main__':
+    main()
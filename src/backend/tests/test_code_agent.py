@@ -18,6 +18,7 @@ from unittest.mock import MagicMock, patch, AsyncMock
 from typing import Dict, Any
 from pathlib import Path
 from ..agents.code_agent import CodeAgent
+from ..agents.base_agent import _symbol_candidates
 from ..agents.utils.task_utils import TaskType
 from ..config.config_manager import (
     AgentConfig,
@@ -285,5 +286,31 @@ class TestCodeAgent:
         # Test valid description
         code_agent.validate_task_description(valid_description)  # Should not raise
 
+    def test_symbol_candidates(self) -> None:
+        """Test only identifier-like task words are looked up as symbols"""
+        candidates = _symbol_candidates(
+            "Fix `run` and `parse_config()` in Config.load, then load the MemoryManager config "
+            "via parse_config (e.g. not for class)")
+
+        assert candidates == ['run', 'parse_config', 'Config.load', 'MemoryManager']
+
+    async def test_find_task_symbol_off_loop(self, code_agent: CodeAgent) -> None:
+        """Test code-shaped task words are looked up in one call off the event loop.
+        
+        Args:
+            code_agent: CodeAgent fixture
+        """
+        file_ops = MagicMock()
+        file_ops.find_symbols.return_value = {
+            'status': 'success',
+            'definitions': {'run_main': [], 'EntryPoint': [{'path': 'app.py', 'line': 1}]}
+        }
+
+        with patch.object(code_agent, '_tool_with', return_value=file_ops):
+            symbol = await code_agent._find_task_symbol("Refactor run_main and the EntryPoint")
+
+        assert symbol == {'path': 'app.py', 'line': 1}
+        file_ops.find_symbols.assert_called_once_with(names=['run_main', 'EntryPoint'])
+
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
@@ -0,0 +1,412 @@
+"""
+Unit tests for the DebugConsole class.
+
+Tests cover:
+- Event representation
+- Level filtering and sampling
+- Payload truncation and blob storage
+- Event querying
+- Trace assembly
+- Rolling statistics
+- Columnar export
+
+Important: Run with pytest's async support:
+    pytest --asyncio-mode=auto
+"""
+
+import pytest
+from typing import Any, Dict, List
+import json
+import os
+from ..debug import columnar_export, debug_console
+from ..debug.debug_console import DebugConsole, DebugConfig, DebugEvent
+from ..debug.trace_builder import TraceBuilder
+from ..debug.event_stats import EventStats
+from ..debug.columnar_export import (
+    ExportError,
+    export_events,
+    micros_to_timestamp,
+    read_binary_export
+)
+from ..debug.event_filter import EventFilter
+
+# Test Fixtures
+
+@pytest.fixture
+def console(tmp_path) -> DebugConsole:
+    """Provide a DebugConsole writing into a temporary workspace.
+
+    Returns:
+        DebugConsole: Console with default configuration
+    """
+    return DebugConsole(str(tmp_path))
+
+@pytest.fixture
+def large_details() -> Dict[str, Any]:
+    """Provide an event payload larger than the default size cap.
+
+    Returns:
+        Dict containing a large file content field
+    """
+    return {'content': 'x' * 20000, 'path': 'big.txt'}
+
+@pytest.fixture
+def task_events() -> List[Dict[str, Any]]:
+    """Provide the events of one task request as logged by MessageHandler.
+
+    Returns:
+        List of event dicts sharing a correlation id
+    """
+    def event(second: int, event_type: str, agent: str, action: str,
+              status: str = 'info') -> Dict[str, Any]:
+        return {
+            'timestamp': f'2024-01-01T00:00:{second:02d}',
+            'event_type': event_type,
+            'agent': agent,
+            'action': action,
+            'details': {},
+            'status': status,
+            'correlation_id': 'c1'
+        }
+
+    return [
+        event(0, 'message_received', 'message_handler', 'task'),
+        event(1, 'task_start', 'prompt', 'analyze_prompt'),
+        event(3, 'task_complete', 'prompt', 'analyze_prompt', 'success'),
+        event(4, 'task_start', 'supervisor', 'coordinate_task'),
+        event(5, 'tool_start', 'supervisor', 'read_file'),
+        event(6, 'tool_complete', 'supervisor', 'read_file', 'success'),
+        event(9, 'task_complete', 'supervisor', 'coordinate_task', 'success'),
+        event(10, 'message_sent', 'message_handler', 'task_response')
+    ]
+
+class TestDebugEvent:
+    """Test suite for the shared event representation"""
+
+    def test_json_matches_dict(self):
+        """Test the field-by-field JSON encoding round-trips to the dict form"""
+        event = DebugEvent('2024-01-01T00:00:00', 'tool_start', 'agent', 'say "hi"',
+                           {'nested': [1, 2.5, None]}, 'info')
+
+        assert json.loads(event.to_json()) == event.to_dict()
+        assert event.to_json() == json.dumps(event.to_dict())
+
+    def test_forms_are_cached(self):
+        """Test dict and JSON forms are built once"""
+        event = DebugEvent('2024-01-01T00:00:00', 'tool_start', 'agent', 'run', {}, 'info', 'c1')
+
+        assert event.to_dict() is event.to_dict()
+        assert event.to_json() is event.to_json()
+
+    async def test_subscribers_share_event_dict(self, console: DebugConsole):
+        """Test every subscriber and the tail cache see the same dict"""
+        received = []
+
+        async def subscriber(event: Dict[str, Any]) -> None:
+            received.append(event)
+
+        console.subscribe(subscriber)
+        console.subscribe(subscriber)
+        await console.log_event('tool_start', 'agent', 'read_file', {'path': 'a.py'})
+
+        assert received[0] is received[1]
+        assert console.get_recent_events()[0] is received[0]
+
+    async def test_recent_events_limit(self, console: DebugConsole):
+        """Test the tail cache returns the newest events, oldest first"""
+        for i in range(5):
+            await console.log_event('tool_start', 'agent', f'action{i}', {})
+
+        recent = console.get_recent_events(limit=2)
+        assert [e['action'] for e in recent] == ['action3', 'action4']
+        assert console.get_recent_events(limit=0) == []
+
+class TestEventFiltering:
+    """Test suite for verbosity levels and sampling"""
+
+    async def test_level_filters_low_severity(self, console: DebugConsole):
+        """Test events below the configured level are dropped"""
+        console.configure(level='warning')
+        await console.log_event('tool_start', 'agent', 'read_file', {}, status='info')
+        await console.log_event('tool_error', 'agent', 'read_file', {}, status='error')
+
+        events = await console.get_events()
+        assert [e['event_type'] for e in events] == ['tool_error']
+
+    async def test_sampling_keeps_errors(self, console: DebugConsole):
+        """Test a zero sampling rate drops events but never errors"""
+        console.configure(sampling_rates={'tool_start': 0.0})
+        await console.log_event('tool_start', 'agent', 'read_file', {})
+        await console.log_event('tool_start', 'agent', 'read_file', {}, status='error')
+
+        events = await console.get_events()
+        assert len(events) == 1
+        assert events[0]['status'] == 'error'
+
+    async def test_sampling_is_consistent_per_correlation_id(self, console: DebugConsole):
+        """Test all events of one correlation id share a sampling decision"""
+        console.configure(sampling_rates={'task_start': 0.5, 'task_complete': 0.5})
+        for i in range(20):
+            await console.log_event('task_start', 'agent', 'run', {}, correlation_id=f'c{i}')
+            await console.log_event('task_complete', 'agent', 'run', {}, correlation_id=f'c{i}')
+
+        events = await console.get_events(limit=100)
+        per_trace: Dict[str, int] = {}
+        for event in events:
+            per_trace[event['correlation_id']] = per_trace.get(event['correlation_id'], 0) + 1
+        assert all(count == 2 for count in per_trace.values())
+
+    def test_invalid_configuration(self, console: DebugConsole):
+        """Test invalid settings are rejected"""
+        with pytest.raises(ValueError):
+            console.configure(max_details_bytes=-1)
+        with pytest.raises(ValueError):
+            console.configure(level='verbose')
+        assert console.configure(level='warning').level == 'warning'
+
+class TestPayloadTruncation:
+    """Test suite for details truncation and blob sidecars"""
+
+    async def test_small_details_untouched(self, console: DebugConsole):
+        """Test payloads under the cap are stored inline"""
+        await console.log_event('tool_complete', 'agent', 'read_file', {'content': 'hi'})
+
+        events = await console.get_events()
+        assert events[0]['details'] == {'content': 'hi'}
+
+    async def test_large_details_truncated(self, console: DebugConsole,
+                                           large_details: Dict[str, Any]):
+        """Test oversized payloads are replaced by a blob reference"""
+        await console.log_event('tool_complete', 'agent', 'read_file', large_details)
+
+        details = (await console.get_events())[0]['details']
+        assert details['truncated'] is True
+        assert details['size'] > console.config.max_details_bytes
+        assert len(details['preview']) == console.config.preview_chars
+        assert await console.get_blob(details['blob']) == large_details
+
+    async def test_expand_details(self, console: DebugConsole, large_details: Dict[str, Any]):
+        """Test full payloads can be restored on demand"""
+        await console.log_event('tool_complete', 'agent', 'read_file', large_details)
+
+        events = await console.get_events(expand_details=True)
+        assert events[0]['details'] == large_details
+
+    async def test_full_fidelity(self, console: DebugConsole, large_details: Dict[str, Any]):
+        """Test truncation can be disabled"""
+        console.configure(full_fidelity=True)
+        await console.log_event('tool_complete', 'agent', 'read_file', large_details)
+
+        events = await console.get_events()
+        assert events[0]['details'] == large_details
+
+    async def test_failed_blob_write_leaves_nothing(self, console: DebugConsole,
+                                                    large_details: Dict[str, Any],
+                                                    monkeypatch: pytest.MonkeyPatch):
+        """Test a blob that cannot be moved into place leaves no partial file behind"""
+        def fail(*args):
+            raise OSError('disk full')
+        monkeypatch.setattr(debug_console.os, 'replace', fail)
+        await console.log_event('tool_complete', 'agent', 'read_file', large_details)
+
+        details = (await console.get_events())[0]['details']
+        assert details['truncated'] is True and details['blob'] is None
+        assert os.listdir(console.blob_dir) == []
+
+    async def test_get_blob_rejects_invalid_digest(self, console: DebugConsole):
+        """Test blob lookup does not accept arbitrary paths"""
+        assert await console.get_blob('../event_log') is None
+
+class TestTraceBuilder:
+    """Test suite for correlation-id trace assembly"""
+
+    def test_spans_nested_by_time(self, task_events: List[Dict[str, Any]]):
+        """Test start/complete pairs become nested spans with durations"""
+        trace = TraceBuilder(task_events).to_dict()
+
+        assert trace['span_count'] == 4
+        assert trace['total_duration_ms'] == 10000
+        root = trace['spans'][0]
+        assert root['action'] == 'task'
+        assert [c['action'] for c in root['children']] == ['analyze_prompt', 'coordinate_task']
+        supervisor = root['children'][1]
+        assert supervisor['duration_ms'] == 5000
+        assert supervisor['children'][0]['action'] == 'read_file'
+
+    def test_open_and_error_spans(self, task_events: List[Dict[str, Any]]):
+        """Test unfinished spans stay open and caller-reported errors close spans"""
+        events = task_events[:5] + [{
+            'timestamp': '2024-01-01T00:00:07',
+            'event_type': 'task_error',
+            'agent': 'message_handler',
+            'action': 'handle_task',
+            'details': {},
+            'status': 'error',
+            'correlation_id': 'c1'
+        }]
+        builder = TraceBuilder(events)
+
+        by_action = {span.action: span for span in builder.spans}
+        assert by_action['read_file'].end is None
+        assert by_action['coordinate_task'].status == 'error'
+        assert by_action['task'].duration_ms is None
+        assert builder.unmatched == []
+
+    def test_chrome_trace_export(self, task_events: List[Dict[str, Any]]):
+        """Test Chrome trace export uses complete events in microseconds"""
+        trace = TraceBuilder(task_events).to_chrome_trace()
+
+        events = {e['name']: e for e in trace['traceEvents']}
+        assert events['supervisor.coordinate_task']['ph'] == 'X'
+        assert events['supervisor.coordinate_task']['ts'] == 4_000_000
+        assert events['supervisor.coordinate_task']['dur'] == 5_000_000
+
+    async def test_console_get_trace(self, console: DebugConsole):
+        """Test traces are assembled from the event log"""
+        await console.log_event('tool_start', 'agent', 'read_file', {}, correlation_id='c2')
+        await console.log_event('tool_complete', 'agent', 'read_file', {}, correlation_id='c2')
+        await console.log_event('tool_start', 'agent', 'list_files', {}, correlation_id='c3')
+
+        trace = await console.get_trace('c2')
+        assert trace['span_count'] == 1
+        assert trace['spans'][0]['duration_ms'] >= 0
+
+class TestEventStats:
+    """Test suite for rolling aggregate statistics"""
+
+    @pytest.fixture
+    def stats(self) -> EventStats:
+        """Provide an empty EventStats instance."""
+        return EventStats()
+
+    def test_counts_and_error_rates(self, stats: EventStats):
+        """Test counts and error rates per dimension"""
+        now = 10_000.0
+        stats.record('tool_start', 'coder', 'read_file', 'info', '2024-01-01T00:00:00', 'c1', now)
+        stats.record('tool_error', 'coder', 'read_file', 'error', '2024-01-01T00:00:01', 'c1', now)
+        stats.record('tool_start', 'coder', 'read_file', 'info', '2024-01-01T00:00:02', 'c3', now)
+        stats.record('tool_complete', 'coder', 'read_file', 'success', '2024-01-01T00:00:03', 'c3', now)
+        stats.record('tool_start', 'tester', 'list_files', 'info', '2024-01-01T00:00:01', 'c2', now)
+
+        window = stats.snapshot(['1m'], now=now)['1m']
+        assert window['agent']['coder']['count'] == 4
+        # One of the two completed calls failed; starts are not outcomes
+        assert window['agent']['coder']['error_rate'] == 0.5
+        assert window['event_type']['tool_start']['count'] == 3
+        assert window['action']['tester.list_files']['errors'] == 0
+        assert window['action']['tester.list_files']['error_rate'] is None
+
+    def test_duration_percentiles(self, stats: EventStats):
+        """Test start/complete pairs feed duration percentiles"""
+        now = 10_000.0
+        for i in range(1, 11):
+            cid = f'c{i}'
+            stats.record('tool_start', 'coder', 'read_file', 'info',
+                         '2024-01-01T00:00:00', cid, now)
+            stats.record('tool_complete', 'coder', 'read_file', 'success',
+                         f'2024-01-01T00:00:{i:02d}', cid, now)
+
+        action = stats.snapshot(['5m'], now=now)['5m']['action']['coder.read_file']
+        assert action['p50_ms'] == 5000
+        assert action['p95_ms'] == 10000
+        assert action['count'] == 20
+
+    def test_windows_expire(self, stats: EventStats):
+        """Test old events fall out of shorter windows first"""
+        stats.record('task_start', 'coder', 'run', 'info', '2024-01-01T00:00:00', None, 10_000.0)
+
+        later = stats.snapshot(now=10_000.0 + 600)
+        assert later['1m'] == {}
+        assert later['5m'] == {}
+        assert later['1h']['agent']['coder']['count'] == 1
+
+    def test_unknown_window(self, stats: EventStats):
+        """Test unknown window names are rejected"""
+        with pytest.raises(ValueError):
+            stats.snapshot(['2d'])
+
+    async def test_console_counts_sampled_events(self, console: DebugConsole):
+        """Test aggregates include events dropped by sampling"""
+        console.configure(sampling_rates={'tool_start': 0.0})
+        await console.log_event('tool_start', 'coder', 'read_file', {})
+
+        assert await console.get_events() == []
+        assert console.get_stats(['1m'])['1m']['agent']['coder']['count'] == 1
+
+class TestColumnarExport:
+    """Test suite for columnar debug log export"""
+
+    @pytest.fixture
+    def log_path(self, tmp_path, task_events: List[Dict[str, Any]]) -> str:
+        """Write the task events as a JSONL log segment."""
+        path = tmp_path / 'event_log.jsonl'
+        path.write_text(''.join(json.dumps(event) + '\n' for event in task_events))
+        return str(path)
+
+    def test_binary_round_trip(self, tmp_path, log_path: str,
+                               task_events: List[Dict[str, Any]]):
+        """Test the built-in format restores every column"""
+        output = str(tmp_path / 'events.cdlog')
+        result = export_events([log_path], output, format='binary')
+
+        assert result['rows'] == len(task_events)
+        columns = read_binary_export(output)
+        assert [micros_to_timestamp(t) for t in columns['timestamp']] == [
+            e['timestamp'] for e in task_events
+        ]
+        assert columns['agent'] == [e['agent'] for e in task_events]
+        assert columns['correlation_id'] == ['c1'] * len(task_events)
+        assert [json.loads(d) for d in columns['details']] == [{}] * len(task_events)
+
+    def test_filters_push_down(self, tmp_path, log_path: str):
+        """Test get_events-style filters limit the exported rows"""
+        output = str(tmp_path / 'events.cdlog')
+        event_filter = EventFilter(start_time='2024-01-01T00:00:04',
+                                   end_time='2024-01-01T00:00:09',
+                                   event_types=['tool_start', 'tool_complete'])
+        result = export_events([log_path], output, format='binary', event_filter=event_filter)
+
+        assert result['rows'] == 2
+        assert read_binary_export(output)['action'] == ['read_file', 'read_file']
+
+    def test_failed_export_keeps_previous_file(self, tmp_path, log_path: str,
+                                               monkeypatch: pytest.MonkeyPatch):
+        """Test an export that fails part-way leaves the destination untouched"""
+        output = tmp_path / 'events.cdlog'
+        output.write_bytes(b'previous')
+
+        def fail(columns, path):
+            with open(path, 'wb') as f:
+                f.write(columnar_export.BINARY_MAGIC)
+            raise OSError('disk full')
+        monkeypatch.setattr(columnar_export, '_write_binary', fail)
+        with pytest.raises(OSError):
+            export_events([log_path], str(output), format='binary')
+
+        assert output.read_bytes() == b'previous'
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['event_log.jsonl', 'events.cdlog']
+
+    def test_unknown_format(self, tmp_path, log_path: str):
+        """Test unknown formats are rejected"""
+        with pytest.raises(ExportError):
+            export_events([log_path], str(tmp_path / 'out'), format='csv')
+
+    def test_parquet_export(self, tmp_path, log_path: str):
+        """Test Parquet export dictionary-encodes categorical columns"""
+        pyarrow = pytest.importorskip('pyarrow')
+        import pyarrow.parquet
+        output = str(tmp_path / 'events.parquet')
+        export_events([log_path], output, format='parquet')
+
+        table = pyarrow.parquet.read_table(output)
+        assert table.num_rows == 8
+        assert pyarrow.types.is_dictionary(table.schema.field('agent').type)
+
+    async def test_console_export(self, console: DebugConsole):
+        """Test DebugConsole exports its log segments"""
+        await console.log_event('tool_start', 'agent', 'read_file', {}, correlation_id='c1')
+        await console.log_event('tool_start', 'agent', 'read_file', {}, correlation_id='c2')
+
+        result = await console.export_events(format='binary', correlation_id='c2')
+        assert result['rows'] == 1
+        assert read_binary_export(result['path'])['correlation_id'] == ['c2']
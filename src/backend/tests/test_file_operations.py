@@ -0,0 +1,1412 @@
+"""
+Unit tests for the FileOperations tool.
+
+Tests cover:
+- Directory listing, ignore rules and pagination
+- Workspace index
+- Read cache
+- Ranged, line-window and chunked reads
+- Batch reads and stats
+- Async facade
+- Fast file and tree copies
+- Patch-based edits
+- Trigram search
+- Python symbol index
+- Workspace fingerprints
+- Binary and encoding detection
+- Atomic and buffered writes
+- Copy-on-write overlay
+- Import graph
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import threading
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+from ..tools.file_operations import FileOperations
+from ..tools.workspace_walker import IgnoreRules, parse_gitignore
+from ..tools.workspace_index import WorkspaceIndex
+from ..tools.read_cache import ReadCache
+from ..tools import fast_copy, ranged_reads
+from ..tools.async_file_operations import AsyncFileOperations
+from ..tools.patching import PatchError, apply_unified_diff
+from ..tools.search_index import SearchIndex, query_trigrams
+from ..tools import symbol_index
+from ..tools.symbol_index import SymbolIndex, summarize_python
+from ..tools.import_graph import is_test_file
+from ..tools.workspace_fingerprint import WorkspaceFingerprint
+from ..tools.content_sniff import SniffResult, sniff
+from ..tools import file_operations, write_buffer
+from ..tools.overlay import Overlay
+
+# Test Fixtures
+
+@pytest.fixture
+def workspace(tmp_path: Path) -> Path:
+    """Create a small workspace with ignored and nested content.
+
+    Returns:
+        Path: Workspace root
+    """
+    files = {
+        'README.md': '# readme',
+        'src/app.py': 'print("app")',
+        'src/util/helpers.py': 'def helper(): pass',
+        'src/util/generated.log': 'log',
+        'src/util/keep.log': 'keep',
+        'node_modules/pkg/index.js': 'module.exports = {}',
+        '.git/HEAD': 'ref: refs/heads/main',
+        'build/out.txt': 'out',
+        'docs/guide.md': 'guide',
+        '.gitignore': 'build/\n*.log\n!keep.log\n'
+    }
+    for rel_path, content in files.items():
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+@pytest.fixture
+def file_ops(workspace: Path) -> FileOperations:
+    """Provide FileOperations over the test workspace."""
+    return FileOperations(str(workspace))
+
+class TestListFiles:
+    """Test suite for list_files and iter_files"""
+
+    def test_prunes_ignored_paths(self, file_ops: FileOperations):
+        """Test default excludes and .gitignore rules are applied"""
+        result = file_ops.list_files()
+
+        assert result['status'] == 'success'
+        assert sorted(result['files']) == [
+            '.gitignore',
+            'README.md',
+            'docs/guide.md',
+            'src/app.py',
+            'src/util/helpers.py',
+            'src/util/keep.log'
+        ]
+        assert 'node_modules' not in result['directories']
+        assert 'build' not in result['directories']
+
+    def test_include_ignored(self, file_ops: FileOperations):
+        """Test ignored paths can be listed on request"""
+        result = file_ops.list_files(include_ignored=True)
+
+        assert 'node_modules/pkg/index.js' in result['files']
+        assert 'src/util/generated.log' in result['files']
+
+    def test_pattern_and_directory(self, file_ops: FileOperations):
+        """Test patterns match names below the requested directory"""
+        result = file_ops.list_files('src', '*.py')
+
+        assert result['files'] == ['src/app.py', 'src/util/helpers.py']
+        assert result['directories'] == []
+
+    def test_max_depth(self, file_ops: FileOperations):
+        """Test max_depth limits how deep the walk goes"""
+        result = file_ops.list_files('src', max_depth=1)
+
+        assert result['files'] == ['src/app.py']
+        assert result['directories'] == ['src/util']
+
+    def test_pagination(self, file_ops: FileOperations):
+        """Test pages cover the full listing exactly once, in order"""
+        full = [item['path'] for item in file_ops.iter_files()]
+        paged: List[str] = []
+        cursor = None
+        while True:
+            page = file_ops.list_files(cursor=cursor, limit=3)
+            paged.extend(sorted(page['files'] + page['directories']))
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        assert sorted(paged) == sorted(full)
+        assert len(paged) == len(full)
+        assert full == sorted(full, key=lambda p: p.split('/'))
+
+    def test_invalid_requests(self, file_ops: FileOperations):
+        """Test missing directories and bad limits are reported"""
+        assert file_ops.list_files('missing')['status'] == 'error'
+        assert file_ops.list_files(limit=0)['status'] == 'error'
+
+    def test_custom_excludes(self, workspace: Path):
+        """Test excludes replace the defaults when given"""
+        file_ops = FileOperations(str(workspace), excludes=['docs', '*.md'], use_gitignore=False)
+        files = file_ops.list_files()['files']
+
+        assert 'node_modules/pkg/index.js' in files
+        assert 'README.md' not in files
+        assert not any(path.startswith('docs/') for path in files)
+
+class TestIgnoreRules:
+    """Test suite for gitignore parsing"""
+
+    @pytest.mark.parametrize("pattern,path,is_dir,expected", [
+        ("*.pyc", "a/b/c.pyc", False, True),
+        ("/build", "build", True, True),
+        ("/build", "src/build", True, False),
+        ("logs/", "logs", False, False),
+        ("logs/", "a/logs", True, True),
+        ("docs/**/*.tmp", "docs/x/y/z.tmp", False, True),
+        ("**/cache", "deep/er/cache", True, True),
+        ("file?.txt", "file1.txt", False, True),
+        ("[ab].txt", "c.txt", False, False)
+    ])
+    def test_patterns(self, tmp_path: Path, pattern: str, path: str, is_dir: bool, expected: bool):
+        """Test gitignore pattern semantics"""
+        rules = IgnoreRules(str(tmp_path), excludes=[])
+        rules._gitignores[''] = parse_gitignore([pattern])
+
+        assert rules.is_ignored(path, is_dir) is expected
+
+class TestWorkspaceIndex:
+    """Test suite for the in-memory workspace index"""
+
+    @pytest.fixture
+    def indexed_ops(self, workspace: Path) -> FileOperations:
+        """Provide FileOperations with a built, unwatched index."""
+        file_ops = FileOperations(str(workspace))
+        assert file_ops.start_index(watch=False, warm_start=False)['status'] == 'success'
+        yield file_ops
+        file_ops.stop_index()
+
+    def test_listing_matches_filesystem(self, workspace: Path, indexed_ops: FileOperations):
+        """Test index listings equal a direct walk, including order and paging"""
+        direct = FileOperations(str(workspace))
+
+        assert list(indexed_ops.iter_files()) == list(direct.iter_files())
+        assert indexed_ops.list_files('src', '*.py', limit=1) == direct.list_files('src', '*.py',
+                                                                                  limit=1)
+
+    def test_ignored_entries_flagged(self, indexed_ops: FileOperations):
+        """Test ignored paths are recorded but not descended into"""
+        index = indexed_ops.index
+
+        assert index.get('node_modules').ignored is True
+        assert index.get('src/util/generated.log').ignored is True
+        assert index.get('node_modules/pkg') is None
+        assert index.get('src/app.py').ignored is False
+
+    def test_file_info_from_index(self, workspace: Path, indexed_ops: FileOperations):
+        """Test stats are served from the index"""
+        info = indexed_ops.get_file_info('src/app.py')['info']
+
+        assert info['size'] == (workspace / 'src/app.py').stat().st_size
+        assert info['is_file'] is True
+        assert info['extension'] == '.py'
+
+    def test_own_writes_update_index(self, indexed_ops: FileOperations):
+        """Test writes, moves and deletes through the tool keep the index current"""
+        indexed_ops.create_file('new/dir/module.py', 'x = 1')
+        assert indexed_ops.index.get('new/dir/module.py').size == 5
+        assert indexed_ops.index.get('new').is_dir
+
+        indexed_ops.rename_file('new/dir/module.py', 'new/moved.py')
+        assert indexed_ops.index.get('new/dir/module.py') is None
+        assert indexed_ops.index.get('new/moved.py') is not None
+
+        indexed_ops.delete_file('new')
+        assert indexed_ops.index.get('new/moved.py') is None
+        assert 'new/moved.py' not in indexed_ops.list_files()['files']
+
+    def test_snapshot_warm_start(self, workspace: Path, indexed_ops: FileOperations):
+        """Test a saved snapshot restores the index"""
+        indexed_ops.index.save_snapshot()
+
+        restored = WorkspaceIndex(str(workspace), IgnoreRules(str(workspace)))
+        assert restored.load_snapshot() is True
+        assert restored.ready
+        assert list(restored.iter_entries()) == list(indexed_ops.index.iter_entries())
+
+    async def test_backend_lifecycle(self, workspace: Path):
+        """Test the message handler starts the index and saves it on shutdown"""
+        pytest.importorskip('crewai')
+        from ..ipc.message_handler import MessageHandler
+        file_ops = FileOperations(str(workspace))
+        handler = MessageHandler.__new__(MessageHandler)
+        handler.prompt_agent = SimpleNamespace(tools=[file_ops])
+        handler.async_file_ops = None
+
+        await handler.start_file_services()
+        assert file_ops.index is not None and file_ops.index.ready
+        await handler.stop_file_services()
+        assert file_ops.index is None
+        assert (workspace / '.crewai_index').is_dir()
+
+    async def test_tool_request_rejects_unknown_params(self, workspace: Path):
+        """Test params a tool does not take get an error response, not a TypeError"""
+        pytest.importorskip('crewai')
+        from ..ipc.message_handler import MessageHandler
+        handler = MessageHandler.__new__(MessageHandler)
+        handler.prompt_agent = SimpleNamespace(tools=[FileOperations(str(workspace))])
+        handler.async_file_ops = None
+
+        for params in ({'file_path': 'src/app.py', 'timeout': 5},
+                       {'file_path': 'src/app.py', 'operation': 'delete_file'},
+                       {'path': 'src/app.py'}):
+            response = json.loads(await handler._handle_tool_request(
+                {'tool': 'read_file', 'params': params}))
+            assert response['type'] == 'error'
+            assert 'Invalid params for read_file' in response['error']
+        assert (workspace / 'src/app.py').exists()
+
+    def test_directory_modified_does_not_rescan(self, workspace: Path,
+                                                indexed_ops: FileOperations, monkeypatch):
+        """Test a directory's own change re-stats it without walking its contents"""
+        index = indexed_ops.index
+        monkeypatch.setattr(index, '_scan', lambda *args, **kwargs: pytest.fail('rescanned'))
+
+        index.handle_change(str(workspace / 'src'), rescan=False)
+        index.handle_change(str(workspace), rescan=False)
+
+        assert index.get('src').is_dir
+        assert index.get('src/app.py') is not None
+
+    def test_gitignore_changes_coalesce(self, workspace: Path, indexed_ops: FileOperations,
+                                        monkeypatch):
+        """Test a burst of .gitignore changes triggers a single rebuild"""
+        from ..tools import workspace_index
+        index = indexed_ops.index
+        builds = []
+        monkeypatch.setattr(workspace_index, 'REBUILD_DELAY', 0.05)
+        monkeypatch.setattr(index, 'build', lambda: builds.append(1))
+
+        for _ in range(5):
+            index.handle_change(str(workspace / '.gitignore'))
+        rebuilder = index._rebuilder
+        rebuilder.join(timeout=5)
+
+        assert builds == [1]
+        assert index._rebuilder is None
+
+class TestReadCache:
+    """Test suite for the read_file content cache"""
+
+    def test_repeated_reads_hit_cache(self, file_ops: FileOperations):
+        """Test a second read is served from memory"""
+        first = file_ops.read_file('src/app.py')
+        second = file_ops.read_file('./src/app.py')
+
+        assert first == second
+        stats = file_ops.get_read_cache_stats()['stats']
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['bytes_saved'] == len('print("app")')
+
+    def test_external_change_detected(self, workspace: Path, file_ops: FileOperations):
+        """Test a file changed outside the tool is re-read"""
+        file_ops.read_file('README.md')
+        (workspace / 'README.md').write_text('# changed readme')
+
+        assert file_ops.read_file('README.md')['content'] == '# changed readme'
+
+    def test_own_write_invalidates(self, file_ops: FileOperations):
+        """Test writes through the tool drop the cached content"""
+        file_ops.read_file('README.md')
+        file_ops.create_file('README.md', '# new')
+
+        assert file_ops.read_file('README.md')['content'] == '# new'
+        assert file_ops.read_cache.hits == 0
+
+    def test_byte_budget_eviction(self):
+        """Test least recently used entries are evicted over budget"""
+        cache = ReadCache(max_bytes=100)
+        cache.put('a', (1, 20, 1), 'a' * 20)
+        cache.put('b', (1, 20, 2), 'b' * 20)
+        cache.get('a', (1, 20, 1))
+        for i in range(4):
+            cache.put(f'c{i}', (1, 20, 10 + i), 'c' * 20)
+
+        assert cache.get('a', (1, 20, 1)) is not None
+        assert cache.get('b', (1, 20, 2)) is None
+        assert cache.current_bytes <= 100
+
+    def test_directory_invalidation(self):
+        """Test invalidating a directory drops entries below it"""
+        cache = ReadCache()
+        cache.put('src/a.py', (1, 1, 1), 'a')
+        cache.put('src2/b.py', (1, 1, 2), 'b')
+        cache.invalidate('src')
+
+        assert cache.get('src/a.py', (1, 1, 1)) is None
+        assert cache.get('src2/b.py', (1, 1, 2)) == 'b'
+
+class TestRangedReads:
+    """Test suite for partial reads"""
+
+    @pytest.fixture
+    def text_file(self, workspace: Path) -> str:
+        """Write a multi-line file with multibyte characters."""
+        content = ''.join(f'line {i} \u00e9\u20ac\n' for i in range(1, 101))
+        (workspace / 'big.txt').write_text(content, encoding='utf-8')
+        return content
+
+    def test_byte_range(self, file_ops: FileOperations, text_file: str):
+        """Test a byte window is returned with its position"""
+        result = file_ops.read_file('big.txt', offset=0, length=6)
+
+        assert result['content'] == 'line 1'
+        assert result['offset'] == 0
+        assert result['length'] == 6
+        assert result['eof'] is False
+
+    def test_byte_range_multibyte_boundaries(self, file_ops: FileOperations, text_file: str):
+        """Test windows splitting characters decode cleanly and tile the file"""
+        pieces = []
+        offset = 0
+        while True:
+            result = file_ops.read_file('big.txt', offset=offset, length=7)
+            assert '\ufffd' not in result['content']
+            pieces.append(result['content'])
+            offset = result['offset'] + result['length']
+            if result['eof']:
+                break
+
+        assert ''.join(pieces) == text_file
+
+    def test_line_range(self, file_ops: FileOperations, text_file: str):
+        """Test line windows, open-ended ranges and ranges past the end"""
+        result = file_ops.read_file('big.txt', start_line=2, end_line=3)
+        assert result['content'] == 'line 2 \u00e9\u20ac\nline 3 \u00e9\u20ac\n'
+        assert result['end_line'] == 3
+        assert result['eof'] is False
+
+        tail = file_ops.read_file('big.txt', start_line=100)
+        assert tail['content'] == 'line 100 \u00e9\u20ac\n'
+        assert tail['eof'] is True
+
+        past = file_ops.read_file('big.txt', start_line=500)
+        assert past['content'] == ''
+        assert past['end_line'] == 499
+
+    def test_mmap_line_range_matches(self, workspace: Path, file_ops: FileOperations,
+                                     text_file: str):
+        """Test the mmap path returns the same windows as the in-memory path"""
+        for start, end in [(1, 1), (50, 60), (99, None), (200, None)]:
+            expected = file_ops.read_file('big.txt', start_line=start, end_line=end)
+
+            assert ranged_reads.read_line_range(str(workspace / 'big.txt'), start, end) == expected
+
+    @pytest.mark.parametrize("newline", [b'\r\n', b'\r'])
+    def test_line_range_newlines_above_threshold(self, monkeypatch, workspace: Path,
+                                                 file_ops: FileOperations, newline: bytes):
+        """Test large CRLF and CR files give the same lines as small ones"""
+        (workspace / 'dos.txt').write_bytes(newline.join(b'line %d' % i for i in range(50)))
+        small = file_ops.read_file('dos.txt', start_line=10, end_line=12)
+        monkeypatch.setattr(file_operations, 'MMAP_THRESHOLD', 1)
+        large = file_ops.read_file('dos.txt', start_line=10, end_line=12)
+
+        assert small['content'] == 'line 9\nline 10\nline 11\n'
+        assert large == small
+
+    def test_chunks_reassemble(self, file_ops: FileOperations, text_file: str):
+        """Test streamed chunks concatenate to the file and report byte offsets"""
+        chunks = list(file_ops.iter_file_chunks('big.txt', chunk_size=5))
+
+        assert ''.join(chunk['content'] for chunk in chunks) == text_file
+        assert [chunk['offset'] for chunk in chunks[:3]] == [0, 5, 10]
+
+    def test_invalid_ranges(self, file_ops: FileOperations, text_file: str):
+        """Test conflicting and out-of-range parameters are rejected"""
+        assert file_ops.read_file('big.txt', offset=0, start_line=1)['status'] == 'error'
+        assert file_ops.read_file('big.txt', offset=-1)['status'] == 'error'
+        assert file_ops.read_file('big.txt', start_line=0)['status'] == 'error'
+        assert file_ops.read_file('big.txt', start_line=5, end_line=2)['status'] == 'error'
+
+class TestBatchOperations:
+    """Test suite for read_files and stat_files"""
+
+    def test_read_files(self, file_ops: FileOperations):
+        """Test per-file results, including failures, for a batch read"""
+        result = file_ops.read_files(['README.md', 'src/app.py', 'missing.txt', 'README.md'])
+
+        assert result['status'] == 'success'
+        assert list(result['results']) == ['README.md', 'src/app.py', 'missing.txt']
+        assert result['results']['src/app.py']['content'] == 'print("app")'
+        assert result['results']['missing.txt']['status'] == 'error'
+        assert result['failed'] == 1
+
+    def test_read_files_line_range(self, file_ops: FileOperations):
+        """Test a line range applies to every file in the batch"""
+        file_ops.create_file('a.txt', 'a1\na2\n')
+        file_ops.create_file('b.txt', 'b1\nb2\n')
+        results = file_ops.read_files(['a.txt', 'b.txt'], start_line=2)['results']
+
+        assert results['a.txt']['content'] == 'a2\n'
+        assert results['b.txt']['content'] == 'b2\n'
+
+    @pytest.mark.parametrize("indexed", [False, True])
+    def test_stat_files(self, file_ops: FileOperations, indexed: bool):
+        """Test batch stats match single stats with and without the index"""
+        if indexed:
+            file_ops.start_index(watch=False, warm_start=False)
+        paths = ['README.md', 'src', 'missing']
+        results = file_ops.stat_files(paths)['results']
+
+        for path in paths:
+            assert results[path] == file_ops.get_file_info(path)
+        assert results['src']['info']['is_directory'] is True
+        file_ops.stop_index()
+
+    def test_invalid_batch(self, file_ops: FileOperations):
+        """Test a non-list argument is rejected and an empty batch is allowed"""
+        assert file_ops.read_files('README.md')['status'] == 'error'
+        assert file_ops.stat_files([]) == {'status': 'success', 'results': {}, 'failed': 0}
+
+class TestAsyncFileOperations:
+    """Test suite for the asyncio facade"""
+
+    @pytest.fixture
+    def async_ops(self, file_ops: FileOperations) -> AsyncFileOperations:
+        """Provide the async facade over the test workspace."""
+        async_ops = AsyncFileOperations(file_ops)
+        yield async_ops
+        async_ops.shutdown()
+
+    async def test_run_off_loop(self, async_ops: AsyncFileOperations):
+        """Test operations run on the executor and are timed"""
+        result = await async_ops.run('read_file', file_path='README.md')
+        await async_ops.run('read_file', file_path='missing.md')
+
+        assert result['content'] == '# readme'
+        timing = async_ops.get_timings()['read_file']
+        assert timing['count'] == 2
+        assert timing['errors'] == 1
+
+    async def test_loop_stays_responsive(self, monkeypatch, async_ops: AsyncFileOperations):
+        """Test a blocking operation does not stall other coroutines"""
+        release = threading.Event()
+        monkeypatch.setattr(async_ops.file_ops, 'list_files',
+                            lambda **params: release.wait(5) and {'status': 'success'})
+        task = asyncio.ensure_future(async_ops.run('list_files'))
+        await asyncio.sleep(0.01)
+
+        assert not task.done()
+        release.set()
+        assert (await task)['status'] == 'success'
+
+    async def test_calls_serialised(self, monkeypatch, async_ops: AsyncFileOperations):
+        """Test concurrent calls never run FileOperations methods at the same time"""
+        running = []
+        overlaps = []
+
+        def operation(**params):
+            overlaps.append(bool(running))
+            running.append(1)
+            threading.Event().wait(0.01)
+            running.pop()
+            return {'status': 'success'}
+        monkeypatch.setattr(async_ops.file_ops, 'create_file', operation)
+
+        await asyncio.gather(*(async_ops.run('create_file') for _ in range(4)))
+        assert overlaps == [False] * 4
+
+    def test_shared_facade(self, file_ops: FileOperations, async_ops: AsyncFileOperations):
+        """Test callers of one FileOperations share one facade until it shuts down"""
+        shared = AsyncFileOperations.shared(file_ops)
+        assert AsyncFileOperations.shared(file_ops) is shared
+        other = AsyncFileOperations.shared(FileOperations(file_ops.workspace_path))
+        assert other is not shared
+        other.shutdown()
+
+        shared.shutdown()
+        assert AsyncFileOperations.shared(file_ops) is not shared
+        AsyncFileOperations.shared(file_ops).shutdown()
+
+    async def test_timeout_cancels(self, monkeypatch, async_ops: AsyncFileOperations):
+        """Test a timeout releases the caller and is counted as cancelled"""
+        release = threading.Event()
+        monkeypatch.setattr(async_ops.file_ops, 'copy_file',
+                            lambda **params: release.wait(5) and {'status': 'success'})
+
+        with pytest.raises(asyncio.TimeoutError):
+            await async_ops.run('copy_file', timeout=0.01)
+        release.set()
+        assert async_ops.get_timings()['copy_file']['cancelled'] == 1
+
+    async def test_iterate_chunks(self, async_ops: AsyncFileOperations):
+        """Test generators are consumed off the loop and can stop early"""
+        chunks = [chunk async for chunk in
+                  async_ops.iterate('iter_file_chunks', file_path='README.md', chunk_size=3)]
+        assert ''.join(chunk['content'] for chunk in chunks) == '# readme'
+
+        iterator = async_ops.iterate('iter_file_chunks', file_path='README.md', chunk_size=3)
+        assert (await iterator.__anext__())['content'] == '# r'
+        await iterator.aclose()
+        assert async_ops.get_timings()['iter_file_chunks']['cancelled'] == 1
+
+    async def test_private_methods_rejected(self, async_ops: AsyncFileOperations):
+        """Test only public FileOperations methods can be run"""
+        with pytest.raises(AttributeError):
+            await async_ops.run('_mark_changed')
+
+class TestFastCopy:
+    """Test suite for kernel-accelerated and parallel copies"""
+
+    def test_copy_file(self, workspace: Path, file_ops: FileOperations):
+        """Test a file copy keeps content and mtime and reports throughput"""
+        result = file_ops.copy_file('src/app.py', 'copy/app.py')
+
+        assert result['status'] == 'success'
+        assert result['bytes'] == len('print("app")')
+        assert result['files'] == 1
+        assert result['bytes_per_second'] >= 0
+        source, dest = workspace / 'src/app.py', workspace / 'copy/app.py'
+        assert dest.read_text() == source.read_text()
+        assert dest.stat().st_mtime_ns == source.stat().st_mtime_ns
+
+    def test_copy_tree(self, workspace: Path, file_ops: FileOperations):
+        """Test a directory copy reproduces the whole tree"""
+        result = file_ops.copy_file('src', 'src_copy')
+
+        assert result['files'] == 4
+        assert sum(result['methods'].values()) == 4
+        copied = sorted(p.relative_to(workspace / 'src_copy').as_posix()
+                        for p in (workspace / 'src_copy').rglob('*'))
+        original = sorted(p.relative_to(workspace / 'src').as_posix()
+                          for p in (workspace / 'src').rglob('*'))
+        assert copied == original
+        assert (workspace / 'src_copy/util/helpers.py').read_text() == 'def helper(): pass'
+
+    def test_fallback_when_kernel_copy_unsupported(self, monkeypatch, tmp_path: Path):
+        """Test the buffered path is used when every fast mechanism is refused"""
+        def refuse(src_fd: int, dst_fd: int, size: int) -> None:
+            raise OSError(fast_copy.errno.EXDEV, 'cross-device')
+
+        monkeypatch.setattr(fast_copy, '_METHODS', [('reflink', refuse), ('sendfile', refuse)])
+        monkeypatch.setattr(fast_copy, '_unsupported', set())
+        source = tmp_path / 'big.bin'
+        source.write_bytes(bytes(range(256)) * 1000)
+
+        size, method = fast_copy.copy_file_fast(str(source), str(tmp_path / 'out.bin'))
+        assert (size, method) == (256000, 'buffered')
+        assert (tmp_path / 'out.bin').read_bytes() == source.read_bytes()
+        assert len(fast_copy._unsupported) == 2
+
+    def test_fallback_after_partial_copy(self, monkeypatch, tmp_path: Path):
+        """Test the buffered copy starts over after a mechanism fails partway"""
+        def partial(src_fd: int, dst_fd: int, size: int) -> None:
+            os.write(dst_fd, os.read(src_fd, 100))
+            raise OSError(fast_copy.errno.EINVAL, 'gave up')
+
+        monkeypatch.setattr(fast_copy, '_METHODS', [('copy_file_range', partial)])
+        monkeypatch.setattr(fast_copy, '_unsupported', set())
+        source = tmp_path / 'data.bin'
+        source.write_bytes(bytes(range(256)) * 10)
+
+        assert fast_copy.copy_file_fast(str(source), str(tmp_path / 'out.bin'))[1] == 'buffered'
+        assert (tmp_path / 'out.bin').read_bytes() == source.read_bytes()
+
+    def test_copy_tree_keeps_symlinks(self, tmp_path: Path):
+        """Test symlinks in a tree are recreated, not followed"""
+        source = tmp_path / 'src'
+        (source / 'real').mkdir(parents=True)
+        (source / 'real/file.txt').write_text('x')
+        (source / 'dir_link').symlink_to('real')
+        (source / 'file_link').symlink_to('real/file.txt')
+
+        totals = fast_copy.copy_tree_fast(str(source), str(tmp_path / 'dest'))
+
+        assert (totals['files'], totals['links']) == (1, 2)
+        assert os.readlink(tmp_path / 'dest/dir_link') == 'real'
+        assert os.readlink(tmp_path / 'dest/file_link') == 'real/file.txt'
+        assert (tmp_path / 'dest/dir_link/file.txt').read_text() == 'x'
+
+    def test_special_files_not_opened(self, tmp_path: Path):
+        """Test FIFOs are skipped in trees and refused as sources instead of blocking"""
+        source = tmp_path / 'src'
+        source.mkdir()
+        (source / 'file.txt').write_text('x')
+        os.mkfifo(source / 'pipe')
+
+        totals = fast_copy.copy_tree_fast(str(source), str(tmp_path / 'dest'))
+
+        assert totals['files'] == 1
+        assert totals['skipped'] == [str(source / 'pipe')]
+        assert not (tmp_path / 'dest/pipe').exists()
+        with pytest.raises(shutil.SpecialFileError):
+            fast_copy.copy_path(str(source / 'pipe'), str(tmp_path / 'pipe_copy'))
+
+class TestEditFile:
+    """Test suite for diff and search/replace edits"""
+
+    @pytest.fixture
+    def module(self, workspace: Path) -> Path:
+        """Write a ten-line module to edit."""
+        path = workspace / 'module.py'
+        path.write_text(''.join(f'line{i}\n' for i in range(1, 11)))
+        return path
+
+    def test_unified_diff(self, file_ops: FileOperations, module: Path):
+        """Test a multi-hunk diff applies and returns the new hash"""
+        diff = (
+            '--- a/module.py\n+++ b/module.py\n'
+            '@@ -2,2 +2,2 @@\n line2\n-line3\n+LINE3\n'
+            '@@ -8,2 +8,3 @@\n line8\n+inserted\n line9\n'
+        )
+        base = file_ops.read_file('module.py')['hash']
+        result = file_ops.edit_file('module.py', diff=diff, base_hash=base)
+
+        assert result['status'] == 'success'
+        assert result['applied'] == 2
+        read = file_ops.read_file('module.py')
+        assert read['content'].splitlines()[2] == 'LINE3'
+        assert read['content'].splitlines()[8] == 'inserted'
+        assert read['hash'] == result['hash']
+
+    def test_keeps_crlf_line_endings(self, workspace: Path, file_ops: FileOperations):
+        """Test editing a CRLF file keeps its line endings"""
+        (workspace / 'dos.txt').write_bytes(b'a\r\nb\r\nc\r\n')
+        base = file_ops.read_file('dos.txt')['hash']
+        result = file_ops.edit_file('dos.txt', edits=[{'search': 'b\n', 'replace': 'B\nb2\n'}],
+                                    base_hash=base)
+
+        assert result['status'] == 'success'
+        assert (workspace / 'dos.txt').read_bytes() == b'a\r\nB\r\nb2\r\nc\r\n'
+        assert file_ops.read_file('dos.txt')['hash'] == result['hash']
+
+    def test_diff_tolerates_drift(self):
+        """Test hunks are found by context when line numbers are off"""
+        content = 'a\nb\nc\nd\n'
+        new_content, _ = apply_unified_diff(content, '@@ -1,2 +1,2 @@\n c\n-d\n+D\n')
+
+        assert new_content == 'a\nb\nc\nD\n'
+
+    def test_diff_no_newline_at_end(self):
+        """Test the no-newline marker is honored"""
+        diff = '@@ -1,1 +1,1 @@\n-a\n\\ No newline at end of file\n+b\n'
+
+        assert apply_unified_diff('a', diff)[0] == 'b\n'
+
+    def test_search_replace(self, file_ops: FileOperations, module: Path):
+        """Test search/replace edits, including ambiguous and missing searches"""
+        result = file_ops.edit_file('module.py', edits=[{'search': 'line10', 'replace': 'last'}])
+        assert result['status'] == 'success'
+        assert module.read_text().endswith('line9\nlast\n')
+
+        ambiguous = file_ops.edit_file('module.py', edits=[{'search': 'line', 'replace': 'x'}])
+        assert 'ambiguous' in ambiguous['error']
+        missing = file_ops.edit_file('module.py', edits=[{'search': 'nope', 'replace': 'x'}])
+        assert missing['status'] == 'error'
+        assert module.read_text().endswith('line9\nlast\n')
+
+    def test_stale_base_hash_rejected(self, file_ops: FileOperations, module: Path):
+        """Test an edit made against old content is refused"""
+        base = file_ops.read_file('module.py')['hash']
+        module.write_text('changed\n')
+        result = file_ops.edit_file('module.py', edits=[{'search': 'changed', 'replace': 'x'}],
+                                    base_hash=base)
+
+        assert result['conflict'] is True
+        assert module.read_text() == 'changed\n'
+
+    def test_failed_hunk_leaves_file(self, workspace: Path, file_ops: FileOperations,
+                                     module: Path):
+        """Test nothing is written and no temp file is left when a hunk fails"""
+        before = module.read_text()
+        result = file_ops.edit_file('module.py', diff='@@ -1,1 +1,1 @@\n-nothere\n+x\n')
+
+        assert result['status'] == 'error'
+        assert module.read_text() == before
+        assert not list(workspace.glob('.*.tmp'))
+        with pytest.raises(PatchError):
+            apply_unified_diff(before, 'no hunks here')
+
+class TestSearch:
+    """Test suite for the trigram search index"""
+
+    def test_literal_search_with_context(self, file_ops: FileOperations):
+        """Test literal matches carry position and context lines"""
+        file_ops.create_file('src/models.py', 'import os\n\nclass Model:\n    pass\n')
+        result = file_ops.search('class Model', context=1)
+
+        assert result['status'] == 'success'
+        assert result['matches'] == [{
+            'path': 'src/models.py',
+            'line': 3,
+            'column': 1,
+            'text': 'class Model:',
+            'before': [''],
+            'after': ['    pass']
+        }]
+
+    def test_candidates_are_narrowed(self, file_ops: FileOperations):
+        """Test only files containing the query trigrams are read"""
+        result = file_ops.search('helper')
+
+        assert result['candidates'] == 1
+        assert result['matches'][0]['path'] == 'src/util/helpers.py'
+
+    def test_regex_and_case(self, file_ops: FileOperations):
+        """Test regex queries and case-insensitive matching"""
+        assert file_ops.search(r'def \w+\(\)', regex=True)['matches'][0]['text'] == \
+            'def helper(): pass'
+        assert file_ops.search('PRINT')['matches'] == []
+        assert len(file_ops.search('PRINT', case_sensitive=False)['matches']) == 1
+        assert file_ops.search('(', regex=True)['status'] == 'error'
+
+    def test_ignored_files_not_indexed(self, file_ops: FileOperations):
+        """Test ignore rules apply to the index"""
+        assert file_ops.search('module.exports')['matches'] == []
+        assert file_ops.search('keep', pattern='*.log')['matches'][0]['path'] == \
+            'src/util/keep.log'
+
+    def test_incremental_updates(self, file_ops: FileOperations):
+        """Test writes, edits and deletes through the tool update the index"""
+        file_ops.search('anything')
+        file_ops.create_file('notes.txt', 'needle here')
+        assert file_ops.search('needle')['matches'][0]['path'] == 'notes.txt'
+
+        file_ops.edit_file('notes.txt', edits=[{'search': 'needle', 'replace': 'thread'}])
+        assert file_ops.search('needle')['matches'] == []
+
+        file_ops.delete_file('notes.txt')
+        assert file_ops.search('thread')['matches'] == []
+
+    def test_outside_edits_seen_without_watcher(self, workspace: Path,
+                                                file_ops: FileOperations):
+        """Test files changed outside the tool are re-indexed before searching"""
+        file_ops.search('anything')
+        (workspace / 'outside.txt').write_text('needle from an editor')
+        (workspace / 'README.md').write_text('# rewritten')
+
+        assert file_ops.search('needle')['matches'][0]['path'] == 'outside.txt'
+        assert file_ops.search('readme')['candidates'] == 0
+
+    def test_snapshot_reconcile(self, workspace: Path, file_ops: FileOperations):
+        """Test a warm start picks up files changed while the index was down"""
+        file_ops.start_search_index()
+        file_ops.stop_index()
+        (workspace / 'docs/guide.md').write_text('rewritten guide')
+
+        restored = SearchIndex(str(workspace), IgnoreRules(str(workspace)))
+        assert restored.load_snapshot() is True
+        assert restored.reconcile() == 1
+        assert restored.search('rewritten')['matches'][0]['path'] == 'docs/guide.md'
+
+    def test_query_trigrams(self):
+        """Test required trigrams are extracted from regexes conservatively"""
+        assert query_trigrams('foo|bar', regex=True) == set()
+        assert query_trigrams(r'(?:ab|cd)efg', regex=True) == {'efg'}
+        assert query_trigrams('Abcd', regex=False) == {'abc', 'bcd'}
+
+class TestSymbolIndex:
+    """Test suite for the Python symbol index"""
+
+    SOURCE = (
+        '"""Shapes."""\n'
+        'import math\n'
+        'from .base import Base, registry\n'
+        '\n'
+        'class Circle(Base):\n'
+        '    """A circle."""\n'
+        '    def area(self):\n'
+        '        return math.pi\n'
+        '\n'
+        'async def load():\n'
+        '    pass\n'
+    )
+
+    def test_summarize(self):
+        """Test definitions, imports and docstring presence are recorded"""
+        summary = summarize_python(self.SOURCE)
+
+        assert summary['has_docstring'] is True
+        assert [(d['qualname'], d['kind'], d['line'], d['has_docstring'])
+                for d in summary['definitions']] == [
+            ('Circle', 'class', 5, True),
+            ('Circle.area', 'method', 7, False),
+            ('load', 'function', 10, False)
+        ]
+        assert summary['imports'][1] == {'module': 'base', 'names': ['Base', 'registry'],
+                                         'level': 1, 'line': 3}
+        assert summarize_python('def broken(:') is None
+
+    def test_find_symbol(self, file_ops: FileOperations):
+        """Test lookups by name and qualified name, and file summaries"""
+        file_ops.create_file('src/shapes.py', self.SOURCE)
+
+        found = file_ops.find_symbol('Circle.area')
+        assert found['files'] == ['src/shapes.py']
+        assert found['definitions'][0]['line'] == 7
+        assert file_ops.find_symbol('helper')['files'] == ['src/util/helpers.py']
+        assert file_ops.find_symbol('missing')['definitions'] == []
+        symbols = file_ops.get_file_symbols('src/shapes.py')['symbols']
+        assert [d['name'] for d in symbols['definitions']] == ['Circle', 'area', 'load']
+        batch = file_ops.find_symbols(['Circle', 'missing'])['definitions']
+        assert [d['path'] for d in batch['Circle']] == ['src/shapes.py']
+        assert batch['missing'] == []
+
+    def test_incremental_updates(self, file_ops: FileOperations):
+        """Test edits and deletes through the tool update the index"""
+        file_ops.find_symbol('anything')
+        file_ops.create_file('mod.py', 'def old_name(): pass\n')
+        file_ops.edit_file('mod.py', edits=[{'search': 'old_name', 'replace': 'new_name'}])
+
+        assert file_ops.find_symbol('old_name')['files'] == []
+        assert file_ops.find_symbol('new_name')['files'] == ['mod.py']
+        file_ops.delete_file('mod.py')
+        assert file_ops.find_symbol('new_name')['files'] == []
+
+    def test_outside_edits_seen_without_watcher(self, workspace: Path,
+                                                file_ops: FileOperations):
+        """Test Python files changed outside the tool are re-indexed before lookups"""
+        file_ops.find_symbol('anything')
+        (workspace / 'src/app.py').write_text('def main(): pass\n')
+
+        assert file_ops.find_symbol('main')['files'] == ['src/app.py']
+
+    def test_unchanged_files_not_reparsed(self, monkeypatch, workspace: Path):
+        """Test a warm start only parses content whose hash is new"""
+        SymbolIndex(str(workspace), IgnoreRules(str(workspace))).start()
+        (workspace / 'src/app.py').write_text('def main(): pass\n')
+        parsed = []
+        original = symbol_index.summarize_python
+        monkeypatch.setattr(symbol_index, 'summarize_python',
+                            lambda source: parsed.append(source) or original(source))
+
+        restored = SymbolIndex(str(workspace), IgnoreRules(str(workspace)))
+        restored.start()
+        assert parsed == ['def main(): pass\n']
+        assert restored.files_defining('main') == ['src/app.py']
+
+    def test_process_pool(self, monkeypatch, workspace: Path):
+        """Test large batches are parsed in worker processes with the same results"""
+        for i in range(5):
+            (workspace / f'gen_{i}.py').write_text(f'def generated_{i}(): pass\n')
+        monkeypatch.setattr(symbol_index, 'PROCESS_POOL_THRESHOLD', 2)
+        index = SymbolIndex(str(workspace), IgnoreRules(str(workspace)), max_workers=2)
+        index.start(warm_start=False)
+
+        assert index.files_defining('generated_4') == ['gen_4.py']
+
+class TestWorkspaceFingerprint:
+    """Test suite for Merkle workspace fingerprints"""
+
+    def test_stable_until_content_changes(self, workspace: Path, file_ops: FileOperations):
+        """Test the fingerprint only changes with content, not with mtime"""
+        first = file_ops.workspace_fingerprint()['fingerprint']
+        assert file_ops.workspace_fingerprint()['fingerprint'] == first
+
+        (workspace / 'README.md').write_text('# readme')
+        assert file_ops.workspace_fingerprint()['fingerprint'] == first
+        (workspace / 'README.md').write_text('# edited')
+        assert file_ops.workspace_fingerprint()['fingerprint'] != first
+
+    def test_ignored_files_excluded(self, workspace: Path, file_ops: FileOperations):
+        """Test changes to ignored paths do not affect the fingerprint"""
+        first = file_ops.workspace_fingerprint()['fingerprint']
+        (workspace / 'node_modules/pkg/index.js').write_text('changed')
+        (workspace / 'build/new.txt').write_text('new')
+
+        assert file_ops.workspace_fingerprint()['fingerprint'] == first
+
+    def test_changed_since(self, workspace: Path, file_ops: FileOperations):
+        """Test additions, modifications, deletions and moves are reported"""
+        before = file_ops.workspace_fingerprint()['fingerprint']
+        file_ops.create_file('src/util/new.py', 'x = 1')
+        file_ops.create_file('README.md', '# changed')
+        file_ops.rename_file('docs', 'manual')
+
+        changes = file_ops.changed_since(before)
+        assert changes['changed'] is True
+        assert changes['added'] == ['manual/guide.md', 'src/util/new.py']
+        assert changes['modified'] == ['README.md']
+        assert changes['deleted'] == ['docs/guide.md']
+
+        unchanged = file_ops.changed_since(changes['fingerprint'])
+        assert unchanged['changed'] is False
+        assert unchanged['added'] == unchanged['modified'] == unchanged['deleted'] == []
+        assert file_ops.changed_since('0' * 64)['status'] == 'error'
+
+    def test_persisted_and_index_backed(self, workspace: Path, file_ops: FileOperations):
+        """Test state survives a restart and index stats give the same fingerprint"""
+        before = file_ops.workspace_fingerprint()['fingerprint']
+        file_ops.create_file('new.txt', 'new')
+
+        restarted = FileOperations(str(workspace))
+        restarted.start_index(watch=False, warm_start=False)
+        changes = restarted.changed_since(before)
+        restarted.stop_index()
+
+        assert changes['added'] == ['new.txt']
+        assert changes['fingerprint'] == file_ops.workspace_fingerprint()['fingerprint']
+
+    def test_only_changed_files_rehashed(self, monkeypatch, workspace: Path):
+        """Test files with unchanged mtime and size are not hashed again"""
+        fingerprint = WorkspaceFingerprint(str(workspace), IgnoreRules(str(workspace)))
+        fingerprint.compute()
+        (workspace / 'docs/guide.md').write_text('guide v2')
+        hashed = []
+        original = fingerprint._hash
+        monkeypatch.setattr(fingerprint, '_hash', lambda path: hashed.append(path) or original(path))
+        fingerprint.compute()
+
+        assert hashed == ['docs/guide.md']
+
+class TestContentSniff:
+    """Test suite for binary detection and encoding sniffing"""
+
+    @pytest.mark.parametrize("data,expected", [
+        (b'plain ascii\n', SniffResult(False, 'utf-8')),
+        ('caf\u00e9'.encode('utf-8'), SniffResult(False, 'utf-8')),
+        ('caf\u00e9'.encode('utf-8')[:-1], SniffResult(False, 'utf-8')),
+        ('caf\u00e9 \u2013'.encode('cp1252'), SniffResult(False, 'cp1252')),
+        ('\ufeffbom'.encode('utf-8'), SniffResult(False, 'utf-8-sig')),
+        ('text'.encode('utf-16'), SniffResult(False, 'utf-16')),
+        (b'\x89PNG\r\n\x1a\n\x00\x00', SniffResult(True, None, 'png')),
+        (b'%PDF-1.7\n', SniffResult(True, None, 'pdf')),
+        (b'RIFF\x00\x00\x00\x00WEBPVP8 ', SniffResult(True, None, 'webp')),
+        (b'data\x00more', SniffResult(True, None)),
+        (bytes(range(1, 32)) * 4 + b'\xff', SniffResult(True, None))
+    ])
+    def test_sniff(self, data: bytes, expected: SniffResult):
+        """Test BOMs, magic numbers, NUL bytes and encodings are recognised"""
+        assert sniff(data) == expected
+
+    def test_binary_read_returns_metadata(self, workspace: Path, file_ops: FileOperations):
+        """Test binary files are not decoded"""
+        (workspace / 'logo.png').write_bytes(b'\x89PNG\r\n\x1a\n' + bytes(1000))
+        result = file_ops.read_file('logo.png')
+
+        assert result == {'status': 'success', 'binary': True, 'kind': 'png',
+                          'size': 1008, 'content': None}
+        assert file_ops.read_file('logo.png', start_line=1)['binary'] is True
+        assert file_ops.read_cache.stats()['entries'] == 0
+        assert file_ops.edit_file('logo.png', edits=[{'search': 'PNG', 'replace': 'x'}])[
+            'status'] == 'error'
+
+    def test_detected_encodings(self, workspace: Path, file_ops: FileOperations):
+        """Test non-UTF-8 text is decoded with the sniffed encoding and edited in place"""
+        (workspace / 'legacy.txt').write_bytes('na\u00efve caf\u00e9\n'.encode('cp1252'))
+        (workspace / 'wide.txt').write_text('wide text\n', encoding='utf-16')
+
+        legacy = file_ops.read_file('legacy.txt')
+        assert (legacy['content'], legacy['encoding']) == ('na\u00efve caf\u00e9\n', 'cp1252')
+        assert file_ops.read_file('wide.txt')['content'] == 'wide text\n'
+
+        file_ops.edit_file('legacy.txt', edits=[{'search': 'caf\u00e9', 'replace': 'bistro'}])
+        assert (workspace / 'legacy.txt').read_bytes() == 'na\u00efve bistro\n'.encode('cp1252')
+
+    def test_edit_refuses_undecodable_bytes(self, workspace: Path, file_ops: FileOperations):
+        """Test an edit is refused when bytes past the sniffed prefix do not decode"""
+        data = b'first\n' + b'x' * 9000 + b'\ncaf\xe9\n'
+        (workspace / 'mixed.txt').write_bytes(data)
+        result = file_ops.edit_file('mixed.txt', edits=[{'search': 'first', 'replace': 'one'}])
+
+        assert result['status'] == 'error'
+        assert 'not valid utf-8' in result['error']
+        assert (workspace / 'mixed.txt').read_bytes() == data
+
+    def test_ranges_and_chunks_use_sniffed_encoding(self, workspace: Path,
+                                                    file_ops: FileOperations):
+        """Test byte ranges and chunk streams decode like whole reads and refuse binaries"""
+        (workspace / 'legacy.txt').write_bytes('caf\u00e9 na\u00efve'.encode('cp1252'))
+        (workspace / 'wide.txt').write_text('wide text', encoding='utf-16')
+        (workspace / 'logo.png').write_bytes(b'\x89PNG\r\n\x1a\n' + bytes(100))
+
+        assert file_ops.read_file('legacy.txt', offset=3, length=4)['content'] == '\u00e9 na'
+        wide = file_ops.read_file('wide.txt', offset=3, length=8)
+        assert (wide['content'], wide['offset'], wide['length']) == ('ide', 4, 6)
+        assert file_ops.read_file('wide.txt', offset=0, length=6)['content'] == 'wi'
+        assert file_ops.read_file('logo.png', offset=0, length=10)['binary'] is True
+
+        chunks = file_ops.iter_file_chunks('wide.txt', chunk_size=3)
+        assert ''.join(chunk['content'] for chunk in chunks) == 'wide text'
+        assert ''.join(c['content'] for c in file_ops.iter_file_chunks('legacy.txt')) == \
+            'caf\u00e9 na\u00efve'
+        with pytest.raises(ValueError):
+            list(file_ops.iter_file_chunks('logo.png'))
+
+    def test_search_uses_sniffed_encoding(self, workspace: Path, file_ops: FileOperations):
+        """Test search decodes candidates the way they were indexed"""
+        (workspace / 'legacy.txt').write_bytes('one\r\ncaf\u00e9 menu\r\n'.encode('cp1252'))
+        file_ops.start_search_index(warm_start=False)
+        matches = file_ops.search('caf\u00e9')['matches']
+
+        assert [(m['path'], m['line'], m['text']) for m in matches] == \
+            [('legacy.txt', 2, 'caf\u00e9 menu')]
+
+    def test_sniff_results_are_bounded(self, workspace: Path, file_ops: FileOperations,
+                                       monkeypatch: pytest.MonkeyPatch):
+        """Test the per-path sniff cache drops least recently used paths"""
+        monkeypatch.setattr(file_operations, 'MAX_SNIFFED', 2)
+        for name in ('a.txt', 'b.txt', 'c.txt'):
+            (workspace / name).write_text(name)
+        file_ops.read_file('a.txt')
+        file_ops.read_file('b.txt')
+        file_ops.read_file('a.txt', offset=0, length=1)
+        file_ops.read_file('c.txt')
+
+        assert list(file_ops._sniffed) == ['a.txt', 'c.txt']
+
+    @pytest.mark.parametrize("indexed", [False, True])
+    def test_list_files_tags_types(self, workspace: Path, file_ops: FileOperations,
+                                   indexed: bool):
+        """Test listings can tag files as text or binary"""
+        (workspace / 'docs/diagram.gif').write_bytes(b'GIF89a' + bytes(20))
+        if indexed:
+            file_ops.start_index(watch=False, warm_start=False)
+        result = file_ops.list_files('docs', tag_types=True)
+        file_ops.stop_index()
+
+        assert result['file_types'] == {'docs/diagram.gif': 'binary', 'docs/guide.md': 'text'}
+        assert 'file_types' not in file_ops.list_files('docs')
+
+class TestWrites:
+    """Test suite for atomic writes, durability levels and the write buffer"""
+
+    @pytest.mark.parametrize("durability", ['none', 'fsync-file', 'fsync-dir'])
+    def test_atomic_write(self, workspace: Path, file_ops: FileOperations, durability: str):
+        """Test writes replace files through a rename and leave no temporary files"""
+        (workspace / 'run.sh').write_text('old')
+        (workspace / 'run.sh').chmod(0o755)
+        result = file_ops.create_file('run.sh', 'new', durability=durability)
+
+        assert result['status'] == 'success'
+        assert (workspace / 'run.sh').read_text() == 'new'
+        assert (workspace / 'run.sh').stat().st_mode & 0o777 == 0o755
+        assert not list(workspace.glob('.*.tmp'))
+
+    def test_new_file_mode_and_symlinks(self, workspace: Path, file_ops: FileOperations):
+        """Test new files get the umask mode and writes through a symlink keep the link"""
+        assert file_ops.create_file('new.txt', 'x')['status'] == 'success'
+        assert (workspace / 'new.txt').stat().st_mode & 0o777 == 0o666 & ~write_buffer._UMASK
+
+        (workspace / 'real.txt').write_text('old')
+        (workspace / 'link.txt').symlink_to('real.txt')
+        assert file_ops.create_file('link.txt', 'new')['status'] == 'success'
+        assert (workspace / 'link.txt').is_symlink()
+        assert (workspace / 'real.txt').read_text() == 'new'
+
+    def test_invalid_durability(self, file_ops: FileOperations):
+        """Test unknown durability levels are rejected"""
+        result = file_ops.create_file('a.txt', 'x', durability='eventually')
+        assert result['status'] == 'error'
+        assert 'Invalid durability' in result['error']
+
+    def test_failed_write_keeps_original(self, workspace: Path, file_ops: FileOperations,
+                                         monkeypatch: pytest.MonkeyPatch):
+        """Test a write failing before the rename leaves the old content in place"""
+        def fail(*args):
+            raise OSError('disk full')
+        (workspace / 'keep.txt').write_text('original')
+        monkeypatch.setattr(write_buffer.os, 'replace', fail)
+
+        assert file_ops.create_file('keep.txt', 'partial')['status'] == 'error'
+        assert (workspace / 'keep.txt').read_text() == 'original'
+        assert not list(workspace.glob('.*.tmp'))
+
+    def test_buffered_writes_coalesce(self, workspace: Path, file_ops: FileOperations,
+                                      monkeypatch: pytest.MonkeyPatch):
+        """Test repeated buffered writes to a path reach the disk once"""
+        writes: List[str] = []
+        real_write = write_buffer.write_atomic
+        monkeypatch.setattr(file_operations, 'write_atomic',
+                            lambda path, *args: (writes.append(path), real_write(path, *args)))
+        for version in range(5):
+            file_ops.create_file('notes/plan.md', f'v{version}', buffered=True)
+
+        assert not (workspace / 'notes').exists()
+        assert file_ops.read_file('notes/plan.md')['content'] == 'v4'
+        result = file_ops.flush_writes()
+
+        assert result['status'] == 'success'
+        assert result['stats']['coalesced'] == 4
+        assert result['stats']['flushed'] == 1
+        assert len(writes) == 1
+        assert (workspace / 'notes/plan.md').read_text() == 'v4'
+
+    def test_operations_flush_pending_writes(self, workspace: Path, file_ops: FileOperations):
+        """Test operations that look at the disk see buffered content"""
+        file_ops.create_file('src/new.py', 'def buffered(): pass\n', buffered=True)
+        assert 'src/new.py' in file_ops.list_files('src')['files']
+        assert len(file_ops.write_buffer) == 0
+
+        file_ops.create_file('src/new.py', 'changed\n', buffered=True)
+        assert file_ops.search('changed')['matches'][0]['path'] == 'src/new.py'
+
+        file_ops.create_file('README.md', 'pending', buffered=True)
+        file_ops.create_file('README.md', 'direct')
+        file_ops.flush_writes()
+        assert (workspace / 'README.md').read_text() == 'direct'
+
+    def test_buffer_flushes_over_budget(self, workspace: Path, file_ops: FileOperations):
+        """Test the buffer writes itself out once it holds too many bytes"""
+        file_ops.write_buffer.max_pending_bytes = 10
+        file_ops.create_file('a.txt', '12345', buffered=True)
+        assert not (workspace / 'a.txt').exists()
+        file_ops.create_file('b.txt', '1234567890', buffered=True)
+
+        assert (workspace / 'a.txt').read_text() == '12345'
+        assert (workspace / 'b.txt').read_text() == '1234567890'
+        assert file_ops.write_buffer.pending_bytes == 0
+
+    def test_failed_flush_keeps_writes(self, workspace: Path, file_ops: FileOperations,
+                                       monkeypatch: pytest.MonkeyPatch):
+        """Test buffered writes that fail to flush stay buffered and are reported"""
+        file_ops.write_buffer.max_pending_bytes = 10
+        file_ops.create_file('a.txt', '12345', buffered=True)
+
+        def failing(*args):
+            raise OSError('disk full')
+        monkeypatch.setattr(file_operations, 'write_atomic', failing)
+        result = file_ops.create_file('b.txt', '1234567890', buffered=True)
+
+        assert result['status'] == 'error'
+        assert set(result['errors']) == {'a.txt', 'b.txt'}
+        assert file_ops.read_file('a.txt')['content'] == '12345'
+        monkeypatch.undo()
+        assert file_ops.flush_writes()['status'] == 'success'
+        assert (workspace / 'b.txt').read_text() == '1234567890'
+
+    def test_strongest_durability_wins(self):
+        """Test coalesced writes keep the strongest durability requested"""
+        buffer = write_buffer.WriteBuffer()
+        buffer.stage('a', '/tmp/a', 'x', durability='fsync-dir')
+        buffer.stage('a', '/tmp/a', 'y', durability='none')
+        assert buffer.get('a').durability == 'fsync-dir'
+        assert buffer.get('a').content == 'y'
+
+class TestOverlay:
+    """Test suite for the copy-on-write overlay"""
+
+    def test_changes_stay_in_overlay(self, workspace: Path, file_ops: FileOperations):
+        """Test overlay changes are visible through the tool but not on disk"""
+        file_ops.begin_overlay()
+        file_ops.create_file('src/new.py', 'new')
+        file_ops.edit_file('README.md', edits=[{'search': 'readme', 'replace': 'overlay'}])
+        file_ops.delete_file('docs')
+        file_ops.rename_file('src/app.py', 'src/main.py')
+
+        assert file_ops.read_file('src/new.py')['content'] == 'new'
+        assert file_ops.read_file('README.md')['content'] == '# overlay'
+        assert file_ops.read_file('src/main.py')['content'] == 'print("app")'
+        assert file_ops.read_file('src/app.py')['status'] == 'error'
+        assert file_ops.read_file('docs/guide.md')['status'] == 'error'
+        assert file_ops.get_file_info('src/new.py')['info']['size'] == 3
+        listing = file_ops.list_files('.', max_depth=2)
+        assert 'docs' not in listing['directories']
+        assert {'src/main.py', 'src/new.py'} <= set(listing['files'])
+        assert 'src/app.py' not in listing['files']
+
+        assert (workspace / 'README.md').read_text() == '# readme'
+        assert (workspace / 'src/app.py').exists()
+        assert not (workspace / 'src/new.py').exists()
+        assert (workspace / 'docs/guide.md').exists()
+
+    def test_commit(self, workspace: Path, file_ops: FileOperations):
+        """Test committing applies every change and ends the overlay"""
+        file_ops.begin_overlay()
+        file_ops.create_file('src/new.py', 'new')
+        file_ops.copy_file('src/util', 'lib')
+        file_ops.delete_file('docs')
+        file_ops.create_directory('empty')
+        result = file_ops.commit_overlay(durability='fsync-dir')
+
+        assert result['status'] == 'success'
+        assert file_ops.overlay is None
+        assert (workspace / 'src/new.py').read_text() == 'new'
+        assert (workspace / 'lib/helpers.py').read_text() == 'def helper(): pass'
+        assert (workspace / 'lib/keep.log').read_text() == 'keep'
+        assert not (workspace / 'docs').exists()
+        assert (workspace / 'empty').is_dir()
+        assert not list((workspace / '.crewai_index').iterdir())
+
+    def test_discard(self, workspace: Path, file_ops: FileOperations):
+        """Test discarding leaves the workspace untouched"""
+        file_ops.begin_overlay()
+        file_ops.create_file('README.md', 'changed')
+        file_ops.delete_file('src')
+        assert file_ops.get_overlay_status()['deleted'] == ['src']
+        file_ops.discard_overlay()
+
+        assert file_ops.read_file('README.md')['content'] == '# readme'
+        assert (workspace / 'src/app.py').exists()
+        assert file_ops.get_overlay_status() == {'status': 'success', 'active': False}
+
+    def test_recreate_deleted_directory(self, workspace: Path, file_ops: FileOperations):
+        """Test a directory deleted and written again only holds the new files"""
+        file_ops.begin_overlay()
+        file_ops.delete_file('docs')
+        file_ops.create_file('docs/new.md', 'new')
+        assert file_ops.list_files('docs')['files'] == ['docs/new.md']
+        file_ops.commit_overlay()
+
+        assert sorted(p.name for p in (workspace / 'docs').iterdir()) == ['new.md']
+
+    def test_failed_commit_changes_nothing(self, workspace: Path, file_ops: FileOperations,
+                                           monkeypatch: pytest.MonkeyPatch):
+        """Test a commit failing while staging leaves the workspace and overlay intact"""
+        file_ops.begin_overlay()
+        file_ops.create_file('a.txt', 'a')
+        file_ops.create_file('b.txt', 'b')
+        file_ops.delete_file('README.md')
+        real_open = open
+        staged: List[str] = []
+        def failing_open(path, mode='r', *args, **kwargs):
+            if 'overlay-' in str(path) and 'w' in mode:
+                staged.append(str(path))
+                if len(staged) == 2:
+                    raise OSError('disk full')
+            return real_open(path, mode, *args, **kwargs)
+        monkeypatch.setattr('builtins.open', failing_open)
+        result = file_ops.commit_overlay()
+        monkeypatch.undo()
+
+        assert result['status'] == 'error'
+        assert (workspace / 'README.md').exists()
+        assert not (workspace / 'a.txt').exists()
+        assert file_ops.overlay is not None
+
+    def test_crlf_edits_in_overlay(self, workspace: Path, file_ops: FileOperations):
+        """Test overlay content reads and edits like the disk, keeping CRLF on commit"""
+        (workspace / 'dos.txt').write_bytes(b'a\r\nb\r\n')
+        file_ops.begin_overlay()
+        file_ops.edit_file('dos.txt', edits=[{'search': 'a\n', 'replace': 'A\n'}])
+        result = file_ops.edit_file('dos.txt', edits=[{'search': 'A\nb\n', 'replace': 'A\nB\n'}])
+
+        assert result['status'] == 'success'
+        assert file_ops.read_file('dos.txt')['content'] == 'A\nB\n'
+        assert file_ops.read_file('dos.txt')['hash'] == result['hash']
+        file_ops.commit_overlay()
+        assert (workspace / 'dos.txt').read_bytes() == b'A\r\nB\r\n'
+
+    def test_commit_follows_symlinks(self, workspace: Path, file_ops: FileOperations):
+        """Test committing a write through a symlink replaces its target"""
+        (workspace / 'link.md').symlink_to('README.md')
+        file_ops.begin_overlay()
+        file_ops.create_file('link.md', 'through the link')
+        file_ops.commit_overlay()
+
+        assert (workspace / 'link.md').is_symlink()
+        assert (workspace / 'README.md').read_text() == 'through the link'
+
+    def test_directories_tracked(self):
+        """Test directories holding written files come and go with the files"""
+        overlay = Overlay()
+        overlay.write('a/b/one.txt', b'1')
+        overlay.write('a/two.txt', b'2')
+        assert overlay.has_directory('a/b') and overlay.has_directory('a')
+
+        overlay.remove('a/b/one.txt', on_disk=False)
+        assert not overlay.has_directory('a/b')
+        overlay.remove_directory('a', on_disk=True)
+        assert not overlay.has_directory('a')
+        assert overlay.is_deleted('a/two.txt')
+
+    def test_merge_streams_workspace_entries(self):
+        """Test merging reads workspace entries only as far as the listing goes"""
+        overlay = Overlay()
+        overlay.write('b.txt', b'b')
+        overlay.remove('c.txt', on_disk=True)
+        consumed = []
+
+        def entries():
+            for name in ['a.txt', 'c.txt', 'd.txt', 'e.txt', 'f.txt']:
+                consumed.append(name)
+                yield name, False
+        merged = overlay.merge_entries(entries(), lambda path, is_dir: True)
+
+        assert list(itertools.islice(merged, 3)) == [('a.txt', False), ('b.txt', False),
+                                                     ('d.txt', False)]
+        assert consumed == ['a.txt', 'c.txt', 'd.txt']
+
+    async def test_task_overlay_opt_in(self, file_ops: FileOperations):
+        """Test tasks only run in an overlay in ACT mode with use_overlay set"""
+        pytest.importorskip('crewai')
+        from ..ipc.message_handler import MessageHandler
+        from ..modes.mode_manager import AgentMode, ModeManager
+        handler = MessageHandler.__new__(MessageHandler)
+        handler.prompt_agent = SimpleNamespace(tools=[file_ops])
+        handler.async_file_ops = None
+        handler.mode_manager = ModeManager()
+
+        handler.mode_manager.switch_mode(AgentMode.ACT)
+        await handler._begin_task_overlay()
+        assert file_ops.overlay is None
+
+        handler.mode_manager.update_mode_config(AgentMode.ACT, {'use_overlay': True})
+        await handler._begin_task_overlay()
+        assert file_ops.overlay is not None
+        handler.async_file_ops.shutdown()
+
+class TestImportGraph:
+    """Test suite for the import graph, reverse dependencies and affected tests"""
+
+    @pytest.fixture
+    def package(self, workspace: Path) -> Path:
+        """Add a src-layout package with tests to the workspace."""
+        files = {
+            'src/pkg/__init__.py': '',
+            'src/pkg/core.py': 'VALUE = 1\n',
+            'src/pkg/api.py': 'from .core import VALUE\n',
+            'src/pkg/cli.py': 'from pkg import api\n',
+            'src/other/core.py': 'OTHER = 2\n',
+            'tests/test_api.py': 'from pkg.api import VALUE\n',
+            'tests/test_cli.py': 'import pkg.cli\n',
+            'tests/test_other.py': 'from other.core import OTHER\n'
+        }
+        for rel_path, content in files.items():
+            path = workspace / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        return workspace
+
+    def test_dependents(self, package: Path, file_ops: FileOperations):
+        """Test direct and transitive importers are found"""
+        direct = file_ops.find_dependents('src/pkg/core.py', transitive=False)
+        assert direct['dependents'] == ['src/pkg/api.py']
+
+        transitive = file_ops.find_dependents('src/pkg/core.py')
+        assert transitive['dependents'] == ['src/pkg/api.py', 'src/pkg/cli.py',
+                                            'tests/test_api.py', 'tests/test_cli.py']
+        assert file_ops.find_dependents('src/pkg/cli.py')['imports'] == [
+            'src/pkg/__init__.py', 'src/pkg/api.py']
+
+    def test_affected_tests(self, package: Path, file_ops: FileOperations):
+        """Test only tests reaching a changed file are selected"""
+        assert file_ops.find_affected_tests(['src/pkg/api.py'])['tests'] == [
+            'tests/test_api.py', 'tests/test_cli.py']
+        assert file_ops.find_affected_tests(['src/other'])['tests'] == ['tests/test_other.py']
+        assert file_ops.find_affected_tests(['tests/test_cli.py'])['tests'] == [
+            'tests/test_cli.py']
+
+    def test_graph_follows_changes(self, package: Path, file_ops: FileOperations):
+        """Test edits and new files are reflected without re-parsing everything"""
+        assert file_ops.find_affected_tests(['src/other/core.py'])['tests'] == [
+            'tests/test_other.py']
+        file_ops.create_file('tests/test_other.py', 'import json\n')
+        file_ops.create_file('tests/test_new.py', 'from other import core\n')
+
+        assert file_ops.find_affected_tests(['src/other/core.py'])['tests'] == [
+            'tests/test_new.py']
+        assert file_ops.import_graph.refresh() == 0
+
+    def test_graph_sees_outside_edits(self, package: Path, file_ops: FileOperations):
+        """Test imports added outside the tool are followed without a watcher"""
+        assert file_ops.find_affected_tests(['src/other/core.py'])['tests'] == [
+            'tests/test_other.py']
+        (package / 'tests/test_extra.py').write_text('from other.core import OTHER\n')
+
+        assert file_ops.find_affected_tests(['src/other/core.py'])['tests'] == [
+            'tests/test_extra.py', 'tests/test_other.py']
+
+    @pytest.mark.parametrize("rel_path,expected", [
+        ('tests/helpers.py', True),
+        ('src/test_thing.py', True),
+        ('src/thing_test.py', True),
+        ('src/testing.py', False)
+    ])
+    def test_is_test_file(self, rel_path: str, expected: bool):
+        """Test test files are recognised by name and directory"""
+        assert is_test_file(rel_path) is expected
@@ -0,0 +1,411 @@
+"""
+Unit tests for the MemoryManager.
+
+Tests cover:
+- The SQLite memory store, TTLs and migration of JSON files and logs
+- Write-behind cache, flushing and per-agent locking
+- Similarity recall over memory entries
+- Memory budgets, eviction policies and summaries
+"""
+
+import gc
+import json
+import sqlite3
+import threading
+import time
+import weakref
+import pytest
+from pathlib import Path
+from typing import Any, Dict
+from ..memory.memory_budget import MemoryBudget, estimate_tokens
+from ..memory.memory_manager import MemoryManager
+from ..memory.semantic_index import SemanticIndex, tokenize
+
+# Test Fixtures
+
+@pytest.fixture
+def manager(tmp_path: Path) -> MemoryManager:
+    """Provide a MemoryManager over an empty project."""
+    return MemoryManager(str(tmp_path))
+
+def stored(tmp_path: Path, agent_name: str) -> Dict[str, Any]:
+    """An agent's memory as stored in the database."""
+    conn = sqlite3.connect(str(tmp_path / '.crewai_memories' / 'memory.db'))
+    try:
+        rows = conn.execute('SELECT key, value FROM memory WHERE agent = ?', (agent_name,))
+        return {key: json.loads(value) for key, value in rows}
+    finally:
+        conn.close()
+
+class TestMemoryStore:
+    """Test suite for the SQLite memory store"""
+
+    def test_round_trip(self, manager: MemoryManager):
+        """Test saved memory loads back unchanged"""
+        memory = {'history': ['a', 'b'], 'notes': {'x': 1}, 'text': 'tab\there\nnewline'}
+        manager.save_memory('coder', memory)
+
+        assert manager.load_memory('coder') == memory
+        manager.flush()
+        assert MemoryManager(str(Path(manager.memory_dir).parent)).load_memory('coder') == memory
+        assert manager.load_memory('other') == {}
+        assert manager.list_agents() == ['coder']
+
+    def test_saves_only_changes(self, tmp_path: Path, manager: MemoryManager):
+        """Test a save writes only keys that changed or were removed"""
+        manager.save_memory('coder', {'a': 1, 'b': 2, 'c': 3})
+        manager.flush()
+        written = time.time()
+        manager.save_memory('coder', {'a': 1, 'b': 20})
+        manager.flush()
+
+        assert manager.get_cache_stats()['flushed_records'] == 5
+        assert stored(tmp_path, 'coder') == {'a': 1, 'b': 20}
+        assert manager.store.changed_since('coder', written) == {'b': 20}
+        assert manager.store.get('coder', 'a') == 1
+
+    def test_loads_see_other_writers(self, tmp_path: Path, manager: MemoryManager):
+        """Test writes by another manager are picked up, and own flushes keep the cache"""
+        manager.save_memory('coder', {'a': 1})
+        manager.flush()
+        manager.load_memory('coder')
+        other = MemoryManager(str(tmp_path))
+        other.update_memory('coder', {'b': 2})
+        other.flush()
+
+        misses = manager.get_cache_stats()['misses']
+        assert manager.load_memory('coder') == {'a': 1, 'b': 2}
+        assert manager.get_cache_stats()['misses'] == misses + 1
+        assert manager.get_memory_stats('coder')['keys'] == 2
+
+    def test_concurrent_managers_lose_nothing(self, tmp_path: Path):
+        """Test managers in different threads writing one agent keep every key"""
+        def work(worker):
+            manager = MemoryManager(str(tmp_path), flush_delay=None)
+            for turn in range(20):
+                manager.update_memory('coder', {f'{worker}-{turn}': turn})
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(MemoryManager(str(tmp_path)).load_memory('coder')) == 80
+
+    def test_ttl(self, tmp_path: Path, manager: MemoryManager):
+        """Test keys with a time to live disappear once it runs out"""
+        manager.update_memory('coder', {'scratch': 'x'}, ttl=0.05)
+        manager.update_memory('coder', {'fact': 'y'})
+        manager.flush()
+        assert manager.get_memory_stats('coder') == {'keys': 2, 'bytes': 6, 'expiring': 1}
+        time.sleep(0.1)
+
+        assert manager.load_memory('coder') == {'fact': 'y'}
+        assert MemoryManager(str(tmp_path)).load_memory('coder') == {'fact': 'y'}
+        manager.compact_memory('coder')
+        assert stored(tmp_path, 'coder') == {'fact': 'y'}
+
+    def test_legacy_files_are_migrated(self, tmp_path: Path):
+        """Test memories saved as JSON files or logs are imported into the store"""
+        memory_dir = tmp_path / '.crewai_memories'
+        memory_dir.mkdir()
+        (memory_dir / 'coder.json').write_text(json.dumps({'a': [1, 2]}, indent=2))
+        # A log whose last record was torn by a crash
+        (memory_dir / 'tester.log').write_text(
+            'set\t"b"\t1\nset\t"d"\t2\ndel\t"d"\nset\t"c"\t{"unfinish')
+
+        manager = MemoryManager(str(tmp_path))
+        assert manager.load_memory('coder') == {'a': [1, 2]}
+        assert manager.load_memory('tester') == {'b': 1}
+        assert not (memory_dir / 'coder.json').exists()
+        assert not (memory_dir / 'tester.log').exists()
+
+    def test_corrupt_legacy_file_is_set_aside(self, tmp_path: Path):
+        """Test an unreadable memory file does not stop the others being imported"""
+        memory_dir = tmp_path / '.crewai_memories'
+        memory_dir.mkdir()
+        (memory_dir / 'broken.json').write_text('{"a": ')
+        (memory_dir / 'listed.json').write_text('[1, 2]')
+        (memory_dir / 'coder.json').write_text(json.dumps({'a': 1}))
+
+        manager = MemoryManager(str(tmp_path))
+        assert manager.load_memory('coder') == {'a': 1}
+        assert manager.load_memory('broken') == {}
+        assert (memory_dir / 'broken.json.corrupt').read_text() == '{"a": '
+        assert (memory_dir / 'listed.json.corrupt').exists()
+        assert not (memory_dir / 'broken.json').exists()
+
+    def test_clear(self, tmp_path: Path, manager: MemoryManager):
+        """Test clearing removes the agent's rows"""
+        manager.save_memory('coder', {'a': 1})
+        manager.save_memory('tester', {'a': 2})
+        manager.flush()
+        manager.clear_memory('coder')
+
+        assert manager.load_memory('coder') == {}
+        assert stored(tmp_path, 'coder') == {}
+        assert stored(tmp_path, 'tester') == {'a': 2}
+
+class TestMemoryCache:
+    """Test suite for the write-behind memory cache"""
+
+    def test_loads_hit_the_cache(self, manager: MemoryManager):
+        """Test repeated loads are served from memory"""
+        manager.save_memory('coder', {'a': 1})
+        for _ in range(3):
+            manager.load_memory('coder')
+        stats = manager.get_cache_stats()
+
+        assert (stats['hits'], stats['misses']) == (3, 0)
+        assert stats['hit_ratio'] == 1.0
+
+    def test_loaded_memory_is_a_copy(self, manager: MemoryManager):
+        """Test changing a loaded dict only takes effect when saved"""
+        manager.save_memory('coder', {'items': [1]})
+        memory = manager.load_memory('coder')
+        memory['items'].append(2)
+        assert manager.load_memory('coder') == {'items': [1]}
+
+        manager.save_memory('coder', memory)
+        manager.flush()
+        assert manager.load_memory('coder') == {'items': [1, 2]}
+
+    def test_writes_are_coalesced(self, tmp_path: Path, manager: MemoryManager):
+        """Test writes between flushes reach the log as one record per key"""
+        for turn in range(10):
+            manager.update_memory('coder', {'turn': turn, 'fixed': True})
+        assert stored(tmp_path, 'coder') == {}
+        manager.flush()
+
+        assert stored(tmp_path, 'coder') == {'turn': 9, 'fixed': True}
+        stats = manager.get_cache_stats()
+        assert (stats['flushes'], stats['flushed_records'], stats['dirty_agents']) == (1, 2, 0)
+        assert stats['flush_ms_total'] == stats['flush_ms_max'] == stats['flush_ms_last']
+
+    def test_background_flush(self, tmp_path: Path):
+        """Test dirty memory is flushed once writes settle"""
+        manager = MemoryManager(str(tmp_path), flush_delay=0.05)
+        manager.save_memory('coder', {'a': 1})
+        deadline = time.monotonic() + 5
+        while not manager.get_cache_stats()['flushes'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert stored(tmp_path, 'coder') == {'a': 1}
+        manager.close()
+
+    def test_close_flushes(self, tmp_path: Path):
+        """Test shutting down writes pending changes"""
+        manager = MemoryManager(str(tmp_path), flush_delay=60)
+        manager.save_memory('coder', {'a': 1})
+        manager.close()
+        assert MemoryManager(str(tmp_path)).load_memory('coder') == {'a': 1}
+
+    def test_closed_manager_is_released(self, tmp_path: Path):
+        """Test the exit hook does not keep a closed manager alive"""
+        manager = MemoryManager(str(tmp_path), flush_delay=60)
+        manager.save_memory('coder', {'a': 1})
+        manager.close()
+        released = weakref.ref(manager)
+        del manager
+        gc.collect()
+        assert released() is None
+
+    def test_write_through(self, tmp_path: Path):
+        """Test writes go straight to disk without a flush delay"""
+        manager = MemoryManager(str(tmp_path), flush_delay=None)
+        manager.save_memory('coder', {'a': 1})
+        assert stored(tmp_path, 'coder') == {'a': 1}
+
+    def test_agent_lock_serialises_updates(self, manager: MemoryManager):
+        """Test concurrent read-modify-write cycles under the agent lock lose nothing"""
+        def work():
+            for _ in range(50):
+                with manager.agent_lock('coder'):
+                    memory = manager.load_memory('coder')
+                    memory['count'] = memory.get('count', 0) + 1
+                    manager.save_memory('coder', memory)
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        manager.flush()
+
+        assert manager.load_memory('coder') == {'count': 200}
+
+class TestMemoryRecall:
+    """Test suite for similarity recall"""
+
+    def test_recall_ranks_relevant_entries(self, manager: MemoryManager):
+        """Test the entries sharing the query's words come first"""
+        manager.save_memory('coder', {
+            'db_notes': 'the database connection pool uses sqlite',
+            'ui_notes': 'buttons are rendered with react components',
+            'auth': {'summary': 'login tokens expire after one hour'}
+        })
+        results = manager.recall('coder', 'sqlite database pool', k=2)
+
+        assert results[0]['key'] == 'db_notes'
+        assert results[0]['value'] == 'the database connection pool uses sqlite'
+        assert all(result['score'] > 0 for result in results)
+        assert manager.recall('coder', 'login token expiry')[0]['key'] == 'auth'
+
+    def test_recall_follows_writes(self, manager: MemoryManager):
+        """Test the index is updated incrementally as memory changes"""
+        manager.save_memory('coder', {'a': 'parser handles unicode', 'b': 'cache eviction policy'})
+        assert manager.recall('coder', 'parser', k=1)[0]['key'] == 'a'
+
+        manager.update_memory('coder', {'c': 'parser error recovery'}, deleted=['a'])
+        assert [result['key'] for result in manager.recall('coder', 'parser')] == ['c']
+        manager.clear_memory('coder')
+        assert manager.recall('coder', 'parser') == []
+
+    def test_recall_uses_encoder(self, tmp_path: Path):
+        """Test a supplied encoder replaces hashed TF-IDF"""
+        import numpy as np
+        def encoder(texts):
+            return np.array([[text.count('x'), text.count('y')] for text in texts])
+        manager = MemoryManager(str(tmp_path), encoder=encoder, dimensions=2)
+        manager.save_memory('coder', {'k1': 'xxx', 'k2': 'yyy'})
+
+        assert manager.recall('coder', 'yy', k=1)[0]['key'] == 'k2'
+
+    def test_index_removal_keeps_rows_consistent(self):
+        """Test deleting entries moves rows without mixing up keys"""
+        index = SemanticIndex(dimensions=64)
+        index.upsert({f'k{i}': f'word{i} common' for i in range(40)})
+        index.remove([f'k{i}' for i in range(0, 40, 2)])
+
+        assert len(index) == 20
+        assert index.search('word7', k=1)[0][0] == 'k7'
+        assert 'k8' not in index
+        assert tokenize('parseHTTPRequest snake_case') == ['parse', 'httprequest', 'snake', 'case']
+
+class TestMemoryBudget:
+    """Test suite for memory budgets and eviction"""
+
+    @staticmethod
+    def write_entries(manager: MemoryManager, count: int, **kwargs):
+        """Write entries of 10 tokens each, one at a time so their times differ."""
+        for i in range(count):
+            manager.update_memory('coder', {f'k{i}': 'x' * 37}, **kwargs)
+            time.sleep(0.002)
+
+    def test_within_budget_keeps_everything(self, tmp_path: Path):
+        """Test nothing is evicted while memory fits"""
+        manager = MemoryManager(str(tmp_path), flush_delay=None,
+                                budget=MemoryBudget(max_tokens=100))
+        self.write_entries(manager, 5)
+        result = manager.enforce_budget('coder')
+
+        assert result == {'evicted': [], 'summary': None, 'tokens': 50, 'bytes': 5 * 41}
+        assert estimate_tokens('k0 ' + 'x' * 37) == 10
+
+    def test_lru_evicts_least_recently_used(self, tmp_path: Path):
+        """Test eviction brings memory to the target ratio, sparing recalled entries"""
+        manager = MemoryManager(str(tmp_path), flush_delay=None,
+                                budget=MemoryBudget(max_tokens=50, target_ratio=0.6))
+        self.write_entries(manager, 6)
+        manager.update_memory('coder', {'k0': 'x' * 36 + ' needle'})
+        manager.update_memory('coder', {'k0': 'x' * 37})
+        time.sleep(0.002)
+        assert manager.recall('coder', 'k1', k=1)[0]['key'] == 'k1'
+        result = manager.enforce_budget('coder')
+
+        assert result['evicted'] == ['k2', 'k3', 'k4']
+        assert sorted(manager.load_memory('coder')) == ['k0', 'k1', 'k5']
+        assert result['tokens'] == 30
+        assert sorted(stored(tmp_path, 'coder')) == ['k0', 'k1', 'k5']
+        assert manager.get_cache_stats()['evicted'] == 3
+
+    def test_importance_policy(self, tmp_path: Path):
+        """Test the least important entries go first"""
+        manager = MemoryManager(str(tmp_path), flush_delay=None,
+                                budget=MemoryBudget(max_tokens=30, policy='importance'))
+        self.write_entries(manager, 4)
+        manager.update_memory('coder', {'k0': 'x' * 37}, importance=5)
+        manager.update_memory('coder', {'k3': 'x' * 37}, importance=1)
+
+        assert manager.enforce_budget('coder')['evicted'] == ['k1', 'k2']
+
+    def test_ttl_policy(self, tmp_path: Path):
+        """Test entries expiring soonest go first, those without a TTL last"""
+        manager = MemoryManager(str(tmp_path), flush_delay=None,
+                                budget=MemoryBudget(max_tokens=30, policy='ttl'))
+        manager.update_memory('coder', {'keep': 'x' * 35})
+        manager.update_memory('coder', {'long': 'x' * 35}, ttl=600)
+        manager.update_memory('coder', {'short': 'x' * 34}, ttl=60)
+        manager.update_memory('coder', {'mid': 'x' * 36}, ttl=300)
+
+        assert manager.enforce_budget('coder')['evicted'] == ['short', 'mid']
+
+    def test_byte_budget(self, tmp_path: Path):
+        """Test a byte limit is enforced like a token limit"""
+        manager = MemoryManager(str(tmp_path), flush_delay=None)
+        manager.set_budget('coder', MemoryBudget(max_bytes=100, target_ratio=1.0))
+        self.write_entries(manager, 4)
+
+        assert manager.enforce_budget('coder')['bytes'] <= 100
+        assert manager.enforce_budget('other')['evicted'] == []
+
+    def test_summarize_folds_evicted_entries(self, tmp_path: Path):
+        """Test evicted entries are replaced by one bounded summary"""
+        seen = {}
+        def summarizer(entries, max_tokens):
+            seen.update(entries)
+            return 'summary of ' + ', '.join(sorted(entries)) * 100
+        budget = MemoryBudget(max_tokens=60, summarize=True, summary_tokens=8)
+        manager = MemoryManager(str(tmp_path), flush_delay=None, budget=budget,
+                                summarizer=summarizer)
+        self.write_entries(manager, 7)
+        result = manager.enforce_budget('coder')
+
+        memory = manager.load_memory('coder')
+        assert set(seen) == set(result['evicted'])
+        assert result['summary'].startswith('summary:')
+        assert memory[result['summary']].startswith('summary of k0')
+        assert estimate_tokens(memory[result['summary']]) <= 8
+        assert result['tokens'] <= 60 * 0.8
+
+    def test_default_summary_shortens_entries(self, tmp_path: Path):
+        """Test without a summarizer each evicted entry keeps a share of the summary"""
+        budget = MemoryBudget(max_tokens=40, summarize=True, summary_tokens=10)
+        manager = MemoryManager(str(tmp_path), flush_delay=None, budget=budget)
+        self.write_entries(manager, 5)
+        result = manager.enforce_budget('coder')
+
+        summary = manager.load_memory('coder')[result['summary']]
+        assert [line.split(':')[0] for line in summary.splitlines()] == result['evicted']
+
+    def test_background_enforcement(self, tmp_path: Path):
+        """Test memory over budget is evicted once writes settle"""
+        manager = MemoryManager(str(tmp_path), flush_delay=0.05,
+                                budget=MemoryBudget(max_tokens=50))
+        self.write_entries(manager, 10)
+        deadline = time.monotonic() + 5
+        while not manager.get_cache_stats()['evicted'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        manager.close()
+
+        assert len(manager.load_memory('coder')) == 4
+        assert len(MemoryManager(str(tmp_path)).load_memory('coder')) == 4
+
+    def test_store_schema_is_upgraded(self, tmp_path: Path):
+        """Test a database from before eviction metadata gains its columns"""
+        memory_dir = tmp_path / '.crewai_memories'
+        memory_dir.mkdir()
+        conn = sqlite3.connect(str(memory_dir / 'memory.db'))
+        conn.executescript('''
+            CREATE TABLE memory (agent TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                                 updated_at REAL NOT NULL, expires_at REAL,
+                                 PRIMARY KEY (agent, key)) WITHOUT ROWID;
+            CREATE TABLE namespaces (agent TEXT PRIMARY KEY, version INTEGER NOT NULL);
+            INSERT INTO memory VALUES ('coder', 'a', '1', 0, NULL);
+            INSERT INTO namespaces VALUES ('coder', 1);
+        ''')
+        conn.close()
+
+        manager = MemoryManager(str(tmp_path), flush_delay=None)
+        manager.update_memory('coder', {'b': 2}, importance=3)
+        assert manager.load_memory('coder') == {'a': 1, 'b': 2}
+        assert manager.store.metadata('coder')['b'][2] == 3
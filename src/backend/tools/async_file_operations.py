@@ -0,0 +1,150 @@
+"""
+Asyncio facade over FileOperations.
+
+Every call runs on a dedicated worker thread so slow disk work (tree copies,
+recursive deletes, large listings) never blocks the event loop. FileOperations
+is not thread-safe (its caches, overlay and write buffer are shared), so the
+calls run one at a time, in the order they were made; callers sharing a
+FileOperations share its facade through AsyncFileOperations.shared. Cancelling
+the awaiting task, or hitting its timeout, drops work that has not started
+yet and stops streamed iterations between items. Each operation's wall time
+is recorded for diagnostics.
+"""
+from typing import Dict, Any, AsyncIterator, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+import asyncio
+import functools
+import logging
+import threading
+import time
+from .file_operations import FileOperations
+
+logger = logging.getLogger(__name__)
+
+# Operations slower than this are logged
+SLOW_OPERATION_MS = 500.0
+
+@dataclass
+class OperationTiming:
+    """Accumulated wall time of one operation"""
+    count: int = 0
+    errors: int = 0
+    cancelled: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['avg_ms'] = self.total_ms / self.count if self.count else 0.0
+        return data
+
+class AsyncFileOperations:
+    """Runs FileOperations methods off the event loop"""
+
+    # id(FileOperations) -> its shared facade, until the facade is shut down
+    _shared: Dict[int, 'AsyncFileOperations'] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, file_ops: FileOperations) -> 'AsyncFileOperations':
+        """The facade every caller of a FileOperations should use, created on first use"""
+        with cls._shared_lock:
+            facade = cls._shared.get(id(file_ops))
+            if facade is None or facade.file_ops is not file_ops:
+                facade = cls._shared[id(file_ops)] = cls(file_ops)
+            return facade
+
+    def __init__(self, file_ops: FileOperations):
+        self.file_ops = file_ops
+        self.timings: Dict[str, OperationTiming] = {}
+        # One worker serialises the calls; FileOperations parallelises internally
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-ops')
+        self._lock = threading.Lock()
+
+    def _method(self, operation: str):
+        method = getattr(self.file_ops, operation, None)
+        if operation.startswith('_') or not callable(method):
+            raise AttributeError(f'Unknown file operation: {operation}')
+        return method
+
+    def _record(self, operation: str, started: float, outcome: str) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            timing = self.timings.setdefault(operation, OperationTiming())
+            timing.count += 1
+            timing.total_ms += elapsed_ms
+            timing.max_ms = max(timing.max_ms, elapsed_ms)
+            timing.last_ms = elapsed_ms
+            if outcome == 'error':
+                timing.errors += 1
+            elif outcome == 'cancelled':
+                timing.cancelled += 1
+        if elapsed_ms >= SLOW_OPERATION_MS:
+            logger.info(f"File operation {operation} took {elapsed_ms:.0f} ms")
+
+    async def run(self, operation: str, timeout: Optional[float] = None, **params) -> Dict[str, Any]:
+        """Run a FileOperations method on the executor
+
+        Args:
+            operation: Method name, e.g. 'copy_file'
+            timeout: Seconds to wait before giving up (asyncio.TimeoutError)
+            **params: Method arguments
+        """
+        method = self._method(operation)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            future = loop.run_in_executor(self._executor, functools.partial(method, **params))
+            result = await asyncio.wait_for(future, timeout)
+            if isinstance(result, dict) and result.get('status') == 'success':
+                outcome = 'success'
+            return result
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            outcome = 'cancelled'
+            raise
+        finally:
+            self._record(operation, started, outcome)
+
+    async def iterate(self, operation: str, **params) -> AsyncIterator[Any]:
+        """Consume a FileOperations generator (e.g. 'iter_file_chunks') off the loop
+
+        Each item is produced on the executor; closing or cancelling the
+        iteration closes the underlying generator before the next item.
+        """
+        method = self._method(operation)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        outcome = 'error'
+        sentinel = object()
+        iterator = await loop.run_in_executor(self._executor,
+                                              lambda: iter(method(**params)))
+        try:
+            while True:
+                item = await loop.run_in_executor(self._executor, next, iterator, sentinel)
+                if item is sentinel:
+                    break
+                yield item
+            outcome = 'success'
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = 'cancelled'
+            raise
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(self._executor, close)
+            self._record(operation, started, outcome)
+
+    def get_timings(self) -> Dict[str, Any]:
+        """Per-operation call counts and wall times"""
+        with self._lock:
+            return {name: timing.to_dict() for name, timing in self.timings.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the executor, dropping queued work"""
+        with self._shared_lock:
+            if self._shared.get(id(self.file_ops)) is self:
+                del self._shared[id(self.file_ops)]
+        self._executor.shutdown(wait=wait, cancel_futures=True)
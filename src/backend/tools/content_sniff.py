@@ -0,0 +1,101 @@
+"""
+Cheap text/binary and encoding detection from a file's first bytes.
+
+Only a short prefix is inspected: byte-order marks first (UTF-16/32 text
+contains NUL bytes), then magic numbers of common binary formats, then NUL
+bytes, and finally whether the prefix decodes as UTF-8. Text that is not
+UTF-8 is read as cp1252, falling back to latin-1 which decodes anything.
+"""
+from typing import NamedTuple, Optional
+import codecs
+
+SNIFF_BYTES = 8192
+
+# Share of control characters above which undecodable data counts as binary
+CONTROL_RATIO = 0.3
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+MAGIC_NUMBERS = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'%PDF-', 'pdf'),
+    (b'PK\x03\x04', 'zip'),
+    (b'PK\x05\x06', 'zip'),
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b"7z\xbc\xaf'\x1c", '7z'),
+    (b'\x7fELF', 'elf'),
+    (b'\xcf\xfa\xed\xfe', 'mach-o'),
+    (b'\xca\xfe\xba\xbe', 'mach-o/class'),
+    (b'SQLite format 3\x00', 'sqlite'),
+    (b'\x00asm', 'wasm'),
+    (b'wOFF', 'woff'),
+    (b'wOF2', 'woff2'),
+    (b'ID3', 'mp3'),
+    (b'OggS', 'ogg'),
+    (b'\x00\x00\x01\x00', 'ico'),
+    (b'PAR1', 'parquet'),
+    (b'ARROW1', 'arrow')
+]
+
+_TEXT_CONTROLS = {7, 8, 9, 10, 12, 13, 27}
+
+class SniffResult(NamedTuple):
+    """Outcome of sniffing a file prefix"""
+    is_binary: bool
+    encoding: Optional[str]
+    kind: Optional[str] = None
+
+def _magic_kind(data: bytes) -> Optional[str]:
+    for magic, kind in MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return kind
+    if data[:4] == b'RIFF' and data[8:12] in (b'WEBP', b'WAVE', b'AVI '):
+        return data[8:12].decode('ascii').strip().lower()
+    if data[:3] == b'BZh' and data[3:4].isdigit():
+        return 'bzip2'
+    if data[257:262] == b'ustar':
+        return 'tar'
+    return None
+
+def sniff(data: bytes) -> SniffResult:
+    """Classify a file from its first bytes"""
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return SniffResult(False, encoding)
+
+    kind = _magic_kind(data)
+    if kind is not None:
+        return SniffResult(True, None, kind)
+    if b'\0' in data:
+        return SniffResult(True, None)
+
+    try:
+        # A multi-byte character may be cut off at the end of the prefix
+        codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+        return SniffResult(False, 'utf-8')
+    except UnicodeDecodeError:
+        pass
+
+    controls = sum(1 for byte in data if byte < 32 and byte not in _TEXT_CONTROLS)
+    if data and controls / len(data) > CONTROL_RATIO:
+        return SniffResult(True, None)
+    try:
+        data.decode('cp1252')
+        return SniffResult(False, 'cp1252')
+    except UnicodeDecodeError:
+        return SniffResult(False, 'latin-1')
+
+def sniff_file(full_path: str) -> SniffResult:
+    """Classify a file by reading only its prefix"""
+    with open(full_path, 'rb') as f:
+        return sniff(f.read(SNIFF_BYTES))
@@ -0,0 +1,176 @@
+"""
+File and tree copies that let the kernel move the data.
+
+For each file the fastest available mechanism is tried in turn: a reflink
+(FICLONE, copy-on-write on Btrfs/XFS/APFS-like filesystems), then
+os.copy_file_range, then os.sendfile, then a plain buffered copy.
+Mechanisms a pair of devices has rejected once are not tried again.
+Directory copies create the directory skeleton first, recreating symlinks
+as symlinks, and then copy files on a thread pool. Special files (FIFOs,
+sockets, devices) are never opened: a tree copy skips and reports them,
+and copying one directly raises shutil.SpecialFileError.
+"""
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import os
+import shutil
+import stat
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # fcntl is not available on Windows
+    fcntl = None
+
+# ioctl request number of FICLONE on Linux
+FICLONE = 0x40049409
+
+# Chunk size for copy_file_range and sendfile calls
+COPY_CHUNK = 64 * 1024 * 1024
+
+# Errors meaning "this mechanism does not work here", as opposed to real I/O failures
+_UNSUPPORTED = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EBADF,
+    getattr(errno, 'EOPNOTSUPP', errno.ENOTSUP), errno.ENOTSUP, errno.EPERM
+}
+
+_unsupported: Set[Tuple[str, int, int]] = set()
+_unsupported_lock = threading.Lock()
+
+def _supported(method: str, devices: Tuple[int, int]) -> bool:
+    return (method, *devices) not in _unsupported
+
+def _mark_unsupported(method: str, devices: Tuple[int, int]) -> None:
+    with _unsupported_lock:
+        _unsupported.add((method, *devices))
+
+def _reflink(src_fd: int, dst_fd: int, size: int) -> None:
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, 'fcntl unavailable')
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+def _copy_range(src_fd: int, dst_fd: int, size: int) -> None:
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+
+def _sendfile(src_fd: int, dst_fd: int, size: int) -> None:
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+
+_METHODS: List[Tuple[str, Callable[[int, int, int], None]]] = [('reflink', _reflink)]
+if hasattr(os, 'copy_file_range'):
+    _METHODS.append(('copy_file_range', _copy_range))
+if hasattr(os, 'sendfile'):
+    _METHODS.append(('sendfile', _sendfile))
+
+def _rewind(src, dst) -> None:
+    """Move both files back to the start and empty the destination
+
+    Kernel copies move the descriptors' offsets behind the file objects'
+    backs, so the descriptors are reset before the objects.
+    """
+    os.lseek(src.fileno(), 0, os.SEEK_SET)
+    os.lseek(dst.fileno(), 0, os.SEEK_SET)
+    src.seek(0)
+    dst.seek(0)
+    dst.truncate()
+
+def copy_file_fast(source: str, dest: str) -> Tuple[int, str]:
+    """Copy one file's data and metadata (like shutil.copy2)
+
+    Returns:
+        Tuple of bytes copied and the mechanism that moved them
+    """
+    with open(source, 'rb') as src, open(dest, 'wb') as dst:
+        src_stat = os.fstat(src.fileno())
+        size = src_stat.st_size
+        devices = (src_stat.st_dev, os.fstat(dst.fileno()).st_dev)
+        method = 'buffered'
+        for name, copy in _METHODS:
+            if not _supported(name, devices):
+                continue
+            try:
+                copy(src.fileno(), dst.fileno(), size)
+                method = name
+                break
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                _mark_unsupported(name, devices)
+                # A failed attempt may have copied part of the data
+                _rewind(src, dst)
+        if method == 'buffered':
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+    shutil.copystat(source, dest)
+    return size, method
+
+def copy_tree_fast(source: str, dest: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Copy a directory tree, copying files in parallel
+
+    Symlinks are recreated pointing at the same target, not followed.
+
+    Returns:
+        Dict with bytes, files and symlinks copied, a count per copy mechanism
+        and the special files skipped ('skipped')
+    """
+    directories: List[Tuple[str, str]] = []
+    files: List[Tuple[str, str]] = []
+    skipped: List[str] = []
+    links = 0
+    pending = [(source, dest)]
+    while pending:
+        src_dir, dst_dir = pending.pop()
+        os.makedirs(dst_dir)
+        directories.append((src_dir, dst_dir))
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                    links += 1
+                elif entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, target))
+                elif entry.is_file(follow_symlinks=False):
+                    files.append((entry.path, target))
+                else:
+                    # Opening a FIFO would block forever
+                    skipped.append(entry.path)
+
+    totals = {'bytes': 0, 'files': len(files), 'links': links, 'methods': {},
+              'skipped': skipped}
+    workers = max(1, min(max_workers or 8, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for size, method in executor.map(lambda pair: copy_file_fast(*pair), files):
+            totals['bytes'] += size
+            totals['methods'][method] = totals['methods'].get(method, 0) + 1
+
+    # Directory times change while files are added, so copy their metadata last
+    for src_dir, dst_dir in reversed(directories):
+        shutil.copystat(src_dir, dst_dir)
+    return totals
+
+def copy_path(source: str, dest: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Copy a file or directory, reporting throughput"""
+    started = time.perf_counter()
+    mode = os.stat(source).st_mode
+    if stat.S_ISDIR(mode):
+        totals = copy_tree_fast(source, dest, max_workers)
+    elif not stat.S_ISREG(mode):
+        raise shutil.SpecialFileError(f'{source} is a named pipe, socket or device')
+    else:
+        size, method = copy_file_fast(source, dest)
+        totals = {'bytes': size, 'files': 1, 'methods': {method: 1}}
+    elapsed = time.perf_counter() - started
+    totals['elapsed'] = elapsed
+    totals['bytes_per_second'] = totals['bytes'] / elapsed if elapsed > 0 else 0.0
+    return totals
@@ -1,30 +1,646 @@
 import os
 import shutil
-from typing import Dict, Any, List
+import fnmatch
+import threading
+from typing import Dict, Any, Callable, List, Iterator, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import json
-from pathlib import Path
+import logging
+import re
+from .workspace_walker import IgnoreRules, walk_workspace
+from .workspace_index import WorkspaceIndex
+from .content_sniff import SNIFF_BYTES, SniffResult, sniff, sniff_file
+from .fast_copy import copy_path
+from .import_graph import ImportGraph
+from .overlay import Overlay
+from .patching import PatchError, apply_replacements, apply_unified_diff, content_hash
+from .ranged_reads import (
+    DEFAULT_CHUNK_SIZE,
+    MMAP_THRESHOLD,
+    iter_chunks,
+    read_byte_range,
+    read_line_range,
+    slice_byte_range,
+    slice_lines
+)
+from .read_cache import DEFAULT_MAX_BYTES, FileKey, ReadCache, file_key
+from .search_index import DEFAULT_MAX_RESULTS, SearchIndex
+from .symbol_index import SymbolIndex
+from .workspace_fingerprint import WorkspaceFingerprint
+from .write_buffer import WriteBuffer, validate_durability, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Encodings in which b'\n' always separates lines, so mmap line windows work
+ASCII_COMPATIBLE = ('utf-8', 'utf-8-sig', 'cp1252', 'latin-1')
+
+# Sniff results kept, least recently used dropped first
+MAX_SNIFFED = 4096
 
 class FileOperations:
     """File operations tool for the CrewAI agent."""
-    def __init__(self, workspace_path: str):
+    def __init__(self,
+                 workspace_path: str,
+                 excludes: Optional[List[str]] = None,
+                 use_gitignore: bool = True,
+                 read_cache_bytes: int = DEFAULT_MAX_BYTES,
+                 max_workers: Optional[int] = None):
         self.workspace_path = workspace_path
+        self.ignore_rules = IgnoreRules(workspace_path, excludes, use_gitignore)
+        self.index: Optional[WorkspaceIndex] = None
+        self.read_cache = ReadCache(read_cache_bytes)
+        self.search_index: Optional[SearchIndex] = None
+        self.symbol_index: Optional[SymbolIndex] = None
+        self.import_graph: Optional[ImportGraph] = None
+        self.fingerprint: Optional[WorkspaceFingerprint] = None
+        # path -> sniff result for one version of the file, in LRU order
+        self._sniffed: 'OrderedDict[str, Tuple[FileKey, SniffResult]]' = OrderedDict()
+        self._sniffed_lock = threading.Lock()
+        # Upper bound on threads used by batch operations
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        # Buffered create_file writes not yet on disk
+        self.write_buffer = WriteBuffer()
+        # Uncommitted changes while an overlay is active
+        self.overlay: Optional[Overlay] = None
+
+    def start_index(self, watch: bool = True, warm_start: bool = True) -> Dict[str, Any]:
+        """Build (or restore) the in-memory workspace index used by listings and stats"""
+        try:
+            if self.index is None:
+                self.index = WorkspaceIndex(self.workspace_path, self.ignore_rules)
+                self.index.listeners.append(self._on_path_changed)
+                self.index.start(watch=watch, warm_start=warm_start)
+            return {
+                'status': 'success',
+                'entries': len(self.index),
+                'watching': self.index.watching
+            }
+        except Exception as e:
+            self.index = None
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def stop_index(self) -> Dict[str, Any]:
+        """Flush buffered writes, stop the workspace index and persist all index snapshots"""
+        try:
+            flushed = self.flush_writes()
+            if self.index is not None:
+                self.index.stop()
+                self.index = None
+            if self.search_index is not None:
+                self.search_index.save_snapshot()
+            if self.symbol_index is not None:
+                self.symbol_index.save_snapshot()
+            return flushed
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def start_search_index(self, warm_start: bool = True) -> Dict[str, Any]:
+        """Build (or restore and reconcile) the trigram index used by search"""
+        try:
+            if self.search_index is None:
+                search_index = SearchIndex(self.workspace_path, self.ignore_rules,
+                                           max_workers=self.max_workers)
+                search_index.start(warm_start=warm_start)
+                self.search_index = search_index
+            return {
+                'status': 'success',
+                'indexed_files': len(self.search_index)
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def start_symbol_index(self, warm_start: bool = True) -> Dict[str, Any]:
+        """Build (or restore and refresh) the Python symbol index"""
+        try:
+            if self.symbol_index is None:
+                symbol_index = SymbolIndex(self.workspace_path, self.ignore_rules)
+                symbol_index.start(warm_start=warm_start)
+                self.symbol_index = symbol_index
+            return {
+                'status': 'success',
+                'indexed_files': len(self.symbol_index)
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def _get_symbol_index(self) -> SymbolIndex:
+        """The symbol index, caught up with changes made outside this tool"""
+        if self.symbol_index is None:
+            started = self.start_symbol_index()
+            if started['status'] != 'success':
+                raise RuntimeError(started['error'])
+        elif not self._watching():
+            self.symbol_index.refresh()
+        return self.symbol_index
+
+    def find_symbol(self, name: str) -> Dict[str, Any]:
+        """Find where a Python class, function or method is defined
+
+        Accepts a plain name ('helper') or a qualified name ('Class.method').
+        """
+        try:
+            self._flush_pending()
+            definitions = self._get_symbol_index().lookup(name)
+            return {
+                'status': 'success',
+                'definitions': definitions,
+                'files': sorted({d['path'] for d in definitions})
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def find_symbols(self, names: List[str]) -> Dict[str, Any]:
+        """Look up several names at once; 'definitions' maps each name to its matches"""
+        try:
+            if not isinstance(names, list):
+                return {
+                    'status': 'error',
+                    'error': 'names must be a list of names'
+                }
+            self._flush_pending()
+            symbol_index = self._get_symbol_index()
+            return {
+                'status': 'success',
+                'definitions': {name: symbol_index.lookup(name) for name in names}
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_file_symbols(self, file_path: str) -> Dict[str, Any]:
+        """Get the definitions and imports of a Python file"""
+        try:
+            self._flush_pending(file_path)
+            summary = self._get_symbol_index().file_summary(self._rel_path(file_path))
+            if summary is None:
+                return {
+                    'status': 'error',
+                    'error': f'Not an indexed Python file: {file_path}'
+                }
+            return {
+                'status': 'success',
+                'symbols': summary
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def _get_import_graph(self) -> ImportGraph:
+        """The import graph, brought up to date with the symbol index"""
+        symbol_index = self._get_symbol_index()
+        if self.import_graph is None:
+            self.import_graph = ImportGraph(symbol_index)
+        self.import_graph.refresh()
+        return self.import_graph
+
+    def find_dependents(self, file_path: str, transitive: bool = True) -> Dict[str, Any]:
+        """Find the Python files that import a file (or any file below a directory)
+
+        With transitive set, files importing those files are included too,
+        i.e. everything a change to the path can affect.
+        """
+        try:
+            self._flush_pending()
+            graph = self._get_import_graph()
+            rel_path = self._rel_path(file_path)
+            return {
+                'status': 'success',
+                'dependents': graph.dependents([rel_path], transitive),
+                'imports': graph.imports_of(rel_path)
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def find_affected_tests(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Find the test files that exercise any of the given files
+
+        A test file counts when it imports one of the files directly or
+        through other modules, or is one of the files itself.
+        """
+        try:
+            if not isinstance(file_paths, list):
+                return {
+                    'status': 'error',
+                    'error': 'file_paths must be a list of paths'
+                }
+            self._flush_pending()
+            graph = self._get_import_graph()
+            return {
+                'status': 'success',
+                'tests': graph.tests_for(self._rel_path(path) for path in file_paths)
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def _compute_fingerprint(self) -> str:
+        """Update the Merkle tree, using the workspace index's stats when it is ready"""
+        self._flush_pending()
+        if self.fingerprint is None:
+            self.fingerprint = WorkspaceFingerprint(self.workspace_path, self.ignore_rules,
+                                                    max_workers=self.max_workers)
+            self.fingerprint.load()
+        stats = None
+        if self._index_ready():
+            stats = [(path, entry.mtime_ns, entry.size)
+                     for path, entry in self.index.iter_entries() if not entry.is_dir]
+        root = self.fingerprint.compute(stats)
+        self.fingerprint.save()
+        return root
+
+    def workspace_fingerprint(self) -> Dict[str, Any]:
+        """Get a hash of the content of every non-ignored file in the workspace
+
+        The fingerprint changes whenever any file is added, removed, renamed or
+        modified, so it can key caches. Only files whose mtime or size changed
+        since the last call are re-hashed.
+        """
+        try:
+            return {
+                'status': 'success',
+                'fingerprint': self._compute_fingerprint()
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def changed_since(self, fingerprint: str) -> Dict[str, Any]:
+        """List files added, modified and deleted since an earlier fingerprint"""
+        try:
+            current = self._compute_fingerprint()
+            if not self.fingerprint.knows(fingerprint):
+                return {
+                    'status': 'error',
+                    'error': f'Unknown or expired fingerprint: {fingerprint}',
+                    'fingerprint': current
+                }
+            return {
+                'status': 'success',
+                'fingerprint': current,
+                'changed': fingerprint != current,
+                **self.fingerprint.diff(fingerprint, current)
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def search(self,
+               query: str,
+               regex: bool = False,
+               case_sensitive: bool = True,
+               pattern: Optional[str] = None,
+               context: int = 2,
+               max_results: int = DEFAULT_MAX_RESULTS) -> Dict[str, Any]:
+        """Search workspace text files for a literal or regular expression
+
+        Returns file/line matches with surrounding context lines. The trigram
+        index is built on first use and kept current by changes made through
+        this tool (and by the workspace index's watcher, when running).
+        """
+        try:
+            if not query:
+                return {
+                    'status': 'error',
+                    'error': 'Search query is empty'
+                }
+            self._flush_pending()
+            if self.search_index is None:
+                started = self.start_search_index()
+                if started['status'] != 'success':
+                    return started
+            elif not self._watching():
+                # Catch up with edits made outside this tool (editors, git checkout)
+                self.search_index.reconcile()
+            return self.search_index.search(query, regex, case_sensitive, pattern,
+                                            context, max_results)
+        except re.error as e:
+            return {
+                'status': 'error',
+                'error': f'Invalid regular expression: {e}'
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def begin_overlay(self) -> Dict[str, Any]:
+        """Start collecting changes in an overlay instead of the workspace
+
+        Until commit_overlay or discard_overlay, writes, edits, deletions,
+        renames, copies and new directories are held in memory, and reads,
+        listings and file info show the workspace with them applied. Search,
+        symbol and fingerprint queries keep describing the workspace on disk.
+        """
+        try:
+            if self.overlay is not None:
+                return {
+                    'status': 'error',
+                    'error': 'An overlay is already active'
+                }
+            self._flush_pending()
+            self.overlay = Overlay()
+            return {
+                'status': 'success',
+                'message': 'Overlay started'
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_overlay_status(self) -> Dict[str, Any]:
+        """List the paths the active overlay writes, deletes and creates"""
+        if self.overlay is None:
+            return {
+                'status': 'success',
+                'active': False
+            }
+        return {
+            'status': 'success',
+            'active': True,
+            **self.overlay.changes()
+        }
+
+    def commit_overlay(self, durability: str = 'none') -> Dict[str, Any]:
+        """Apply the overlay's changes to the workspace and end it
+
+        Every new file is staged before the workspace is touched, so a failure
+        while writing leaves the workspace as it was and the overlay active.
+        Applying the staged changes is not atomic: a failure there leaves the
+        changes made so far in place, and the overlay active to retry.
+        """
+        try:
+            if self.overlay is None:
+                return {
+                    'status': 'error',
+                    'error': 'No active overlay'
+                }
+            changes = self.overlay.changes()
+            paths = self.overlay.paths()
+            self.overlay.commit(self.workspace_path,
+                                os.path.join(self.workspace_path, '.crewai_index'), durability)
+            self.overlay = None
+            self._mark_changed(*paths)
+            return {
+                'status': 'success',
+                'message': f'Committed {len(paths)} change(s)',
+                **changes
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def discard_overlay(self) -> Dict[str, Any]:
+        """Drop the overlay's changes and end it"""
+        if self.overlay is None:
+            return {
+                'status': 'error',
+                'error': 'No active overlay'
+            }
+        changes = self.overlay.changes()
+        self.overlay = None
+        return {
+            'status': 'success',
+            'message': 'Overlay discarded',
+            **changes
+        }
+
+    def _exists(self, file_path: str) -> bool:
+        """Whether a path exists, with overlay changes applied"""
+        if self.overlay is not None:
+            rel_path = self._rel_path(file_path)
+            if self.overlay.get(rel_path) is not None or self.overlay.has_directory(rel_path):
+                return True
+            if self.overlay.is_deleted(rel_path):
+                return False
+        return os.path.exists(os.path.join(self.workspace_path, file_path))
+
+    def _is_dir(self, file_path: str) -> bool:
+        """Whether a path is a directory, with overlay changes applied"""
+        if self.overlay is not None:
+            rel_path = self._rel_path(file_path)
+            if self.overlay.get(rel_path) is not None:
+                return False
+            if self.overlay.has_directory(rel_path):
+                return True
+            if self.overlay.is_deleted(rel_path):
+                return False
+        return os.path.isdir(os.path.join(self.workspace_path, file_path))
+
+    def _overlay_read(self, rel_path: str) -> bytes:
+        """Content of a file, from the overlay or the workspace"""
+        data = self.overlay.get(rel_path)
+        if data is None:
+            with open(os.path.join(self.workspace_path, rel_path), 'rb') as f:
+                data = f.read()
+        return data
+
+    def _overlay_remove(self, rel_path: str) -> None:
+        """Delete a file or directory in the overlay"""
+        on_disk = os.path.lexists(os.path.join(self.workspace_path, rel_path))
+        if self._is_dir(rel_path):
+            self.overlay.remove_directory(rel_path, on_disk)
+        else:
+            self.overlay.remove(rel_path, on_disk)
+
+    def _overlay_copy(self, source_path: str, dest_path: str) -> None:
+        """Copy a file or directory within the overlay"""
+        source_rel = self._rel_path(source_path)
+        dest_rel = self._rel_path(dest_path)
+        if not self._is_dir(source_path):
+            self.overlay.write(dest_rel, self._overlay_read(source_rel))
+            return
+        self.overlay.make_directory(dest_rel)
+        for item in list(self.iter_files(source_path, include_ignored=True)):
+            target = dest_rel + item['path'][len(source_rel):]
+            if item['type'] == 'directory':
+                self.overlay.make_directory(target)
+            else:
+                self.overlay.write(target, self._overlay_read(item['path']))
+
+    def _rel_path(self, file_path: str) -> str:
+        """Workspace-relative, '/'-separated form of a path"""
+        full_path = os.path.join(self.workspace_path, file_path)
+        return os.path.relpath(full_path, self.workspace_path).replace(os.sep, '/')
+
+    def _index_ready(self) -> bool:
+        return self.index is not None and self.index.ready
+
+    def _watching(self) -> bool:
+        """Whether filesystem events keep the search and symbol indexes current
+
+        Without a watcher they only hear of changes made through this tool,
+        so queries first re-stat the workspace and re-index what changed.
+        """
+        return self.index is not None and self.index.watching
+
+    def _mark_changed(self, *file_paths: str) -> None:
+        """Keep the indexes and read cache current after a change made through this tool"""
+        for file_path in file_paths:
+            rel_path = self._rel_path(file_path)
+            if self.index is not None:
+                # The index notifies _on_path_changed
+                self.index.refresh_path(rel_path)
+            else:
+                self._on_path_changed(rel_path)
 
-    def read_file(self, file_path: str) -> Dict[str, Any]:
-        """Read contents of a file"""
+    def _on_path_changed(self, rel_path: str) -> None:
+        """Drop cached content and re-index search and symbol data for a changed path"""
+        self.read_cache.invalidate(rel_path)
+        if self.search_index is not None:
+            self.search_index.update_path(rel_path)
+        if self.symbol_index is not None:
+            self.symbol_index.update_path(rel_path)
+
+    def _file_key(self, file_path: str, full_path: str) -> FileKey:
+        """Cache key for a file, from the watched index when possible"""
+        if self.index is not None and self.index.watching:
+            entry = self.index.get(self._rel_path(file_path))
+            if entry is not None and not entry.is_dir:
+                return entry.mtime_ns, entry.size, entry.inode
+        return file_key(os.stat(full_path))
+
+    def _sniff(self, rel_path: str, full_path: str, key: FileKey) -> SniffResult:
+        """Text/binary and encoding of a file version, from its prefix"""
+        with self._sniffed_lock:
+            cached = self._sniffed.get(rel_path)
+            if cached is not None and cached[0] == key:
+                self._sniffed.move_to_end(rel_path)
+                return cached[1]
+        result = sniff_file(full_path)
+        with self._sniffed_lock:
+            self._sniffed[rel_path] = (key, result)
+            self._sniffed.move_to_end(rel_path)
+            while len(self._sniffed) > MAX_SNIFFED:
+                self._sniffed.popitem(last=False)
+        return result
+
+    def get_read_cache_stats(self) -> Dict[str, Any]:
+        """Get read cache hit ratio and bytes saved"""
+        return {
+            'status': 'success',
+            'stats': self.read_cache.stats()
+        }
+
+    def read_file(self,
+                  file_path: str,
+                  offset: Optional[int] = None,
+                  length: Optional[int] = None,
+                  start_line: Optional[int] = None,
+                  end_line: Optional[int] = None) -> Dict[str, Any]:
+        """Read contents of a file, or a byte or line window of it
+
+        Args:
+            file_path: File to read, relative to the workspace
+            offset: First byte of a byte range
+            length: Number of bytes to read from offset (to the end if omitted)
+            start_line: First line (1-based) of a line range
+            end_line: Last line (inclusive) of a line range (to the end if omitted)
+
+        The encoding is detected from the file's first bytes. Binary files are
+        not decoded: the result has 'binary' set, their size and, when
+        recognised, their format in 'kind', but no content. Content of a
+        buffered write or of the active overlay is returned without touching
+        the disk.
+        """
         try:
+            byte_range = offset is not None or length is not None
+            line_range = start_line is not None or end_line is not None
+            if byte_range and line_range:
+                return {
+                    'status': 'error',
+                    'error': 'Use either a byte range or a line range, not both'
+                }
+
+            if self.overlay is not None:
+                data = self.overlay.get(self._rel_path(file_path))
+                if data is not None:
+                    return self._read_bytes(data, offset, length, start_line, end_line)
+                if self.overlay.is_deleted(self._rel_path(file_path)):
+                    return {
+                        'status': 'error',
+                        'error': f'File not found: {file_path}'
+                    }
+
+            pending = self.write_buffer.get(self._rel_path(file_path))
+            if pending is not None and not byte_range:
+                if line_range:
+                    return slice_lines(pending.content,
+                                       1 if start_line is None else start_line, end_line)
+                return {
+                    'status': 'success',
+                    'content': pending.content,
+                    'encoding': pending.encoding,
+                    'hash': content_hash(pending.content)
+                }
+            self._flush_pending(file_path)
+
             full_path = os.path.join(self.workspace_path, file_path)
-            if not os.path.exists(full_path):
+            try:
+                key = self._file_key(file_path, full_path)
+            except FileNotFoundError:
                 return {
                     'status': 'error',
                     'error': f'File not found: {file_path}'
                 }
-            
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
+
+            sniffed = self._sniff(self._rel_path(file_path), full_path, key)
+            if sniffed.is_binary:
+                return {
+                    'status': 'success',
+                    'binary': True,
+                    'kind': sniffed.kind,
+                    'size': key[1],
+                    'content': None
+                }
+            if byte_range:
+                return read_byte_range(full_path, offset or 0, length, sniffed.encoding)
+            if line_range:
+                start_line = 1 if start_line is None else start_line
+                if key[1] >= MMAP_THRESHOLD and sniffed.encoding in ASCII_COMPATIBLE:
+                    return read_line_range(full_path, start_line, end_line, sniffed.encoding)
+                return slice_lines(self._read_text(file_path, full_path, key, sniffed.encoding),
+                                   start_line, end_line)
+
+            content = self._read_text(file_path, full_path, key, sniffed.encoding)
             return {
                 'status': 'success',
-                'content': content
+                'content': content,
+                'encoding': sniffed.encoding,
+                'hash': content_hash(content)
             }
         except Exception as e:
             return {
@@ -32,14 +648,175 @@ class FileOperations:
                 'error': str(e)
             }
 
-    def create_file(self, file_path: str, content: str) -> Dict[str, Any]:
-        """Write content to a file"""
+    def _read_bytes(self,
+                    data: bytes,
+                    offset: Optional[int],
+                    length: Optional[int],
+                    start_line: Optional[int],
+                    end_line: Optional[int]) -> Dict[str, Any]:
+        """read_file over content held in memory"""
+        sniffed = sniff(data[:SNIFF_BYTES])
+        if sniffed.is_binary:
+            return {
+                'status': 'success',
+                'binary': True,
+                'kind': sniffed.kind,
+                'size': len(data),
+                'content': None
+            }
+        if offset is not None or length is not None:
+            return slice_byte_range(data, offset or 0, length, sniffed.encoding)
+        # Universal newlines, as files read from disk
+        content = data.decode(sniffed.encoding, errors='replace')
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        if start_line is not None or end_line is not None:
+            return slice_lines(content, 1 if start_line is None else start_line, end_line)
+        return {
+            'status': 'success',
+            'content': content,
+            'encoding': sniffed.encoding,
+            'hash': content_hash(content)
+        }
+
+    def _read_text(self,
+                   file_path: str,
+                   full_path: str,
+                   key: FileKey,
+                   encoding: str = 'utf-8') -> str:
+        """Whole file content, through the read cache"""
+        rel_path = self._rel_path(file_path)
+        content = self.read_cache.get(rel_path, key)
+        if content is None:
+            with open(full_path, 'r', encoding=encoding, errors='replace') as f:
+                content = f.read()
+            self.read_cache.put(rel_path, key, content)
+        return content
+
+    def iter_file_chunks(self,
+                         file_path: str,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         offset: int = 0,
+                         length: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream a file as decoded text chunks without loading it whole
+
+        Chunks are decoded in the file's detected encoding; binary files are
+        refused with a ValueError.
+
+        Yields:
+            Dicts with the byte 'offset' of the chunk and its text 'content'
+        """
+        self._flush_pending(file_path)
+        full_path = os.path.join(self.workspace_path, file_path)
+        sniffed = self._sniff(self._rel_path(file_path), full_path,
+                              self._file_key(file_path, full_path))
+        if sniffed.is_binary:
+            raise ValueError(f'Cannot stream binary file: {file_path}')
+        yield from iter_chunks(full_path, chunk_size, offset, length, sniffed.encoding)
+
+    def _batch(self,
+               operation: Callable[..., Dict[str, Any]],
+               file_paths: List[str],
+               parallel: bool = True,
+               **kwargs) -> Dict[str, Any]:
+        """Run a per-file operation over many paths on a bounded thread pool"""
+        if not isinstance(file_paths, list) or not all(isinstance(p, str) for p in file_paths):
+            return {
+                'status': 'error',
+                'error': 'file_paths must be a list of paths'
+            }
+        paths = list(dict.fromkeys(file_paths))
+        if not paths:
+            return {
+                'status': 'success',
+                'results': {},
+                'failed': 0
+            }
+
+        workers = min(self.max_workers, len(paths)) if parallel else 1
+        if workers == 1:
+            outcomes = [operation(path, **kwargs) for path in paths]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(lambda path: operation(path, **kwargs), paths))
+
+        results = dict(zip(paths, outcomes))
+        return {
+            'status': 'success',
+            'results': results,
+            'failed': sum(1 for result in outcomes if result.get('status') != 'success')
+        }
+
+    def read_files(self,
+                   file_paths: List[str],
+                   start_line: Optional[int] = None,
+                   end_line: Optional[int] = None) -> Dict[str, Any]:
+        """Read several files in parallel
+
+        Each path gets its own read_file result, so one missing file does not
+        fail the batch. A line range, if given, applies to every file.
+        """
+        return self._batch(self.read_file, file_paths, start_line=start_line, end_line=end_line)
+
+    def stat_files(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Get information about several files in parallel"""
+        # With a ready index stats come from memory, so threads would only add overhead
+        return self._batch(self.get_file_info, file_paths, parallel=not self._index_ready())
+
+    def create_file(self,
+                    file_path: str,
+                    content: str,
+                    durability: str = 'none',
+                    buffered: bool = False) -> Dict[str, Any]:
+        """Write content to a file
+
+        The content goes to a temporary file that is renamed over the target,
+        so the file is never seen (or left behind) half-written.
+
+        Args:
+            file_path: File to write, relative to the workspace
+            content: New content of the file
+            durability: 'none' leaves write-back to the OS, 'fsync-file' syncs
+                the data before the rename and 'fsync-dir' also syncs the
+                directory so the rename itself survives a crash
+            buffered: Hold the write in memory until flush_writes (or any other
+                operation touching the path); repeated writes to the same path
+                then cost a single disk write. Reads see buffered content.
+
+        While an overlay is active the write goes to the overlay instead.
+        """
         try:
+            validate_durability(durability)
             full_path = os.path.join(self.workspace_path, file_path)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            rel_path = self._rel_path(file_path)
+            if self.overlay is not None:
+                self.overlay.write(rel_path, content.encode('utf-8'))
+                return {
+                    'status': 'success',
+                    'message': f'File written to overlay: {file_path}',
+                    'overlay': True
+                }
+            if buffered:
+                if self.write_buffer.stage(rel_path, full_path, content, 'utf-8', durability):
+                    flushed = self.flush_writes()
+                    if flushed['status'] != 'success':
+                        # The writes stay buffered; the caller learns they cannot be flushed
+                        return {
+                            'status': 'error',
+                            'error': f"File write buffered, but flushing the buffer failed: "
+                                     f"{flushed['error']}",
+                            'errors': flushed.get('errors', {}),
+                            'buffered': True
+                        }
+                return {
+                    'status': 'success',
+                    'message': f'File write buffered: {file_path}',
+                    'buffered': True
+                }
+
+            write_atomic(full_path, content, 'utf-8', durability)
+            # This write supersedes any buffered one for the same path
+            self.write_buffer.take([rel_path])
+            self._mark_changed(file_path)
                 
             return {
                 'status': 'success',
@@ -51,52 +828,309 @@ class FileOperations:
                 'error': str(e)
             }
 
-    def list_files(self, directory: str = '.', pattern: str = '*') -> Dict[str, Any]:
-        """List files in a directory matching a pattern"""
+    def flush_writes(self, file_paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Write buffered files to disk (all of them when file_paths is omitted)"""
         try:
-            full_path = os.path.join(self.workspace_path, directory)
-            if not os.path.exists(full_path):
+            rel_paths = None if file_paths is None else [self._rel_path(p) for p in file_paths]
+            errors = self._flush(rel_paths)
+            return {
+                'status': 'error' if errors else 'success',
+                'errors': errors,
+                'stats': self.write_buffer.stats(),
+                **({'error': f'{len(errors)} buffered write(s) failed'} if errors else {})
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def _flush(self, rel_paths: Optional[List[str]] = None) -> Dict[str, str]:
+        """Write out pending writes; returns an error message per failed path
+
+        Writes that fail stay buffered, so a later flush retries them.
+        """
+        errors: Dict[str, str] = {}
+        failed = {}
+        written = []
+        for rel_path, write in self.write_buffer.take(rel_paths).items():
+            try:
+                write_atomic(write.full_path, write.content, write.encoding, write.durability)
+                written.append(rel_path)
+            except OSError as e:
+                logger.warning(f"Buffered write to {rel_path} failed: {e}")
+                errors[rel_path] = str(e)
+                failed[rel_path] = write
+        self.write_buffer.restore(failed)
+        self.write_buffer.flushed += len(written)
+        self._mark_changed(*written)
+        return errors
+
+    def _flush_pending(self, *file_paths: str) -> None:
+        """Write out buffered writes at or below paths (all of them without paths)
+
+        Called before any operation that looks at the disk, so it never misses
+        or clobbers buffered content.
+        """
+        if not len(self.write_buffer):
+            return
+        if file_paths:
+            rel_paths = [pending for file_path in file_paths
+                         for pending in self.write_buffer.overlapping(self._rel_path(file_path))]
+        else:
+            rel_paths = None
+        errors = self._flush(rel_paths)
+        if errors:
+            path, error = next(iter(errors.items()))
+            raise OSError(f'Buffered write to {path} failed: {error}')
+
+    def edit_file(self,
+                  file_path: str,
+                  diff: Optional[str] = None,
+                  edits: Optional[List[Dict[str, Any]]] = None,
+                  base_hash: Optional[str] = None,
+                  durability: str = 'none') -> Dict[str, Any]:
+        """Change part of a file with a unified diff or search/replace edits
+
+        Args:
+            file_path: File to edit, relative to the workspace
+            diff: Unified diff against the file
+            edits: List of {'search', 'replace'[, 'all']} edits
+            base_hash: 'hash' from the read the edit was made against; the edit
+                is rejected if the file changed since
+            durability: 'none', 'fsync-file' or 'fsync-dir' (see create_file)
+
+        The new content replaces the file atomically, so readers never see a
+        partially applied edit.
+        """
+        try:
+            if (diff is None) == (edits is None):
+                return {
+                    'status': 'error',
+                    'error': 'Provide either diff or edits'
+                }
+            validate_durability(durability)
+            self._flush_pending(file_path)
+            full_path = os.path.join(self.workspace_path, file_path)
+            rel_path = self._rel_path(file_path)
+            data = self.overlay.get(rel_path) if self.overlay is not None else None
+            if data is None and (not self._exists(file_path) or self._is_dir(file_path)):
+                return {
+                    'status': 'error',
+                    'error': f'File not found: {file_path}'
+                }
+
+            if data is not None:
+                sniffed = sniff(data[:SNIFF_BYTES])
+            else:
+                key = self._file_key(file_path, full_path)
+                sniffed = self._sniff(rel_path, full_path, key)
+            if sniffed.is_binary:
+                return {
+                    'status': 'error',
+                    'error': f'Cannot edit binary file: {file_path}'
+                }
+            # Decoded strictly: the whole file is written back, so bytes the
+            # sniffed encoding cannot represent must not be replaced
+            try:
+                if data is None:
+                    with open(full_path, 'rb') as f:
+                        data = f.read()
+                content = data.decode(sniffed.encoding)
+            except UnicodeDecodeError as e:
+                return {
+                    'status': 'error',
+                    'error': f'Cannot edit {file_path}: not valid {sniffed.encoding} ({e.reason} '
+                             f'at byte {e.start})'
+                }
+            # Edited with universal newlines, as read_file returns them, and
+            # written back with the file's own (most common) line ending
+            crlf = content.count('\r\n')
+            counts = {'\r\n': crlf, '\r': content.count('\r') - crlf,
+                      '\n': content.count('\n') - crlf}
+            newline = max(counts, key=lambda style: (counts[style], style == '\n'))
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+            current_hash = content_hash(content)
+            if base_hash is not None and base_hash != current_hash:
+                return {
+                    'status': 'error',
+                    'error': f'File changed since it was read: {file_path}',
+                    'conflict': True,
+                    'hash': current_hash
+                }
+
+            try:
+                if diff is not None:
+                    new_content, applied = apply_unified_diff(content, diff)
+                else:
+                    new_content, applied = apply_replacements(content, edits)
+            except PatchError as e:
+                return {
+                    'status': 'error',
+                    'error': str(e),
+                    'hash': current_hash
+                }
+
+            written = new_content.replace('\n', newline)
+            if self.overlay is not None:
+                self.overlay.write(rel_path, written.encode(sniffed.encoding))
+            else:
+                write_atomic(full_path, written, sniffed.encoding, durability)
+                self._mark_changed(file_path)
+
+            return {
+                'status': 'success',
+                'message': f'File edited successfully: {file_path}',
+                'applied': applied,
+                'hash': content_hash(new_content)
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def iter_files(self,
+                   directory: str = '.',
+                   pattern: str = '*',
+                   max_depth: Optional[int] = None,
+                   after: Optional[str] = None,
+                   include_ignored: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream files and directories matching a pattern, in stable path order
+
+        Yields:
+            Dicts with the workspace-relative 'path' and 'type' ('file' or 'directory')
+        """
+        self._flush_pending(directory)
+        root_rel = self._rel_path(directory)
+        prefix_len = 0 if root_rel == '.' else len(root_rel) + 1
+        match_path = '/' in pattern
+
+        if self._index_ready() and not include_ignored:
+            # The index only records ignored entries, not their contents
+            entries = ((path, entry.is_dir) for path, entry in
+                       self.index.iter_entries(root_rel, max_depth, after))
+        else:
+            entries = ((item.path, item.is_dir) for item in
+                       walk_workspace(self.workspace_path, directory, self.ignore_rules,
+                                      max_depth, after, include_ignored))
+
+        if self.overlay is not None:
+            cursor = tuple(after.strip('/').split('/')) if after else None
+
+            def visible(path: str, is_dir: bool) -> bool:
+                if prefix_len and not path.startswith(root_rel + '/'):
+                    return False
+                if max_depth is not None and path[prefix_len:].count('/') >= max_depth:
+                    return False
+                if cursor is not None and tuple(path.split('/')) <= cursor:
+                    return False
+                return include_ignored or not self.ignore_rules.is_path_ignored(path, is_dir)
+
+            entries = self.overlay.merge_entries(entries, visible)
+
+        for path, is_dir in entries:
+            candidate = path[prefix_len:] if match_path else path.rpartition('/')[2]
+            if not fnmatch.fnmatch(candidate, pattern):
+                continue
+            yield {
+                'path': path,
+                'type': 'directory' if is_dir else 'file'
+            }
+
+    def list_files(self,
+                   directory: str = '.',
+                   pattern: str = '*',
+                   max_depth: Optional[int] = None,
+                   cursor: Optional[str] = None,
+                   limit: Optional[int] = None,
+                   include_ignored: bool = False,
+                   tag_types: bool = False) -> Dict[str, Any]:
+        """List files in a directory matching a pattern
+
+        Ignored paths (.gitignore and excludes such as node_modules or .git) are
+        skipped unless include_ignored is set. With a limit, results are paged:
+        pass the returned next_cursor back as cursor to continue. With
+        tag_types, 'file_types' maps each file to 'text' or 'binary'.
+        """
+        try:
+            self._flush_pending(directory)
+            if not self._exists(directory):
                 return {
                     'status': 'error',
                     'error': f'Directory not found: {directory}'
                 }
+            if limit is not None and limit < 1:
+                return {
+                    'status': 'error',
+                    'error': f'Invalid limit: {limit}'
+                }
             
             files = []
             dirs = []
-            path = Path(full_path)
-            
-            for item in path.rglob(pattern):
-                rel_path = os.path.relpath(item, self.workspace_path)
-                if item.is_file():
-                    files.append(rel_path)
-                elif item.is_dir():
-                    dirs.append(rel_path)
+            next_cursor = None
+            last_path = cursor
+            count = 0
+            
+            for item in self.iter_files(directory, pattern, max_depth, cursor, include_ignored):
+                if limit is not None and count >= limit:
+                    next_cursor = last_path
+                    break
+                if item['type'] == 'file':
+                    files.append(item['path'])
+                else:
+                    dirs.append(item['path'])
+                last_path = item['path']
+                count += 1
                     
-            return {
+            result = {
                 'status': 'success',
                 'files': files,
-                'directories': dirs
+                'directories': dirs,
+                'next_cursor': next_cursor
             }
+            if tag_types:
+                result['file_types'] = {path: self._file_type(path) for path in files}
+            return result
         except Exception as e:
             return {
                 'status': 'error',
                 'error': str(e)
             }
 
+    def _file_type(self, rel_path: str) -> Optional[str]:
+        """'text' or 'binary' for a listed file; None if it vanished"""
+        full_path = os.path.join(self.workspace_path, rel_path)
+        data = self.overlay.get(rel_path) if self.overlay is not None else None
+        if data is not None:
+            return 'binary' if sniff(data[:SNIFF_BYTES]).is_binary else 'text'
+        try:
+            entry = self.index.get(rel_path) if self._index_ready() else None
+            key = ((entry.mtime_ns, entry.size, entry.inode) if entry is not None
+                   else file_key(os.stat(full_path)))
+            return 'binary' if self._sniff(rel_path, full_path, key).is_binary else 'text'
+        except OSError:
+            return None
+
     def delete_file(self, file_path: str) -> Dict[str, Any]:
         """Delete a file"""
         try:
+            self._flush_pending(file_path)
             full_path = os.path.join(self.workspace_path, file_path)
-            if not os.path.exists(full_path):
+            if not self._exists(file_path):
                 return {
                     'status': 'error',
                     'error': f'File not found: {file_path}'
                 }
             
-            if os.path.isfile(full_path):
-                os.remove(full_path)
+            if self.overlay is not None:
+                self._overlay_remove(self._rel_path(file_path))
             else:
-                shutil.rmtree(full_path)
+                if os.path.isfile(full_path):
+                    os.remove(full_path)
+                else:
+                    shutil.rmtree(full_path)
+                self._mark_changed(file_path)
                 
             return {
                 'status': 'success',
@@ -111,23 +1145,33 @@ class FileOperations:
     def rename_file(self, old_path: str, new_path: str) -> Dict[str, Any]:
         """Rename or move a file"""
         try:
+            self._flush_pending(old_path, new_path)
             old_full_path = os.path.join(self.workspace_path, old_path)
             new_full_path = os.path.join(self.workspace_path, new_path)
             
-            if not os.path.exists(old_full_path):
+            if not self._exists(old_path):
                 return {
                     'status': 'error',
                     'error': f'Source not found: {old_path}'
                 }
             
-            if os.path.exists(new_full_path):
+            if self._exists(new_path):
                 return {
                     'status': 'error',
                     'error': f'Destination already exists: {new_path}'
                 }
+
+            if self.overlay is not None:
+                self._overlay_copy(old_path, new_path)
+                self._overlay_remove(self._rel_path(old_path))
+                return {
+                    'status': 'success',
+                    'message': f'Moved/renamed {old_path} to {new_path} in overlay'
+                }
             
             os.makedirs(os.path.dirname(new_full_path), exist_ok=True)
             shutil.move(old_full_path, new_full_path)
+            self._mark_changed(old_path, new_path)
             
             return {
                 'status': 'success',
@@ -140,33 +1184,45 @@ class FileOperations:
             }
 
     def copy_file(self, source_path: str, dest_path: str) -> Dict[str, Any]:
-        """Copy a file or directory"""
+        """Copy a file or directory
+
+        Data is moved by the kernel where possible (reflink, copy_file_range,
+        sendfile) and directory trees are copied in parallel. The result
+        reports bytes copied, elapsed time and bytes per second.
+        """
         try:
+            self._flush_pending(source_path, dest_path)
             source_full_path = os.path.join(self.workspace_path, source_path)
             dest_full_path = os.path.join(self.workspace_path, dest_path)
             
-            if not os.path.exists(source_full_path):
+            if not self._exists(source_path):
                 return {
                     'status': 'error',
                     'error': f'Source not found: {source_path}'
                 }
             
-            if os.path.exists(dest_full_path):
+            if self._exists(dest_path):
                 return {
                     'status': 'error',
                     'error': f'Destination already exists: {dest_path}'
                 }
+
+            if self.overlay is not None:
+                self._overlay_copy(source_path, dest_path)
+                return {
+                    'status': 'success',
+                    'message': f'Copied {source_path} to {dest_path} in overlay'
+                }
             
             os.makedirs(os.path.dirname(dest_full_path), exist_ok=True)
             
-            if os.path.isfile(source_full_path):
-                shutil.copy2(source_full_path, dest_full_path)
-            else:
-                shutil.copytree(source_full_path, dest_full_path)
+            stats = copy_path(source_full_path, dest_full_path, self.max_workers)
+            self._mark_changed(dest_path)
             
             return {
                 'status': 'success',
-                'message': f'Successfully copied {source_path} to {dest_path}'
+                'message': f'Successfully copied {source_path} to {dest_path}',
+                **stats
             }
         except Exception as e:
             return {
@@ -177,6 +1233,26 @@ class FileOperations:
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
         """Get information about a file"""
         try:
+            self._flush_pending(file_path)
+            if self.overlay is not None:
+                info = self._overlay_info(file_path)
+                if info is not None:
+                    return info
+            if self._index_ready():
+                entry = self.index.get(self._rel_path(file_path))
+                if entry is not None:
+                    return {
+                        'status': 'success',
+                        'info': {
+                            'size': entry.size,
+                            'created': entry.ctime,
+                            'modified': entry.mtime,
+                            'is_file': not entry.is_dir,
+                            'is_directory': entry.is_dir,
+                            'extension': None if entry.is_dir else os.path.splitext(file_path)[1]
+                        }
+                    }
+
             full_path = os.path.join(self.workspace_path, file_path)
             if not os.path.exists(full_path):
                 return {
@@ -203,18 +1279,64 @@ class FileOperations:
                 'error': str(e)
             }
 
+    def _overlay_info(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """get_file_info for paths the overlay changes; None for untouched paths"""
+        rel_path = self._rel_path(file_path)
+        data = self.overlay.get(rel_path)
+        if data is not None:
+            modified = self.overlay.modified(rel_path)
+            return {
+                'status': 'success',
+                'info': {
+                    'size': len(data),
+                    'created': modified,
+                    'modified': modified,
+                    'is_file': True,
+                    'is_directory': False,
+                    'extension': os.path.splitext(file_path)[1]
+                }
+            }
+        if self.overlay.has_directory(rel_path) and not os.path.isdir(
+                os.path.join(self.workspace_path, file_path)):
+            return {
+                'status': 'success',
+                'info': {
+                    'size': 0,
+                    'created': self.overlay.created,
+                    'modified': self.overlay.created,
+                    'is_file': False,
+                    'is_directory': True,
+                    'extension': None
+                }
+            }
+        if self.overlay.is_deleted(rel_path):
+            return {
+                'status': 'error',
+                'error': f'File not found: {file_path}'
+            }
+        return None
+
     def create_directory(self, directory_path: str) -> Dict[str, Any]:
         """Create a new directory"""
         try:
+            self._flush_pending(directory_path)
             full_path = os.path.join(self.workspace_path, directory_path)
             
-            if os.path.exists(full_path):
+            if self._exists(directory_path):
                 return {
                     'status': 'error',
                     'error': f'Directory already exists: {directory_path}'
                 }
+
+            if self.overlay is not None:
+                self.overlay.make_directory(self._rel_path(directory_path))
+                return {
+                    'status': 'success',
+                    'message': f'Created directory in overlay: {directory_path}'
+                }
             
             os.makedirs(full_path)
+            self._mark_changed(directory_path)
             
             return {
                 'status': 'success',
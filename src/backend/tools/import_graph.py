@@ -0,0 +1,181 @@
+"""
+Import graph of the workspace's Python modules.
+
+Edges come from the imports recorded by the symbol index, which parses files
+in a process pool and caches results by content hash, so the graph never
+parses anything itself. Imports are resolved to workspace files: relative
+imports by path, absolute imports by matching the dotted name against every
+suffix of each file's module path (so both 'backend.tools.x' and
+'tools.x' find 'src/backend/tools/x.py'). Only files whose content changed
+are re-resolved, unless files were added or removed, which can change what
+any import resolves to.
+"""
+from typing import Dict, Iterable, List, Set
+import fnmatch
+import threading
+from .symbol_index import SymbolIndex, PYTHON_EXTENSIONS
+
+TEST_FILE_PATTERNS = ('test_*.py', '*_test.py')
+TEST_DIRECTORIES = ('test', 'tests')
+
+def is_test_file(rel_path: str) -> bool:
+    """Whether a Python file is test code, by its name or directory"""
+    parts = rel_path.split('/')
+    return (any(fnmatch.fnmatch(parts[-1], pattern) for pattern in TEST_FILE_PATTERNS)
+            or any(part in TEST_DIRECTORIES for part in parts[:-1]))
+
+def module_parts(rel_path: str) -> List[str]:
+    """Components of a file's module path from the workspace root"""
+    for extension in PYTHON_EXTENSIONS:
+        if rel_path.endswith(extension):
+            rel_path = rel_path[:-len(extension)]
+            break
+    parts = rel_path.split('/')
+    if parts[-1] == '__init__':
+        parts.pop()
+    return parts
+
+class ImportGraph:
+    """Which workspace files import which, resolved from the symbol index"""
+
+    def __init__(self, symbol_index: SymbolIndex):
+        self.symbol_index = symbol_index
+        # path -> content hash the edges were resolved from
+        self._hashes: Dict[str, str] = {}
+        # dotted module name (any suffix of a module path) -> files
+        self._modules: Dict[str, List[str]] = {}
+        self._imports: Dict[str, Set[str]] = {}
+        self._importers: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+
+    def refresh(self) -> int:
+        """Bring edges up to date with the symbol index
+
+        Returns:
+            Number of files whose imports were resolved again
+        """
+        hashes = self.symbol_index.file_hashes()
+        with self._lock:
+            if hashes.keys() != self._hashes.keys():
+                self._modules = {}
+                for path in sorted(hashes):
+                    parts = module_parts(path)
+                    for start in range(len(parts)):
+                        self._modules.setdefault('.'.join(parts[start:]), []).append(path)
+                self._imports.clear()
+                self._importers.clear()
+                stale = list(hashes)
+            else:
+                stale = [path for path, digest in hashes.items()
+                         if self._hashes.get(path) != digest]
+            self._hashes = hashes
+            for path in stale:
+                self._set_imports(path, self._resolve(path))
+        return len(stale)
+
+    def _set_imports(self, path: str, targets: Set[str]) -> None:
+        """Replace a file's outgoing edges (lock held)"""
+        for target in self._imports.pop(path, ()):
+            importers = self._importers.get(target)
+            if importers is not None:
+                importers.discard(path)
+                if not importers:
+                    del self._importers[target]
+        if targets:
+            self._imports[path] = targets
+            for target in targets:
+                self._importers.setdefault(target, set()).add(path)
+
+    def _file_for(self, parts: List[str]) -> List[str]:
+        """The module or package file at a path, if indexed"""
+        base = '/'.join(parts)
+        for candidate in (f'{base}.py', f'{base}.pyi', f'{base}/__init__.py'):
+            if candidate in self._hashes:
+                return [candidate]
+        return []
+
+    def _lookup(self, module: str, importer: str) -> List[str]:
+        """Files an absolute module name can refer to from an importing file
+
+        When several files match, those under a source root containing the
+        importer win, the deepest root first; otherwise all of them count.
+        """
+        paths = self._modules.get(module, [])
+        if len(paths) <= 1:
+            return paths
+        depth = module.count('.') + 1
+        roots = {path: '/'.join(module_parts(path)[:-depth]) for path in paths}
+        local = [path for path in paths
+                 if not roots[path] or importer.startswith(roots[path] + '/')]
+        if not local:
+            return paths
+        deepest = max(len(roots[path]) for path in local)
+        return [path for path in local if len(roots[path]) == deepest]
+
+    def _resolve(self, path: str) -> Set[str]:
+        """Workspace files a file imports (lock held)"""
+        summary = self.symbol_index.file_summary(path) or {}
+        targets: Set[str] = set()
+        for imported in summary.get('imports', []):
+            module = imported['module']
+            names = imported['names']
+            if imported['level']:
+                package = path.split('/')[:-1]
+                up = imported['level'] - 1
+                if up > len(package):
+                    continue
+                base = package[:len(package) - up] + (module.split('.') if module else [])
+                targets.update(self._file_for(base))
+                for name in names:
+                    targets.update(self._file_for(base + [name]))
+                continue
+
+            parts = module.split('.')
+            # Importing a module runs its parent packages too
+            for end in range(1, len(parts) + 1):
+                targets.update(self._lookup('.'.join(parts[:end]), path))
+            for name in names:
+                targets.update(self._lookup(f'{module}.{name}', path))
+        targets.discard(path)
+        return targets
+
+    # Queries
+
+    def _expand(self, rel_paths: Iterable[str]) -> Set[str]:
+        """Indexed files among paths, directories standing for the files below them"""
+        files: Set[str] = set()
+        for rel_path in rel_paths:
+            rel_path = rel_path.strip('/')
+            if rel_path in ('', '.'):
+                return set(self._hashes)
+            if rel_path in self._hashes:
+                files.add(rel_path)
+            else:
+                files.update(p for p in self._hashes if p.startswith(rel_path + '/'))
+        return files
+
+    def imports_of(self, rel_path: str) -> List[str]:
+        """Workspace files a file imports directly"""
+        with self._lock:
+            return sorted(self._imports.get(rel_path.strip('/'), ()))
+
+    def dependents(self, rel_paths: Iterable[str], transitive: bool = True) -> List[str]:
+        """Files importing any of the paths, directly or (transitively) through others"""
+        with self._lock:
+            seeds = self._expand(rel_paths)
+            found: Set[str] = set()
+            pending = list(seeds)
+            while pending:
+                for importer in self._importers.get(pending.pop(), ()):
+                    if importer not in found and importer not in seeds:
+                        found.add(importer)
+                        if transitive:
+                            pending.append(importer)
+        return sorted(found)
+
+    def tests_for(self, rel_paths: Iterable[str]) -> List[str]:
+        """Test files that import the paths, directly or indirectly, or are among them"""
+        rel_paths = list(rel_paths)
+        with self._lock:
+            affected = self._expand(rel_paths) | set(self.dependents(rel_paths))
+        return sorted(path for path in affected if is_test_file(path))
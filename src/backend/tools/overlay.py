@@ -0,0 +1,241 @@
+"""
+Copy-on-write overlay over the workspace.
+
+While an overlay is active, FileOperations records writes, deletions and new
+directories here instead of applying them to the workspace, and reads look at
+the overlay before the disk. Nothing is copied up front: the overlay only
+holds what was changed. Committing applies every change, discarding drops
+them all.
+
+Committing first writes every new file into a staging directory inside the
+workspace (the same filesystem, so each rename is atomic). If any of that
+fails the workspace is untouched; only then are deletions applied and the
+staged files renamed into place. That second phase is best effort, not a
+transaction: if it fails partway, the changes applied so far stay in the
+workspace and the overlay still holds them all, so the commit can be retried.
+"""
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+import heapq
+import os
+import shutil
+import tempfile
+import threading
+import time
+from .write_buffer import fsync_directory, validate_durability
+
+# (path, is_dir) of a listed entry
+Entry = Tuple[str, bool]
+
+def _parents(rel_path: str) -> Iterable[str]:
+    """Ancestor directories of a path, nearest first"""
+    while '/' in rel_path:
+        rel_path = rel_path.rpartition('/')[0]
+        yield rel_path
+
+def _is_below(rel_path: str, directory: str) -> bool:
+    return rel_path.startswith(directory + '/')
+
+def _walk_key(entry: Entry) -> Tuple[str, ...]:
+    """Sort key giving the workspace walk order"""
+    return tuple(entry[0].split('/'))
+
+class Overlay:
+    """Pending changes to the workspace, keyed by workspace-relative path"""
+
+    def __init__(self):
+        # path -> new content, or None for a deleted file
+        self._files: Dict[str, Optional[bytes]] = {}
+        # path -> time of its last write
+        self._modified: Dict[str, float] = {}
+        # Directories created in the overlay
+        self._dirs: Set[str] = set()
+        # Directories of the workspace deleted in the overlay
+        self._removed_dirs: Set[str] = set()
+        # directory -> number of files written below it
+        self._written_below: Dict[str, int] = {}
+        self.created = time.time()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._files) + len(self._dirs) + len(self._removed_dirs)
+
+    # Lookups
+
+    def get(self, rel_path: str) -> Optional[bytes]:
+        """Content written in the overlay; None if the path was not written"""
+        return self._files.get(rel_path)
+
+    def modified(self, rel_path: str) -> float:
+        """When a path was last written in the overlay"""
+        return self._modified.get(rel_path, self.created)
+
+    def is_deleted(self, rel_path: str) -> bool:
+        """Whether the overlay hides a workspace path"""
+        with self._lock:
+            if self._files.get(rel_path, b'') is None:
+                return True
+            if rel_path in self._files or self.has_directory(rel_path):
+                return False
+            return any(path in self._removed_dirs
+                       for path in [rel_path, *_parents(rel_path)])
+
+    def has_directory(self, rel_path: str) -> bool:
+        """Whether a directory exists in the overlay (created, or holding written files)"""
+        with self._lock:
+            return rel_path in self._dirs or rel_path in self._written_below
+
+    # Changes
+
+    def _set_file(self, rel_path: str, content: Optional[bytes], keep: bool = True) -> None:
+        """Record a file's content (None: deleted), or forget the file unless keep"""
+        was_written = self._files.get(rel_path) is not None
+        is_written = keep and content is not None
+        if keep:
+            self._files[rel_path] = content
+        else:
+            self._files.pop(rel_path, None)
+        if was_written == is_written:
+            return
+        for parent in _parents(rel_path):
+            count = self._written_below.get(parent, 0) + (1 if is_written else -1)
+            if count:
+                self._written_below[parent] = count
+            else:
+                del self._written_below[parent]
+
+    def write(self, rel_path: str, data: bytes) -> None:
+        """Record new content for a file"""
+        with self._lock:
+            self._set_file(rel_path, data)
+            self._modified[rel_path] = time.time()
+
+    def remove(self, rel_path: str, on_disk: bool) -> None:
+        """Delete a file; on_disk tells whether the workspace has it"""
+        with self._lock:
+            self._set_file(rel_path, None, keep=on_disk)
+
+    def remove_directory(self, rel_path: str, on_disk: bool) -> None:
+        """Delete a directory and everything the overlay holds below it"""
+        with self._lock:
+            for path in [p for p in self._files if _is_below(p, rel_path)]:
+                self._set_file(path, None, keep=False)
+            self._dirs = {d for d in self._dirs if d != rel_path and not _is_below(d, rel_path)}
+            self._removed_dirs = {d for d in self._removed_dirs if not _is_below(d, rel_path)}
+            if on_disk:
+                self._removed_dirs.add(rel_path)
+
+    def make_directory(self, rel_path: str) -> None:
+        """Create a directory (and its parents)"""
+        with self._lock:
+            self._dirs.add(rel_path)
+            self._dirs.update(_parents(rel_path))
+
+    # Listing
+
+    def merge_entries(self,
+                      entries: Iterable[Entry],
+                      visible: Callable[[str, bool], bool]) -> Iterator[Entry]:
+        """Workspace entries with overlay changes applied, in walk order
+
+        The workspace entries are streamed, so a paged listing stops reading
+        them once the page is full; only the overlay's own entries are sorted.
+
+        Args:
+            entries: Entries listed from the workspace, in walk order
+            visible: Whether an entry only present in the overlay belongs in
+                the listing (directory, depth, cursor and ignore rules)
+        """
+        with self._lock:
+            added: Dict[str, bool] = {}
+            for path, content in self._files.items():
+                if content is not None:
+                    added[path] = False
+            added.update((directory, True) for directory in self._written_below)
+            for directory in self._dirs:
+                added[directory] = True
+                added.update((parent, True) for parent in _parents(directory))
+        overlay_entries = sorted(((path, is_dir) for path, is_dir in added.items()
+                                  if visible(path, is_dir)), key=_walk_key)
+        workspace_entries = ((path, is_dir) for path, is_dir in entries
+                             if not self.is_deleted(path))
+        previous = None
+        # On a tie the overlay's entry comes first and the workspace's is skipped
+        for path, is_dir in heapq.merge(overlay_entries, workspace_entries, key=_walk_key):
+            if path != previous:
+                previous = path
+                yield path, is_dir
+
+    def changes(self) -> Dict[str, Any]:
+        """Paths written, deleted and created by the overlay"""
+        with self._lock:
+            return {
+                'written': sorted(p for p, content in self._files.items() if content is not None),
+                'deleted': sorted([p for p, content in self._files.items() if content is None]
+                                  + list(self._removed_dirs)),
+                'directories': sorted(self._dirs)
+            }
+
+    def paths(self) -> List[str]:
+        """Every path the overlay changes"""
+        with self._lock:
+            return sorted(set(self._files) | self._dirs | self._removed_dirs)
+
+    # Commit
+
+    def commit(self, workspace_path: str, staging_root: str, durability: str = 'none') -> None:
+        """Apply the overlay to the workspace
+
+        Staging the new files cannot change the workspace; applying them and
+        the deletions is best effort (see the module docstring).
+
+        Args:
+            workspace_path: Workspace root
+            staging_root: Directory on the workspace's filesystem for staged files
+            durability: 'none', 'fsync-file' or 'fsync-dir' for the written files
+        """
+        validate_durability(durability)
+        with self._lock:
+            os.makedirs(staging_root, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='overlay-', dir=staging_root)
+            try:
+                staged = []
+                for number, (rel_path, content) in enumerate(sorted(self._files.items())):
+                    if content is None:
+                        continue
+                    temp_path = os.path.join(staging, str(number))
+                    with open(temp_path, 'wb') as f:
+                        f.write(content)
+                        if durability != 'none':
+                            f.flush()
+                            os.fsync(f.fileno())
+                    staged.append((rel_path, temp_path))
+
+                # Nothing in the workspace has changed up to here
+                for rel_path in sorted(self._removed_dirs):
+                    full_path = os.path.join(workspace_path, rel_path)
+                    if os.path.isdir(full_path) and not os.path.islink(full_path):
+                        shutil.rmtree(full_path)
+                    elif os.path.lexists(full_path):
+                        os.remove(full_path)
+                for rel_path, content in self._files.items():
+                    full_path = os.path.join(workspace_path, rel_path)
+                    if content is None and os.path.lexists(full_path):
+                        os.remove(full_path)
+                for rel_path in sorted(self._dirs):
+                    os.makedirs(os.path.join(workspace_path, rel_path), exist_ok=True)
+
+                directories = set()
+                for rel_path, temp_path in staged:
+                    # A symlink is followed, so its target is replaced and the link stays
+                    full_path = os.path.realpath(os.path.join(workspace_path, rel_path))
+                    directory = os.path.dirname(full_path)
+                    os.makedirs(directory, exist_ok=True)
+                    if os.path.exists(full_path):
+                        shutil.copymode(full_path, temp_path)
+                    os.replace(temp_path, full_path)
+                    directories.add(directory)
+                if durability == 'fsync-dir':
+                    for directory in directories:
+                        fsync_directory(directory)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,139 @@
+"""
+Incremental edits for FileOperations.edit_file.
+
+Edits arrive either as a unified diff or as search/replace pairs, so an
+agent only sends the lines it changed. Hunks are located by their context
+(tolerating line drift from earlier edits), and nothing is written unless
+every hunk applies.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import re
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+NO_NEWLINE_MARKER = '\\ No newline at end of file'
+
+class PatchError(Exception):
+    """Raised when an edit does not apply to the current content"""
+
+def content_hash(content: str) -> str:
+    """Hash used to check an edit was made against the current content"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def split_lines(text: str) -> List[str]:
+    """Split on '\\n' only, keeping line endings"""
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+class Hunk:
+    """One '@@' section of a unified diff"""
+
+    def __init__(self, old_start: int, old_count: int):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.old_lines: List[str] = []
+        self.new_lines: List[str] = []
+
+def parse_unified_diff(diff: str) -> List[Hunk]:
+    """Parse the hunks of a single-file unified diff; file headers are skipped"""
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    last_targets: Tuple[List[str], ...] = ()
+    for line in split_lines(diff):
+        match = HUNK_HEADER.match(line)
+        if match:
+            old_count = 1 if match.group(2) is None else int(match.group(2))
+            current = Hunk(int(match.group(1)), old_count)
+            hunks.append(current)
+            continue
+        if current is None:
+            # '---', '+++', 'diff --git' and similar headers
+            continue
+        if line.rstrip('\n') == NO_NEWLINE_MARKER:
+            for target in last_targets:
+                target[-1] = target[-1].rstrip('\n')
+            continue
+        tag, body = line[:1], line[1:]
+        if not body.endswith('\n'):
+            body += '\n'
+        if tag == ' ' or line == '\n':
+            # Some tools strip the space from blank context lines
+            current.old_lines.append(body)
+            current.new_lines.append(body)
+            last_targets = (current.old_lines, current.new_lines)
+        elif tag == '-':
+            current.old_lines.append(body)
+            last_targets = (current.old_lines,)
+        elif tag == '+':
+            current.new_lines.append(body)
+            last_targets = (current.new_lines,)
+        else:
+            raise PatchError(f'Invalid diff line: {line.rstrip()}')
+    if not hunks:
+        raise PatchError('Diff contains no hunks')
+    return hunks
+
+def _find_block(lines: List[str], block: List[str], expected: int, start: int) -> int:
+    """Index of block in lines at or after start, nearest to expected; -1 if absent"""
+    if not block:
+        return max(start, min(expected, len(lines)))
+    size = len(block)
+    if start <= expected and lines[expected:expected + size] == block:
+        return expected
+    candidates = range(start, len(lines) - size + 1)
+    matches = [i for i in candidates if lines[i:i + size] == block]
+    if not matches:
+        return -1
+    return min(matches, key=lambda i: abs(i - expected))
+
+def apply_unified_diff(content: str, diff: str) -> Tuple[str, int]:
+    """Apply a unified diff to content
+
+    Returns:
+        Tuple of new content and number of hunks applied
+    """
+    lines = split_lines(content)
+    hunks = parse_unified_diff(diff)
+    result: List[str] = []
+    position = 0
+    drift = 0
+    for number, hunk in enumerate(hunks, 1):
+        # Hunks without old lines insert after old_start rather than at it
+        anchor = hunk.old_start if hunk.old_count == 0 else hunk.old_start - 1
+        expected = max(anchor + drift, 0)
+        index = _find_block(lines, hunk.old_lines, expected, position)
+        if index == -1:
+            raise PatchError(f'Hunk {number} does not apply (expected near line {hunk.old_start})')
+        drift = index - anchor
+        result.extend(lines[position:index])
+        result.extend(hunk.new_lines)
+        position = index + len(hunk.old_lines)
+    result.extend(lines[position:])
+    return ''.join(result), len(hunks)
+
+def apply_replacements(content: str, edits: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """Apply search/replace edits in order
+
+    Each edit is {'search': str, 'replace': str} and its search text must occur
+    exactly once, unless 'all' is true, in which case every occurrence is replaced.
+
+    Returns:
+        Tuple of new content and number of replacements made
+    """
+    replaced = 0
+    for number, edit in enumerate(edits, 1):
+        search = edit.get('search')
+        replace = edit.get('replace')
+        if not search or replace is None:
+            raise PatchError(f"Edit {number} needs non-empty 'search' and a 'replace' value")
+        count = content.count(search)
+        if count == 0:
+            raise PatchError(f'Edit {number}: search text not found')
+        if count > 1 and not edit.get('all'):
+            raise PatchError(f'Edit {number}: search text is ambiguous ({count} matches)')
+        content = content.replace(search, replace)
+        replaced += count
+    return content, replaced
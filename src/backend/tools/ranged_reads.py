@@ -0,0 +1,217 @@
+"""
+Partial reads for FileOperations: byte ranges, line ranges and chunk streams.
+
+Byte windows are decoded in the file's sniffed encoding and trimmed to
+character boundaries (UTF-8 sequences, UTF-16/32 code units) so they always
+decode cleanly, and line ranges on large files are located with mmap so
+only the requested window is copied into Python objects.
+"""
+from typing import Dict, Any, Iterator, Optional, Tuple, Union
+import codecs
+import mmap
+import os
+import re
+
+# Files at least this large use mmap for line ranges
+MMAP_THRESHOLD = 1024 * 1024
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# A carriage return ending a line on its own (old Mac line endings)
+_LONE_CR = re.compile(rb'\r(?!\n)')
+
+# Encodings whose characters are made of code units of this many bytes
+_UNIT_SIZES = {'utf-16': 2, 'utf-32': 4}
+
+def _window_codec(encoding: str, head: bytes, offset: int) -> str:
+    """Codec for bytes read at an offset of a file starting with head
+
+    From the start the file's own encoding handles its BOM; elsewhere there
+    is no BOM, so UTF-16/32 need the byte order the BOM at the start gave.
+    """
+    if offset == 0:
+        return encoding
+    if encoding in _UNIT_SIZES:
+        bom = codecs.BOM_UTF16_LE if encoding == 'utf-16' else codecs.BOM_UTF32_LE
+        return f"{encoding}-{'le' if head.startswith(bom) else 'be'}"
+    return 'utf-8' if encoding == 'utf-8-sig' else encoding
+
+def read_byte_range(full_path: str,
+                    offset: int,
+                    length: Optional[int],
+                    encoding: str = 'utf-8') -> Dict[str, Any]:
+    """Read a byte window, trimmed to whole characters
+
+    The returned offset and length describe the bytes actually decoded, so a
+    caller continues with offset + length.
+    """
+    if offset < 0 or (length is not None and length < 0):
+        return {
+            'status': 'error',
+            'error': 'offset and length must not be negative'
+        }
+
+    size = os.path.getsize(full_path)
+    with open(full_path, 'rb') as f:
+        head = f.read(4)
+        f.seek(offset)
+        data = f.read(-1 if length is None else length)
+    return decode_byte_window(data, offset, size, encoding, head)
+
+def slice_byte_range(data: bytes,
+                     offset: int,
+                     length: Optional[int],
+                     encoding: str = 'utf-8') -> Dict[str, Any]:
+    """read_byte_range over content already in memory"""
+    if offset < 0 or (length is not None and length < 0):
+        return {
+            'status': 'error',
+            'error': 'offset and length must not be negative'
+        }
+    window = data[offset:] if length is None else data[offset:offset + length]
+    return decode_byte_window(window, offset, len(data), encoding, data[:4])
+
+def decode_byte_window(data: bytes,
+                       offset: int,
+                       size: int,
+                       encoding: str = 'utf-8',
+                       head: bytes = b'') -> Dict[str, Any]:
+    """Decode bytes read at offset of a file of a given size whose first bytes are head"""
+    at_end = offset + len(data) >= size
+    codec = _window_codec(encoding, head, offset)
+
+    # Skip the rest of a character that started before the window
+    lead = 0
+    if offset > 0 and codec == 'utf-8':
+        while lead < min(3, len(data)) and 0x80 <= data[lead] <= 0xBF:
+            lead += 1
+    elif encoding in _UNIT_SIZES:
+        lead = min(len(data), -offset % _UNIT_SIZES[encoding])
+    decoder = codecs.getincrementaldecoder(codec)(errors='replace')
+    content = decoder.decode(data[lead:], final=at_end)
+    pending = len(decoder.getstate()[0])
+
+    return {
+        'status': 'success',
+        'content': content,
+        'offset': offset + lead,
+        'length': len(data) - lead - pending,
+        'size': size,
+        'eof': at_end and not pending
+    }
+
+Buffer = Union[str, bytes, mmap.mmap]
+
+def _line_bounds(buffer: Buffer,
+                 newline: Union[str, bytes],
+                 size: int,
+                 start_line: int,
+                 end_line: Optional[int]) -> Tuple[int, int, int, bool]:
+    """Locate lines start_line..end_line (1-based, inclusive) in a buffer
+
+    Returns:
+        Tuple of start index, end index, last line included and whether the
+        buffer end was reached
+    """
+    position = 0
+    line = 1
+    while line < start_line:
+        found = buffer.find(newline, position)
+        if found == -1:
+            return size, size, start_line - 1, True
+        position = found + 1
+        line += 1
+
+    start = end = position
+    last_line = start_line - 1
+    while end < size and (end_line is None or line <= end_line):
+        found = buffer.find(newline, end)
+        end = size if found == -1 else found + 1
+        last_line = line
+        line += 1
+    return start, end, last_line, end >= size
+
+def _line_result(content: str, start_line: int, last_line: int, eof: bool) -> Dict[str, Any]:
+    return {
+        'status': 'success',
+        'content': content,
+        'start_line': start_line,
+        'end_line': last_line,
+        'eof': eof
+    }
+
+def _validate_lines(start_line: int, end_line: Optional[int]) -> Optional[Dict[str, Any]]:
+    if start_line < 1 or (end_line is not None and end_line < start_line):
+        return {
+            'status': 'error',
+            'error': f'Invalid line range: {start_line}-{end_line}'
+        }
+    return None
+
+def slice_lines(content: str, start_line: int, end_line: Optional[int]) -> Dict[str, Any]:
+    """Select a line range from already decoded content"""
+    error = _validate_lines(start_line, end_line)
+    if error:
+        return error
+    start, end, last_line, eof = _line_bounds(content, '\n', len(content), start_line, end_line)
+    return _line_result(content[start:end], start_line, last_line, eof)
+
+def read_line_range(full_path: str,
+                    start_line: int,
+                    end_line: Optional[int],
+                    encoding: str = 'utf-8') -> Dict[str, Any]:
+    """Read a line range from a file through mmap, copying only the window
+
+    The encoding must be ASCII-compatible, so that b'\\n' separates lines.
+    Lines come back with universal newlines, as from slice_lines; a file
+    that ends lines with a lone \\r is decoded whole to split them the same way.
+    """
+    error = _validate_lines(start_line, end_line)
+    if error:
+        return error
+    with open(full_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return _line_result('', start_line, start_line - 1, True)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if _LONE_CR.search(mm):
+                text = mm[:].decode(encoding, errors='replace')
+                return slice_lines(text.replace('\r\n', '\n').replace('\r', '\n'),
+                                   start_line, end_line)
+            start, end, last_line, eof = _line_bounds(mm, b'\n', size, start_line, end_line)
+            content = mm[start:end].decode(encoding, errors='replace')
+    return _line_result(content.replace('\r\n', '\n'), start_line, last_line, eof)
+
+def iter_chunks(full_path: str,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                offset: int = 0,
+                length: Optional[int] = None,
+                encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+    """Yield a file as decoded text chunks
+
+    Characters split across reads are carried into the next chunk, so the
+    concatenated chunks equal the decoded file.
+
+    Yields:
+        Dicts with the byte 'offset' where the chunk's read started and its 'content'
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+    remaining = length
+    with open(full_path, 'rb') as f:
+        head = f.read(4)
+        decoder = codecs.getincrementaldecoder(_window_codec(encoding, head, offset))(errors='replace')
+        f.seek(offset)
+        position = offset
+        while remaining is None or remaining > 0:
+            to_read = chunk_size if remaining is None else min(chunk_size, remaining)
+            data = f.read(to_read)
+            final = len(data) < to_read or (remaining is not None and remaining == len(data))
+            content = decoder.decode(data, final=final)
+            if content or not final:
+                yield {'offset': position, 'content': content}
+            position += len(data)
+            if remaining is not None:
+                remaining -= len(data)
+            if final:
+                break
@@ -0,0 +1,96 @@
+"""
+LRU cache of decoded file contents for FileOperations.read_file.
+
+Entries are keyed on the workspace-relative path and validated against the
+file's (mtime_ns, size, inode), so a changed file is never served stale even
+without a watcher. When the workspace index is watching, it also evicts
+entries as soon as files change.
+"""
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import os
+import threading
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Files larger than this share of the budget are not cached
+MAX_ENTRY_SHARE = 0.25
+
+FileKey = Tuple[int, int, int]
+
+def file_key(stat: os.stat_result) -> FileKey:
+    """Cache validation key for a stat result"""
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+class ReadCache:
+    """Byte-budgeted LRU cache of file contents"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, Tuple[FileKey, str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rel_path: str, key: FileKey) -> Optional[str]:
+        """Return cached content if it was read from the same file version"""
+        with self._lock:
+            cached = self._entries.get(rel_path)
+            if cached is None or cached[0] != key:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(rel_path)
+            self.hits += 1
+            self.bytes_saved += cached[2]
+            return cached[1]
+
+    def put(self, rel_path: str, key: FileKey, content: str) -> None:
+        """Cache content read from a file, evicting least recently used entries"""
+        size = key[1]
+        if size > self.max_bytes * MAX_ENTRY_SHARE:
+            return
+        with self._lock:
+            self._discard(rel_path)
+            self._entries[rel_path] = (key, content, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def _discard(self, rel_path: str) -> None:
+        """Drop one entry (lock held)"""
+        cached = self._entries.pop(rel_path, None)
+        if cached is not None:
+            self.current_bytes -= cached[2]
+
+    def invalidate(self, rel_path: str) -> None:
+        """Drop a path and, for directories, everything below it"""
+        prefix = rel_path.rstrip('/') + '/'
+        with self._lock:
+            self._discard(rel_path)
+            for path in [p for p in self._entries if p.startswith(prefix)]:
+                self._discard(path)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio, bytes saved and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,329 @@
+"""
+Trigram index for workspace text search.
+
+Every indexed text file contributes the set of lowercase three-character
+substrings it contains. A query is reduced to the trigrams any match must
+contain, the posting sets of those trigrams are intersected, and only the
+surviving candidate files are read and matched line by line. Queries with
+no usable trigrams (very short literals, or regexes without a literal run)
+fall back to scanning every indexed file.
+"""
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import fnmatch
+import json
+import logging
+import os
+import re
+import threading
+from .content_sniff import SNIFF_BYTES, sniff
+from .workspace_walker import IgnoreRules, walk_workspace
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Files larger than this are not indexed
+MAX_FILE_BYTES = 1024 * 1024
+
+DEFAULT_MAX_RESULTS = 200
+
+def trigrams(text: str) -> Set[str]:
+    """Lowercase trigrams of a string"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _literal_runs(subpattern) -> List[str]:
+    """Literal substrings every match of a parsed regex must contain
+
+    Items of a sequence are all required, so literal runs are collected from
+    the sequence itself, from groups and from repeats of at least one. An
+    alternation contributes nothing because no single branch is required.
+    """
+    runs: List[str] = []
+    current = ''
+    for op, value in subpattern:
+        if op is sre_parse.LITERAL:
+            current += chr(value)
+            continue
+        if current:
+            runs.append(current)
+            current = ''
+        if op is sre_parse.SUBPATTERN:
+            runs.extend(_literal_runs(value[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and value[0] >= 1:
+            runs.extend(_literal_runs(value[2]))
+    if current:
+        runs.append(current)
+    return runs
+
+def query_trigrams(query: str, regex: bool) -> Set[str]:
+    """Trigrams every file containing a match must have"""
+    if regex:
+        try:
+            runs = _literal_runs(sre_parse.parse(query))
+        except re.error:
+            runs = []
+    else:
+        runs = [query]
+    required: Set[str] = set()
+    for run in runs:
+        required |= trigrams(run)
+    return required
+
+def decode_text(data: bytes) -> Optional[str]:
+    """File content in its sniffed encoding with universal newlines; None if binary"""
+    sniffed = sniff(data[:SNIFF_BYTES])
+    if sniffed.is_binary:
+        return None
+    text = data.decode(sniffed.encoding, errors='replace')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+class SearchIndex:
+    """Trigram postings for the workspace's text files"""
+
+    def __init__(self,
+                 workspace_path: str,
+                 ignore_rules: IgnoreRules,
+                 snapshot_path: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.workspace_path = workspace_path
+        self.ignore_rules = ignore_rules
+        self.snapshot_path = snapshot_path or os.path.join(
+            workspace_path, '.crewai_index', 'search_index.json'
+        )
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.ready = False
+        # path -> (mtime_ns, size) of the indexed version
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._file_trigrams: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    # Building
+
+    def _load_file(self, rel_path: str) -> Optional[Tuple[Tuple[int, int], Set[str]]]:
+        """Stat, read and trigram one file; None if it is not indexable text"""
+        full_path = os.path.join(self.workspace_path, rel_path)
+        try:
+            stat = os.stat(full_path)
+            if stat.st_size > MAX_FILE_BYTES:
+                return None
+            with open(full_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        text = decode_text(data)
+        if text is None:
+            return None
+        return (stat.st_mtime_ns, stat.st_size), trigrams(text)
+
+    def _index_paths(self, paths: Iterable[str]) -> None:
+        """(Re-)index files, reading them in parallel"""
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            loaded = list(executor.map(self._load_file, paths))
+        with self._lock:
+            for path, result in zip(paths, loaded):
+                self._remove_file(path)
+                if result is not None:
+                    self._add_file(path, *result)
+
+    def _walk_files(self, directory: str = '.') -> Iterator[str]:
+        for item in walk_workspace(self.workspace_path, directory, self.ignore_rules):
+            if not item.is_dir:
+                yield item.path
+
+    def build(self) -> None:
+        """Index every non-ignored text file in the workspace"""
+        with self._lock:
+            self._files.clear()
+            self._postings.clear()
+            self._file_trigrams.clear()
+        self._index_paths(self._walk_files())
+        self.ready = True
+
+    def reconcile(self) -> int:
+        """Re-index files that changed since a snapshot was taken
+
+        Returns:
+            Number of files re-indexed or dropped
+        """
+        current: Dict[str, Tuple[int, int]] = {}
+        for item in walk_workspace(self.workspace_path, '.', self.ignore_rules):
+            if item.is_dir:
+                continue
+            try:
+                stat = item.entry.stat()
+            except OSError:
+                continue
+            current[item.path] = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            removed = [path for path in self._files if path not in current]
+            for path in removed:
+                self._remove_file(path)
+            changed = [path for path, key in current.items() if self._files.get(path) != key]
+        self._index_paths(changed)
+        return len(removed) + len(changed)
+
+    def _add_file(self, path: str, key: Tuple[int, int], grams: Set[str]) -> None:
+        """Record a file's trigrams (lock held)"""
+        self._files[path] = key
+        self._file_trigrams[path] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(path)
+
+    def _remove_file(self, path: str) -> None:
+        """Drop a file from the postings (lock held)"""
+        if self._files.pop(path, None) is None:
+            return
+        for gram in self._file_trigrams.pop(path, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(path)
+                if not posting:
+                    del self._postings[gram]
+
+    def update_path(self, rel_path: str) -> None:
+        """Re-index a changed file, or every file below a changed directory"""
+        rel_path = rel_path.strip('/')
+        prefix = rel_path + '/' if rel_path else ''
+        with self._lock:
+            stale = [p for p in self._files if p == rel_path or p.startswith(prefix)]
+            for path in stale:
+                self._remove_file(path)
+
+        full_path = os.path.join(self.workspace_path, rel_path)
+        if os.path.isdir(full_path):
+            if not rel_path or not self.ignore_rules.is_path_ignored(rel_path, True):
+                self._index_paths(self._walk_files(rel_path or '.'))
+        elif os.path.isfile(full_path) and not self.ignore_rules.is_path_ignored(rel_path, False):
+            self._index_paths([rel_path])
+
+    # Queries
+
+    def candidates(self, query: str, regex: bool = False) -> List[str]:
+        """Files that may contain a match, in path order"""
+        required = query_trigrams(query, regex)
+        with self._lock:
+            if not required:
+                return sorted(self._files)
+            postings = [self._postings.get(gram, set()) for gram in required]
+            postings.sort(key=len)
+            result = set(postings[0])
+            for posting in postings[1:]:
+                result &= posting
+                if not result:
+                    break
+        return sorted(result)
+
+    def search(self,
+               query: str,
+               regex: bool = False,
+               case_sensitive: bool = True,
+               pattern: Optional[str] = None,
+               context: int = 2,
+               max_results: int = DEFAULT_MAX_RESULTS) -> Dict[str, Any]:
+        """Find lines matching a literal or regular expression
+
+        Args:
+            query: Text or regular expression to find
+            regex: Treat query as a regular expression
+            case_sensitive: Match case exactly
+            pattern: Glob limiting the files searched (matched against the path)
+            context: Lines of context before and after each match
+            max_results: Stop after this many matches
+        """
+        flags = 0 if case_sensitive else re.IGNORECASE
+        compiled = re.compile(query if regex else re.escape(query), flags)
+        files = self.candidates(query, regex)
+        if pattern:
+            files = [path for path in files if fnmatch.fnmatch(path, pattern)
+                     or fnmatch.fnmatch(path.rpartition('/')[2], pattern)]
+
+        matches: List[Dict[str, Any]] = []
+        truncated = False
+        for path in files:
+            try:
+                # Decoded as when indexed, so matches agree with the trigrams
+                with open(os.path.join(self.workspace_path, path), 'rb') as f:
+                    text = decode_text(f.read())
+            except OSError:
+                continue
+            if text is None:
+                continue
+            lines = text.split('\n')
+            for number, line in enumerate(lines):
+                found = compiled.search(line)
+                if not found:
+                    continue
+                if len(matches) >= max_results:
+                    truncated = True
+                    break
+                matches.append({
+                    'path': path,
+                    'line': number + 1,
+                    'column': found.start() + 1,
+                    'text': line,
+                    'before': lines[max(0, number - context):number],
+                    'after': lines[number + 1:number + 1 + context]
+                })
+            if truncated:
+                break
+
+        return {
+            'status': 'success',
+            'matches': matches,
+            'truncated': truncated,
+            'candidates': len(files),
+            'indexed_files': len(self._files)
+        }
+
+    # Persistence
+
+    def save_snapshot(self) -> None:
+        """Persist files and their trigrams"""
+        with self._lock:
+            rows = [[path, *self._files[path], sorted(self._file_trigrams[path])]
+                    for path in self._files]
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f'{self.snapshot_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'files': rows}, f, separators=(',', ':'))
+        os.replace(temp_path, self.snapshot_path)
+
+    def load_snapshot(self) -> bool:
+        """Load a persisted snapshot; returns False if none is usable"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                return False
+            with self._lock:
+                self._files.clear()
+                self._postings.clear()
+                self._file_trigrams.clear()
+                for path, mtime_ns, size, grams in snapshot['files']:
+                    self._add_file(path, (mtime_ns, size), set(grams))
+            self.ready = True
+            return True
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.info(f"No usable search index snapshot: {e}")
+            return False
+
+    def start(self, warm_start: bool = True) -> None:
+        """Restore the snapshot and catch up with the disk, or build from scratch"""
+        if warm_start and self.load_snapshot():
+            self.reconcile()
+        else:
+            self.build()
+        self.save_snapshot()
@@ -0,0 +1,298 @@
+"""
+AST index of Python definitions and imports in the workspace.
+
+Each Python file is summarised once per content hash: the classes and
+functions it defines (with line ranges and whether they have a docstring)
+and the modules it imports. Summaries are cached by hash, so unchanged
+files are never parsed again, even across restarts, and files are only
+re-hashed when their mtime or size changed. Large batches are parsed in a
+process pool since parsing is CPU bound.
+"""
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import ast
+import hashlib
+import json
+import logging
+import os
+import threading
+from .workspace_walker import IgnoreRules, walk_workspace
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Batches smaller than this are parsed in-process; a pool would cost more to start
+PROCESS_POOL_THRESHOLD = 64
+
+PYTHON_EXTENSIONS = ('.py', '.pyi')
+
+def is_python(rel_path: str) -> bool:
+    """Whether a path names a Python source or stub file"""
+    return rel_path.endswith(PYTHON_EXTENSIONS)
+
+def summarize_python(source: str) -> Optional[Dict[str, Any]]:
+    """Definitions and imports of a Python module; None if it does not parse
+
+    Runs in worker processes, so it only takes and returns plain data.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    definitions: List[Dict[str, Any]] = []
+    imports: List[Dict[str, Any]] = []
+
+    def visit(node: ast.AST, scope: List[str], in_class: bool) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                if isinstance(child, ast.ClassDef):
+                    kind = 'class'
+                else:
+                    kind = 'method' if in_class else 'function'
+                qualname = '.'.join(scope + [child.name])
+                definitions.append({
+                    'name': child.name,
+                    'qualname': qualname,
+                    'kind': kind,
+                    'line': child.lineno,
+                    'end_line': getattr(child, 'end_lineno', child.lineno),
+                    'has_docstring': ast.get_docstring(child) is not None
+                })
+                visit(child, scope + [child.name], isinstance(child, ast.ClassDef))
+            elif isinstance(child, ast.Import):
+                for alias in child.names:
+                    imports.append({'module': alias.name, 'names': [], 'level': 0,
+                                    'line': child.lineno})
+            elif isinstance(child, ast.ImportFrom):
+                imports.append({'module': child.module or '',
+                                'names': [alias.name for alias in child.names],
+                                'level': child.level,
+                                'line': child.lineno})
+            else:
+                visit(child, scope, in_class)
+
+    visit(tree, [], False)
+    return {
+        'definitions': definitions,
+        'imports': imports,
+        'has_docstring': ast.get_docstring(tree) is not None
+    }
+
+class SymbolIndex:
+    """Python definitions and imports per workspace file"""
+
+    def __init__(self,
+                 workspace_path: str,
+                 ignore_rules: IgnoreRules,
+                 snapshot_path: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.workspace_path = workspace_path
+        self.ignore_rules = ignore_rules
+        self.snapshot_path = snapshot_path or os.path.join(
+            workspace_path, '.crewai_index', 'symbol_index.json'
+        )
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.ready = False
+        # path -> (mtime_ns, size, content hash)
+        self._files: Dict[str, Tuple[int, int, str]] = {}
+        # content hash -> summary (None for files that do not parse)
+        self._summaries: Dict[str, Optional[Dict[str, Any]]] = {}
+        # definition name and qualname -> paths defining it
+        self._by_name: Dict[str, set] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    # Building
+
+    def _read(self, rel_path: str) -> Optional[Tuple[Tuple[int, int], str, str]]:
+        """Stat, read and hash a file"""
+        try:
+            full_path = os.path.join(self.workspace_path, rel_path)
+            stat = os.stat(full_path)
+            with open(full_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        return ((stat.st_mtime_ns, stat.st_size), hashlib.sha256(data).hexdigest(),
+                data.decode('utf-8', errors='replace'))
+
+    def _parse_all(self, sources: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if len(sources) < PROCESS_POOL_THRESHOLD or self.max_workers == 1:
+            return [summarize_python(source) for source in sources]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(summarize_python, sources, chunksize=16))
+
+    def _index_paths(self, paths: Iterable[str]) -> None:
+        """(Re-)index files, parsing only content not seen before"""
+        pending: Dict[str, str] = {}
+        updates: Dict[str, Optional[Tuple[int, int, str]]] = {}
+        for path in paths:
+            read = self._read(path)
+            if read is None:
+                updates[path] = None
+                continue
+            (mtime_ns, size), digest, source = read
+            updates[path] = (mtime_ns, size, digest)
+            if digest not in self._summaries:
+                pending[digest] = source
+
+        if pending:
+            digests = list(pending)
+            summaries = self._parse_all([pending[digest] for digest in digests])
+            with self._lock:
+                self._summaries.update(zip(digests, summaries))
+
+        with self._lock:
+            for path, key in updates.items():
+                self._remove_file(path)
+                if key is not None:
+                    self._add_file(path, key)
+
+    def _add_file(self, path: str, key: Tuple[int, int, str]) -> None:
+        """Record a file and its definitions (lock held)"""
+        self._files[path] = key
+        for definition in (self._summaries.get(key[2]) or {}).get('definitions', []):
+            for name in {definition['name'], definition['qualname']}:
+                self._by_name.setdefault(name, set()).add(path)
+
+    def _remove_file(self, path: str) -> None:
+        """Forget a file's definitions (lock held)"""
+        key = self._files.pop(path, None)
+        if key is None:
+            return
+        for definition in (self._summaries.get(key[2]) or {}).get('definitions', []):
+            for name in {definition['name'], definition['qualname']}:
+                paths = self._by_name.get(name)
+                if paths is not None:
+                    paths.discard(path)
+                    if not paths:
+                        del self._by_name[name]
+
+    def _walk_python(self, directory: str = '.') -> Iterable[Tuple[str, os.DirEntry]]:
+        for item in walk_workspace(self.workspace_path, directory, self.ignore_rules):
+            if not item.is_dir and is_python(item.path):
+                yield item.path, item.entry
+
+    def refresh(self) -> int:
+        """Bring the index up to date with the disk
+
+        Files whose mtime and size are unchanged are skipped without being read.
+
+        Returns:
+            Number of files re-indexed or dropped
+        """
+        current: Dict[str, Tuple[int, int]] = {}
+        for path, entry in self._walk_python():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            current[path] = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            removed = [path for path in self._files if path not in current]
+            for path in removed:
+                self._remove_file(path)
+            changed = [path for path, key in current.items()
+                       if self._files.get(path, (None, None))[:2] != key]
+        self._index_paths(changed)
+        self.ready = True
+        return len(removed) + len(changed)
+
+    def update_path(self, rel_path: str) -> None:
+        """Re-index a changed file, or every Python file below a changed directory"""
+        rel_path = rel_path.strip('/')
+        prefix = rel_path + '/' if rel_path else ''
+        with self._lock:
+            for path in [p for p in self._files if p == rel_path or p.startswith(prefix)]:
+                self._remove_file(path)
+
+        full_path = os.path.join(self.workspace_path, rel_path)
+        if os.path.isdir(full_path):
+            if not rel_path or not self.ignore_rules.is_path_ignored(rel_path, True):
+                self._index_paths(path for path, _ in self._walk_python(rel_path or '.'))
+        elif (is_python(rel_path) and os.path.isfile(full_path)
+              and not self.ignore_rules.is_path_ignored(rel_path, False)):
+            self._index_paths([rel_path])
+
+    # Queries
+
+    def file_summary(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        """Definitions and imports of one file; None if it is not indexed"""
+        key = self._files.get(rel_path.strip('/'))
+        if key is None:
+            return None
+        return self._summaries.get(key[2]) or {'definitions': [], 'imports': [],
+                                               'has_docstring': False, 'parse_error': True}
+
+    def files_defining(self, name: str) -> List[str]:
+        """Files defining a name or qualified name (e.g. 'Class.method')"""
+        with self._lock:
+            return sorted(self._by_name.get(name, ()))
+
+    def lookup(self, name: str) -> List[Dict[str, Any]]:
+        """Definitions matching a name or qualified name, with their file"""
+        results = []
+        for path in self.files_defining(name):
+            summary = self.file_summary(path) or {}
+            for definition in summary.get('definitions', []):
+                if name in (definition['name'], definition['qualname']):
+                    results.append({'path': path, **definition})
+        return results
+
+    def file_hashes(self) -> Dict[str, str]:
+        """Content hash of every indexed file"""
+        with self._lock:
+            return {path: key[2] for path, key in self._files.items()}
+
+    def iter_summaries(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """All indexed files with their summaries, in path order"""
+        with self._lock:
+            paths = sorted(self._files)
+        for path in paths:
+            summary = self.file_summary(path)
+            if summary is not None:
+                yield path, summary
+
+    # Persistence
+
+    def save_snapshot(self) -> None:
+        """Persist file keys and the summaries they reference"""
+        with self._lock:
+            files = {path: list(key) for path, key in self._files.items()}
+            summaries = {key[2]: self._summaries.get(key[2]) for key in self._files.values()}
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f'{self.snapshot_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'files': files, 'summaries': summaries},
+                      f, separators=(',', ':'))
+        os.replace(temp_path, self.snapshot_path)
+
+    def load_snapshot(self) -> bool:
+        """Load a persisted snapshot; returns False if none is usable"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                return False
+            with self._lock:
+                self._files.clear()
+                self._by_name.clear()
+                self._summaries = dict(snapshot['summaries'])
+                for path, key in snapshot['files'].items():
+                    self._add_file(path, tuple(key))
+            return True
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.info(f"No usable symbol index snapshot: {e}")
+            return False
+
+    def start(self, warm_start: bool = True) -> None:
+        """Restore the snapshot if present, then catch up with the disk"""
+        if warm_start:
+            self.load_snapshot()
+        self.refresh()
+        self.save_snapshot()
@@ -0,0 +1,233 @@
+"""
+Merkle-tree fingerprint of workspace content.
+
+Every non-ignored file is hashed (in parallel, and only again when its mtime
+or size changes) and every directory hash is rolled up from its children's
+names and hashes, so the root hash changes exactly when some file's content,
+name or location changes. Directory nodes are stored content-addressed, so
+fingerprints taken at different times share all unchanged subtrees and
+"what changed since fingerprint X" only descends into directories whose
+hashes differ.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import threading
+from .workspace_walker import IgnoreRules, walk_workspace
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# Fingerprints kept for changed_since; older ones are forgotten
+MAX_FINGERPRINTS = 32
+
+HASH_CHUNK = 1024 * 1024
+
+# (name, is_dir, hash) of a directory entry
+Child = Tuple[str, bool, str]
+
+def hash_file(full_path: str) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_directory(children: List[Child]) -> str:
+    """Hash of a directory from its sorted children"""
+    digest = hashlib.sha256()
+    for name, is_dir, child_hash in children:
+        digest.update(f"{'d' if is_dir else 'f'} {child_hash} {name}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+class WorkspaceFingerprint:
+    """Merkle tree over the workspace's files"""
+
+    def __init__(self,
+                 workspace_path: str,
+                 ignore_rules: IgnoreRules,
+                 state_path: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.workspace_path = workspace_path
+        self.ignore_rules = ignore_rules
+        self.state_path = state_path or os.path.join(
+            workspace_path, '.crewai_index', 'fingerprint.json'
+        )
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        # path -> (mtime_ns, size, content hash)
+        self._files: Dict[str, Tuple[int, int, str]] = {}
+        # directory hash -> its children
+        self._nodes: Dict[str, List[Child]] = {}
+        # Known root hashes, oldest first
+        self._roots: List[str] = []
+        self._lock = threading.Lock()
+
+    def _stat_files(self) -> Iterable[Tuple[str, int, int]]:
+        for item in walk_workspace(self.workspace_path, '.', self.ignore_rules):
+            if item.is_dir:
+                continue
+            try:
+                stat = item.entry.stat()
+            except OSError:
+                continue
+            yield item.path, stat.st_mtime_ns, stat.st_size
+
+    def _hash(self, rel_path: str) -> Optional[str]:
+        try:
+            return hash_file(os.path.join(self.workspace_path, rel_path))
+        except OSError:
+            return None
+
+    def compute(self, stats: Optional[Iterable[Tuple[str, int, int]]] = None) -> str:
+        """Bring file hashes up to date and return the root hash
+
+        Args:
+            stats: (path, mtime_ns, size) of every workspace file, e.g. from the
+                workspace index; the workspace is walked when omitted
+        """
+        current = {path: (mtime_ns, size) for path, mtime_ns, size in
+                   (self._stat_files() if stats is None else stats)}
+        with self._lock:
+            stale = [path for path, key in current.items()
+                     if self._files.get(path, (None, None))[:2] != key]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            hashes = list(executor.map(self._hash, stale))
+
+        with self._lock:
+            self._files = {path: self._files[path] for path in current
+                           if path in self._files}
+            for path, digest in zip(stale, hashes):
+                if digest is None:
+                    self._files.pop(path, None)
+                else:
+                    self._files[path] = (*current[path], digest)
+            root = self._build_tree()
+            if root in self._roots:
+                self._roots.remove(root)
+            self._roots.append(root)
+            self._prune()
+        return root
+
+    def _build_tree(self) -> str:
+        """Roll file hashes up into directory nodes (lock held)"""
+        children: Dict[str, List[Child]] = {'': []}
+        for path, (_, _, digest) in self._files.items():
+            parent, _, name = path.rpartition('/')
+            children.setdefault(parent, []).append((name, False, digest))
+        for directory in list(children):
+            while directory:
+                directory = directory.rpartition('/')[0]
+                children.setdefault(directory, [])
+
+        # Deepest directories first, so children are hashed before their parents
+        root = ''
+        for directory in sorted(children, key=lambda d: d.count('/') + 1 if d else 0,
+                                reverse=True):
+            entries = sorted(children[directory])
+            digest = hash_directory(entries)
+            self._nodes.setdefault(digest, entries)
+            if directory:
+                parent, _, name = directory.rpartition('/')
+                children[parent].append((name, True, digest))
+            else:
+                root = digest
+        return root
+
+    def _prune(self) -> None:
+        """Forget old fingerprints and nodes no kept fingerprint reaches (lock held)"""
+        del self._roots[:-MAX_FINGERPRINTS]
+        reachable: Set[str] = set()
+        pending = list(self._roots)
+        while pending:
+            digest = pending.pop()
+            if digest in reachable:
+                continue
+            reachable.add(digest)
+            pending.extend(child for _, is_dir, child in self._nodes.get(digest, ()) if is_dir)
+        self._nodes = {digest: node for digest, node in self._nodes.items() if digest in reachable}
+
+    def knows(self, fingerprint: str) -> bool:
+        """Whether changed_since can answer for a fingerprint"""
+        return fingerprint in self._roots
+
+    def _files_below(self, digest: str, prefix: str) -> List[str]:
+        """All file paths in a directory node"""
+        files = []
+        for name, is_dir, child in self._nodes.get(digest, ()):
+            path = f'{prefix}{name}'
+            if is_dir:
+                files.extend(self._files_below(child, path + '/'))
+            else:
+                files.append(path)
+        return files
+
+    def diff(self, old_root: str, new_root: str) -> Dict[str, List[str]]:
+        """Files added, modified and deleted between two fingerprints"""
+        changes: Dict[str, List[str]] = {'added': [], 'modified': [], 'deleted': []}
+
+        def compare(old: str, new: str, prefix: str) -> None:
+            if old == new:
+                return
+            old_children = {name: (is_dir, h) for name, is_dir, h in self._nodes.get(old, ())}
+            new_children = {name: (is_dir, h) for name, is_dir, h in self._nodes.get(new, ())}
+            for name in sorted(old_children.keys() | new_children.keys()):
+                path = f'{prefix}{name}'
+                before = old_children.get(name)
+                after = new_children.get(name)
+                if before == after:
+                    continue
+                if before and after and before[0] and after[0]:
+                    compare(before[1], after[1], path + '/')
+                elif before and after and not before[0] and not after[0]:
+                    changes['modified'].append(path)
+                else:
+                    if before:
+                        changes['deleted'].extend(self._files_below(before[1], path + '/')
+                                                  if before[0] else [path])
+                    if after:
+                        changes['added'].extend(self._files_below(after[1], path + '/')
+                                                if after[0] else [path])
+
+        with self._lock:
+            compare(old_root, new_root, '')
+        return changes
+
+    # Persistence
+
+    def save(self) -> None:
+        """Persist file hashes, tree nodes and known fingerprints"""
+        with self._lock:
+            state = {
+                'version': STATE_VERSION,
+                'files': {path: list(key) for path, key in self._files.items()},
+                'nodes': {digest: [list(child) for child in node]
+                          for digest, node in self._nodes.items()},
+                'roots': list(self._roots)
+            }
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        temp_path = f'{self.state_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(temp_path, self.state_path)
+
+    def load(self) -> bool:
+        """Load persisted state; returns False if none is usable"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') != STATE_VERSION:
+                return False
+            with self._lock:
+                self._files = {path: tuple(key) for path, key in state['files'].items()}
+                self._nodes = {digest: [tuple(child) for child in node]
+                               for digest, node in state['nodes'].items()}
+                self._roots = list(state['roots'])
+            return True
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.info(f"No usable workspace fingerprint state: {e}")
+            return False
@@ -0,0 +1,362 @@
+"""
+In-memory index of workspace paths.
+
+The index is built once with a parallel walk and then kept current from
+filesystem events (watchdog, when installed) and from FileOperations' own
+writes. A JSON snapshot allows a warm restart: the snapshot is served
+immediately while a background rescan reconciles it with the disk.
+"""
+from typing import Dict, Any, Callable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import threading
+import time
+from .workspace_walker import IgnoreRules, GITIGNORE_NAME, walk_workspace
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = '.crewai_index'
+SNAPSHOT_VERSION = 1
+
+# Seconds to wait for .gitignore changes to settle before rebuilding
+REBUILD_DELAY = 0.5
+
+class IndexEntry(NamedTuple):
+    """Metadata kept for one indexed path"""
+    size: int
+    mtime_ns: int
+    ctime: float
+    inode: int
+    is_dir: bool
+    ignored: bool
+
+    @property
+    def mtime(self) -> float:
+        """Modification time in seconds since the epoch"""
+        return self.mtime_ns / 1e9
+
+def _entry_from_stat(stat: os.stat_result, is_dir: bool, ignored: bool) -> IndexEntry:
+    return IndexEntry(stat.st_size, stat.st_mtime_ns, stat.st_ctime, stat.st_ino, is_dir, ignored)
+
+class _IndexEventHandler(FileSystemEventHandler):
+    """Forwards watchdog events to the index"""
+
+    def __init__(self, index: 'WorkspaceIndex'):
+        super().__init__()
+        self.index = index
+
+    def on_any_event(self, event) -> None:
+        if event.event_type == 'modified' and event.is_directory:
+            # A directory changes when entries are added or removed below it;
+            # those arrive as their own events, so only its own stat is updated
+            self.index.handle_change(event.src_path, rescan=False)
+        elif event.event_type == 'moved':
+            self.index.handle_change(event.src_path)
+            self.index.handle_change(event.dest_path)
+        elif event.event_type in ('created', 'modified', 'deleted'):
+            self.index.handle_change(event.src_path)
+
+class WorkspaceIndex:
+    """Path, size, mtime, type and ignore status for every workspace entry"""
+
+    def __init__(self,
+                 workspace_path: str,
+                 ignore_rules: IgnoreRules,
+                 snapshot_path: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.workspace_path = workspace_path
+        self.ignore_rules = ignore_rules
+        self.snapshot_path = snapshot_path or os.path.join(
+            workspace_path, INDEX_DIR, 'workspace_index.json'
+        )
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.ready = False
+        self.listeners: List[Callable[[str], None]] = []
+        self._entries: Dict[str, IndexEntry] = {}
+        self._children: Dict[str, Set[str]] = {'': set()}
+        self._lock = threading.RLock()
+        # Serialises full builds, e.g. the warm-start reconcile and a rebuild
+        self._build_lock = threading.Lock()
+        self._rebuild_cond = threading.Condition()
+        self._rebuild_due: Optional[float] = None
+        self._rebuilder: Optional[threading.Thread] = None
+        self._observer = None
+
+    @property
+    def watching(self) -> bool:
+        """Whether filesystem events keep the index current"""
+        return self._observer is not None
+
+    # Building
+
+    def _scan(self, directory: str, max_depth: Optional[int] = None) -> List[Tuple[str, IndexEntry]]:
+        """Walk a directory and stat its entries"""
+        results = []
+        for item in walk_workspace(self.workspace_path, directory, self.ignore_rules,
+                                   max_depth=max_depth, report_ignored=True):
+            try:
+                stat = item.entry.stat()
+            except OSError:
+                continue
+            results.append((item.path, _entry_from_stat(stat, item.is_dir, item.ignored)))
+        return results
+
+    def build(self) -> None:
+        """Scan the whole workspace, walking top-level directories in parallel"""
+        with self._build_lock:
+            self._build()
+
+    def _build(self) -> None:
+        top_level = self._scan('.', max_depth=1)
+        subdirectories = [path for path, entry in top_level if entry.is_dir and not entry.ignored]
+
+        entries: Dict[str, IndexEntry] = dict(top_level)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for results in executor.map(self._scan, subdirectories):
+                entries.update(results)
+
+        with self._lock:
+            self._entries = {}
+            self._children = {'': set()}
+            for path in sorted(entries):
+                self._add(path, entries[path])
+            self.ready = True
+
+    def _add(self, path: str, entry: IndexEntry) -> None:
+        """Insert an entry and link it to its parent (lock held)"""
+        self._entries[path] = entry
+        parent, _, name = path.rpartition('/')
+        self._children.setdefault(parent, set()).add(name)
+        if entry.is_dir:
+            self._children.setdefault(path, set())
+
+    def _remove(self, path: str) -> None:
+        """Remove an entry and everything below it (lock held)"""
+        for name in self._children.pop(path, set()):
+            self._remove(f'{path}/{name}')
+        self._entries.pop(path, None)
+        parent, _, name = path.rpartition('/')
+        siblings = self._children.get(parent)
+        if siblings is not None:
+            siblings.discard(name)
+
+    # Updates
+
+    def refresh_path(self, rel_path: str, rescan: bool = True) -> None:
+        """Re-stat a path after it changed, rescanning it if it is a directory
+
+        With rescan False an indexed directory only has its own entry
+        updated; its contents and listeners are left alone.
+        """
+        rel_path = rel_path.strip('/')
+        if not rel_path:
+            if rescan:
+                self.build()
+            return
+
+        full_path = os.path.join(self.workspace_path, rel_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            with self._lock:
+                self._remove(rel_path)
+            self._notify(rel_path)
+            return
+
+        is_dir = os.path.isdir(full_path)
+        if not rescan and is_dir:
+            with self._lock:
+                entry = self._entries.get(rel_path)
+                if entry is not None and entry.is_dir:
+                    self._entries[rel_path] = _entry_from_stat(stat, True, entry.ignored)
+                    return
+        parent = rel_path.rpartition('/')[0]
+        if parent and parent not in self._entries:
+            self.refresh_path(parent)
+            return
+
+        ignored = self.ignore_rules.is_path_ignored(rel_path, is_dir)
+        subtree = self._scan(rel_path) if is_dir and not ignored else []
+        with self._lock:
+            self._remove(rel_path)
+            self._add(rel_path, _entry_from_stat(stat, is_dir, ignored))
+            for path, entry in subtree:
+                self._add(path, entry)
+        self._notify(rel_path)
+
+    def handle_change(self, abs_path: str, rescan: bool = True) -> None:
+        """Apply a filesystem event for an absolute path (see refresh_path for rescan)"""
+        rel_path = os.path.relpath(abs_path, self.workspace_path).replace(os.sep, '/')
+        if rel_path == '.' or rel_path.startswith('../'):
+            return
+        parent = rel_path.rpartition('/')[0]
+        if parent and self.ignore_rules.is_path_ignored(parent, True):
+            return
+        if rel_path.rpartition('/')[2] == GITIGNORE_NAME:
+            # Ignore rules changed, so ignore status anywhere below may differ
+            self.ignore_rules.reload_gitignore(parent)
+            self._request_rebuild()
+            return
+        try:
+            self.refresh_path(rel_path, rescan)
+        except Exception as e:
+            logger.warning(f"Failed to update workspace index for {rel_path}: {e}")
+
+    def _request_rebuild(self) -> None:
+        """Rebuild once changes settle; requests meanwhile share one rebuild"""
+        with self._rebuild_cond:
+            self._rebuild_due = time.monotonic() + REBUILD_DELAY
+            if self._rebuilder is None:
+                self._rebuilder = threading.Thread(target=self._rebuild_loop,
+                                                   name='index-rebuild', daemon=True)
+                self._rebuilder.start()
+            self._rebuild_cond.notify()
+
+    def _rebuild_loop(self) -> None:
+        """Single rebuild worker: waits out the delay, rebuilds, and exits when idle"""
+        while True:
+            with self._rebuild_cond:
+                while True:
+                    if self._rebuild_due is None:
+                        self._rebuilder = None
+                        return
+                    remaining = self._rebuild_due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._rebuild_cond.wait(remaining)
+                self._rebuild_due = None
+            try:
+                self.build()
+            except Exception as e:
+                logger.warning(f"Failed to rebuild workspace index: {e}")
+
+    def _notify(self, rel_path: str) -> None:
+        """Tell listeners a path changed"""
+        for listener in self.listeners:
+            try:
+                listener(rel_path)
+            except Exception as e:
+                logger.warning(f"Workspace index listener failed: {e}")
+
+    # Queries
+
+    def get(self, rel_path: str) -> Optional[IndexEntry]:
+        """Look up one path"""
+        return self._entries.get(rel_path.strip('/'))
+
+    def iter_entries(self,
+                     directory: str = '',
+                     max_depth: Optional[int] = None,
+                     after: Optional[str] = None,
+                     include_ignored: bool = False) -> Iterator[Tuple[str, IndexEntry]]:
+        """Yield indexed entries below a directory in the same order as walk_workspace"""
+        directory = '' if directory in ('', '.') else directory.strip('/')
+        cursor = tuple(after.strip('/').split('/')) if after else None
+        with self._lock:
+            names = sorted(self._children.get(directory, ()))
+        stack: List[Tuple[Iterator[str], str, int]] = [(iter(names), directory, 1)]
+
+        while stack:
+            names_iter, rel_dir, depth = stack[-1]
+            name = next(names_iter, None)
+            if name is None:
+                stack.pop()
+                continue
+            path = f'{rel_dir}/{name}' if rel_dir else name
+            entry = self._entries.get(path)
+            if entry is None or (entry.ignored and not include_ignored):
+                continue
+            descend = entry.is_dir and (max_depth is None or depth < max_depth)
+
+            if cursor is not None:
+                parts = tuple(path.split('/'))
+                if parts <= cursor:
+                    if descend and cursor[:len(parts)] == parts:
+                        with self._lock:
+                            children = sorted(self._children.get(path, ()))
+                        stack.append((iter(children), path, depth + 1))
+                    continue
+
+            yield path, entry
+            if descend:
+                with self._lock:
+                    children = sorted(self._children.get(path, ()))
+                stack.append((iter(children), path, depth + 1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Persistence
+
+    def save_snapshot(self) -> None:
+        """Persist the index for a warm restart"""
+        with self._lock:
+            rows = [[path, *entry] for path, entry in self._entries.items()]
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f'{self.snapshot_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'entries': rows}, f, separators=(',', ':'))
+        os.replace(temp_path, self.snapshot_path)
+
+    def load_snapshot(self) -> bool:
+        """Load a persisted snapshot; returns False if none is usable"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                return False
+            with self._lock:
+                self._entries = {}
+                self._children = {'': set()}
+                for path, *fields in sorted(snapshot['entries']):
+                    self._add(path, IndexEntry(*fields))
+                self.ready = True
+            return True
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.info(f"No usable workspace index snapshot: {e}")
+            return False
+
+    # Lifecycle
+
+    def start(self, watch: bool = True, warm_start: bool = True) -> None:
+        """Build or restore the index and start watching for changes"""
+        if warm_start and self.load_snapshot():
+            # Serve the snapshot right away and reconcile with the disk in the background
+            threading.Thread(target=self._rebuild_and_save, daemon=True).start()
+        else:
+            self._rebuild_and_save()
+
+        if watch:
+            if Observer is None:
+                logger.warning("watchdog is not installed; workspace index only tracks "
+                               "changes made through FileOperations")
+                return
+            self._observer = Observer()
+            self._observer.schedule(_IndexEventHandler(self), self.workspace_path, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+
+    def _rebuild_and_save(self) -> None:
+        try:
+            self.build()
+            self.save_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to build workspace index: {e}")
+
+    def stop(self) -> None:
+        """Stop watching and persist the index"""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self.ready:
+            self.save_snapshot()
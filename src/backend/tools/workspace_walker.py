@@ -0,0 +1,277 @@
+"""
+Workspace traversal built on os.scandir.
+
+Directories are pruned with .gitignore rules and default excludes before
+they are entered, and entries are yielded in a stable order (sorted names,
+depth-first) so listings can be paginated with a path cursor.
+"""
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import fnmatch
+import os
+import re
+import threading
+
+# Directory and file names never worth walking into
+DEFAULT_EXCLUDES = [
+    '.git',
+    '.hg',
+    '.svn',
+    'node_modules',
+    '.venv',
+    'venv',
+    '__pycache__',
+    '.mypy_cache',
+    '.pytest_cache',
+    '.ruff_cache',
+    '.tox',
+    '.nox',
+    '.crewai_debug',
+    '.crewai_memories',
+    '.crewai_index'
+]
+
+GITIGNORE_NAME = '.gitignore'
+
+class WalkEntry(NamedTuple):
+    """A file or directory found while walking the workspace"""
+    path: str
+    is_dir: bool
+    entry: os.DirEntry
+    ignored: bool = False
+
+def _translate_pattern(pattern: str) -> str:
+    """Translate a gitignore glob into a regex over '/'-separated relative paths"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex += '/.*'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif char == '*':
+            regex += '[^/]*'
+            i += 1
+        elif char == '?':
+            regex += '[^/]'
+            i += 1
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex += re.escape(char)
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex += f'[{body}]'
+                i = end + 1
+        elif char == '\\' and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(char)
+            i += 1
+    return regex
+
+class IgnoreRule(NamedTuple):
+    """A compiled gitignore line"""
+    regex: 're.Pattern'
+    negated: bool
+    dir_only: bool
+
+def parse_gitignore(lines: List[str]) -> List[IgnoreRule]:
+    """Compile gitignore lines into rules, in file order"""
+    rules = []
+    for raw_line in lines:
+        line = raw_line.rstrip('\n').rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # Patterns with an inner slash are relative to the .gitignore location
+        anchored = '/' in line
+        line = line.lstrip('/')
+        prefix = '' if anchored else '(?:.*/)?'
+        regex = re.compile(f'^{prefix}{_translate_pattern(line)}$')
+        rules.append(IgnoreRule(regex, negated, dir_only))
+    return rules
+
+class IgnoreRules:
+    """.gitignore rules plus configurable excludes for one workspace"""
+
+    def __init__(self,
+                 workspace_path: str,
+                 excludes: Optional[List[str]] = None,
+                 use_gitignore: bool = True):
+        self.workspace_path = workspace_path
+        excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+        self.excludes = {p for p in excludes if not any(c in p for c in '*?[')}
+        self.exclude_patterns = [p for p in excludes if any(c in p for c in '*?[')]
+        self.use_gitignore = use_gitignore
+        # Relative directory ('' for the root) -> rules from its .gitignore.
+        # Walker threads share it, so it is replaced rather than changed in
+        # place: readers always see a complete dict without taking the lock.
+        self._gitignores: Dict[str, List[IgnoreRule]] = {}
+        self._lock = threading.Lock()
+
+    def _read_gitignore(self, rel_dir: str) -> List[IgnoreRule]:
+        path = os.path.join(self.workspace_path, rel_dir, GITIGNORE_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                return parse_gitignore(f.readlines())
+        except OSError:
+            return []
+
+    def load_gitignore(self, rel_dir: str) -> None:
+        """Load the .gitignore of a directory (relative to the workspace) if present"""
+        if not self.use_gitignore or rel_dir in self._gitignores:
+            return
+        with self._lock:
+            if rel_dir not in self._gitignores:
+                self._gitignores = {**self._gitignores, rel_dir: self._read_gitignore(rel_dir)}
+
+    def reload_gitignore(self, rel_dir: str) -> None:
+        """Re-read a directory's .gitignore after it changed"""
+        if not self.use_gitignore:
+            return
+        with self._lock:
+            self._gitignores = {**self._gitignores, rel_dir: self._read_gitignore(rel_dir)}
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Check a '/'-separated workspace-relative path against excludes and .gitignore files
+
+        Only the path itself is checked; callers walking the tree prune ignored
+        directories, so their contents are never visited.
+        """
+        name = rel_path.rsplit('/', 1)[-1]
+        if name in self.excludes or any(fnmatch.fnmatchcase(name, p)
+                                        for p in self.exclude_patterns):
+            return True
+        if not self.use_gitignore:
+            return False
+
+        ignored = False
+        for rel_dir, rules in self._gitignores.items():
+            if rel_dir:
+                if not rel_path.startswith(rel_dir + '/'):
+                    continue
+                candidate = rel_path[len(rel_dir) + 1:]
+            else:
+                candidate = rel_path
+            for rule in rules:
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.regex.match(candidate):
+                    ignored = not rule.negated
+        return ignored
+
+    def is_path_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Check a path and all of its parent directories"""
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            parent = '/'.join(parts[:depth])
+            self.load_gitignore('/'.join(parts[:depth - 1]))
+            if self.is_ignored(parent, True):
+                return True
+        self.load_gitignore('/'.join(parts[:-1]))
+        return self.is_ignored(rel_path, is_dir)
+
+def _cursor_parts(cursor: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not cursor:
+        return None
+    return tuple(cursor.replace(os.sep, '/').strip('/').split('/'))
+
+def _scan_directory(abs_dir: str, rel_dir: str, ignore_rules: IgnoreRules) -> List[os.DirEntry]:
+    """Sorted entries of one directory, loading its .gitignore when present"""
+    try:
+        with os.scandir(abs_dir) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return []
+    if any(e.name == GITIGNORE_NAME for e in entries):
+        ignore_rules.load_gitignore(rel_dir)
+    return entries
+
+def walk_workspace(workspace_path: str,
+                   directory: str = '.',
+                   ignore_rules: Optional[IgnoreRules] = None,
+                   max_depth: Optional[int] = None,
+                   after: Optional[str] = None,
+                   include_ignored: bool = False,
+                   report_ignored: bool = False) -> Iterator[WalkEntry]:
+    """Yield files and directories below a workspace directory
+
+    Entries come in depth-first pre-order with names sorted per directory,
+    which is the lexicographic order of their path components. Paths use '/' and
+    are relative to the workspace.
+
+    Args:
+        workspace_path: Workspace root
+        directory: Directory to walk, relative to the workspace
+        ignore_rules: Rules used to prune ignored entries
+        max_depth: Deepest level yielded; 1 means direct children only
+        after: Resume after this path (a cursor from a previous page)
+        include_ignored: Yield ignored entries instead of pruning them
+        report_ignored: Yield ignored entries flagged as ignored, without descending into them
+    """
+    ignore_rules = ignore_rules or IgnoreRules(workspace_path)
+    root = os.path.normpath(os.path.join(workspace_path, directory))
+    root_rel = os.path.relpath(root, workspace_path).replace(os.sep, '/')
+    root_rel = '' if root_rel == '.' else root_rel
+    cursor = _cursor_parts(after)
+
+    if root_rel and not include_ignored and ignore_rules.is_path_ignored(root_rel, True):
+        return
+
+    # Load .gitignore files of the parents so rules above the start directory apply
+    parts = root_rel.split('/') if root_rel else []
+    for depth in range(len(parts) + 1):
+        ignore_rules.load_gitignore('/'.join(parts[:depth]))
+
+    stack: List[Tuple[Iterator[os.DirEntry], str, int]] = [
+        (iter(_scan_directory(root, root_rel, ignore_rules)), root_rel, 1)
+    ]
+    while stack:
+        entries, rel_dir, depth = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+        ignored = False
+        if not include_ignored and ignore_rules.is_ignored(rel_path, is_dir):
+            if not report_ignored:
+                continue
+            ignored = True
+        descend = is_dir and not ignored and (max_depth is None or depth < max_depth)
+
+        if cursor is not None:
+            entry_parts = tuple(rel_path.split('/'))
+            if entry_parts <= cursor:
+                # Entries up to the cursor were returned already; only the
+                # cursor's own ancestors need to be walked again
+                if descend and cursor[:len(entry_parts)] == entry_parts:
+                    stack.append((iter(_scan_directory(entry.path, rel_path, ignore_rules)),
+                                  rel_path, depth + 1))
+                continue
+
+        yield WalkEntry(rel_path, is_dir, entry, ignored)
+        if descend:
+            stack.append((iter(_scan_directory(entry.path, rel_path, ignore_rules)),
+                          rel_path, depth + 1))
@@ -0,0 +1,168 @@
+"""
+Atomic file writes and a write-behind buffer for FileOperations.
+
+Every write goes to a temporary file in the target directory and is renamed
+over the target, so a crash never leaves a half-written file. Durability is
+chosen per write:
+
+- 'none': rely on the OS to write the data back eventually
+- 'fsync-file': fsync the data before the rename
+- 'fsync-dir': also fsync the directory, so the rename itself survives a crash
+
+Buffered writes are held in memory until flushed, so an agent rewriting the
+same file several times in a task only pays for the last version.
+"""
+from typing import Dict, Any, List, NamedTuple, Optional
+import os
+import shutil
+import tempfile
+import threading
+
+DURABILITY_LEVELS = ('none', 'fsync-file', 'fsync-dir')
+
+# Pending bytes above which the buffer flushes itself
+DEFAULT_MAX_PENDING_BYTES = 16 * 1024 * 1024
+
+# The process umask, read once: os.umask can only be read by setting it,
+# which is not safe once other threads create files
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+def validate_durability(durability: str) -> None:
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Invalid durability: {durability} (expected one of "
+                         f"{', '.join(DURABILITY_LEVELS)})")
+
+def fsync_directory(directory: str) -> None:
+    """Make renames and new entries in a directory durable"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows; renames there are already durable
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_atomic(full_path: str,
+                 content: str,
+                 encoding: str = 'utf-8',
+                 durability: str = 'none') -> None:
+    """Replace a file through a temporary file and rename, keeping its mode
+
+    A symlink is followed, so the file it points to is replaced and the link
+    stays. New files get the mode open() would give them. Content is written
+    as is, without translating newlines.
+    """
+    validate_durability(durability)
+    full_path = os.path.realpath(full_path)
+    directory = os.path.dirname(full_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as f:
+            f.write(content)
+            if durability != 'none':
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(full_path):
+            shutil.copymode(full_path, temp_path)
+        else:
+            # mkstemp creates files readable by the owner only
+            os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, full_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    if durability == 'fsync-dir':
+        fsync_directory(directory)
+
+class PendingWrite(NamedTuple):
+    """A buffered write waiting to be flushed"""
+    full_path: str
+    content: str
+    encoding: str
+    durability: str
+
+class WriteBuffer:
+    """Coalesces writes per path until flushed"""
+
+    def __init__(self, max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES):
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_bytes = 0
+        self.staged = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self._pending: Dict[str, PendingWrite] = {}
+        self._lock = threading.Lock()
+
+    def stage(self,
+              rel_path: str,
+              full_path: str,
+              content: str,
+              encoding: str = 'utf-8',
+              durability: str = 'none') -> bool:
+        """Buffer a write, replacing any pending write to the same path
+
+        The strongest durability requested for a path since its last flush wins.
+
+        Returns:
+            True if the buffer is over its byte budget and should be flushed
+        """
+        validate_durability(durability)
+        with self._lock:
+            previous = self._pending.get(rel_path)
+            if previous is not None:
+                self.coalesced += 1
+                self.pending_bytes -= len(previous.content)
+                durability = max(durability, previous.durability, key=DURABILITY_LEVELS.index)
+            self._pending[rel_path] = PendingWrite(full_path, content, encoding, durability)
+            self.pending_bytes += len(content)
+            self.staged += 1
+            return self.pending_bytes > self.max_pending_bytes
+
+    def get(self, rel_path: str) -> Optional[PendingWrite]:
+        """The pending write for a path, if any"""
+        return self._pending.get(rel_path)
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def overlapping(self, rel_path: str) -> List[str]:
+        """Pending paths equal to or below a path"""
+        prefix = rel_path.rstrip('/') + '/'
+        with self._lock:
+            return [p for p in self._pending if p == rel_path or p.startswith(prefix)
+                    or rel_path in ('', '.')]
+
+    def take(self, rel_paths: Optional[List[str]] = None) -> Dict[str, PendingWrite]:
+        """Remove and return pending writes (all of them when rel_paths is None)"""
+        with self._lock:
+            if rel_paths is None:
+                taken, self._pending = self._pending, {}
+            else:
+                taken = {p: self._pending.pop(p) for p in rel_paths if p in self._pending}
+            self.pending_bytes -= sum(len(write.content) for write in taken.values())
+            return taken
+
+    def restore(self, writes: Dict[str, PendingWrite]) -> None:
+        """Put back taken writes that failed, unless a path was written again since"""
+        with self._lock:
+            for rel_path, write in writes.items():
+                if rel_path not in self._pending:
+                    self._pending[rel_path] = write
+                    self.pending_bytes += len(write.content)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for staged, coalesced and flushed writes"""
+        return {
+            'pending': len(self._pending),
+            'pending_bytes': self.pending_bytes,
+            'staged': self.staged,
+            'coalesced': self.coalesced,
+            'flushed': self.flushed
+        }